@@ -10,11 +10,32 @@ subscription control, and impersonation features.
 import streamlit as st
 import sqlite3
 import pandas as pd
-import hashlib
 import datetime
 from typing import Optional, Dict, List
-import uuid
 import json
+import query_metrics
+from data_cache import cached_query, invalidates
+from password_hashing import get_password_hasher
+from device_registry import get_device_registry
+from session_store import init_session_schema, get_session_store
+from entitlements import get_entitlement_resolver, feature_labels
+
+# users.updated_at doubles as the row version for optimistic concurrency;
+# millisecond precision so two saves within a second still differ
+USER_VERSION_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Columns the user editor may change
+EDITABLE_USER_FIELDS = (
+    'username', 'email', 'plan_id', 'device_limit', 'dealer_code',
+    'subscription_status', 'subscription_start', 'subscription_end'
+)
+
+def diff_user_fields(original: Dict, values: Dict) -> Dict:
+    """Editable fields whose submitted value differs from the original ("" counts as None)"""
+    return {
+        field: value for field, value in values.items()
+        if field in EDITABLE_USER_FIELDS and (None if value == "" else value) != original.get(field)
+    }
 
 # Database setup and management
 class DatabaseManager:
@@ -22,9 +43,13 @@ class DatabaseManager:
         self.db_path = db_path
         self.init_database()
     
+    def get_connection(self) -> sqlite3.Connection:
+        """Open an instrumented connection (timed per statement, see query_metrics)"""
+        return query_metrics.connect(self.db_path)
+    
     def init_database(self):
         """Initialize database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         # Admin table
@@ -74,18 +99,7 @@ class DatabaseManager:
         ''')
         
         # Sessions table for impersonation
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS admin_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            admin_id INTEGER,
-            impersonated_user_id INTEGER,
-            session_token TEXT UNIQUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_active BOOLEAN DEFAULT 1,
-            FOREIGN KEY (admin_id) REFERENCES admins (id),
-            FOREIGN KEY (impersonated_user_id) REFERENCES users (id)
-        )
-        ''')
+        init_session_schema(cursor)
         
         # Insert default admin if not exists
         cursor.execute("SELECT COUNT(*) FROM admins")
@@ -114,24 +128,31 @@ class DatabaseManager:
         conn.close()
     
     def hash_password(self, password: str) -> str:
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password with salted scrypt (see password_hashing)"""
+        return get_password_hasher().hash(password)
     
     def verify_admin(self, username: str, password: str) -> Optional[Dict]:
-        """Verify admin credentials"""
-        conn = sqlite3.connect(self.db_path)
+        """Verify admin credentials, upgrading legacy or weaker hashes on success"""
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        password_hash = self.hash_password(password)
         cursor.execute('''
-        SELECT id, username, email FROM admins 
-        WHERE username = ? AND password_hash = ?
-        ''', (username, password_hash))
+        SELECT id, username, email, password_hash FROM admins 
+        WHERE username = ?
+        ''', (username,))
         
         result = cursor.fetchone()
+        hasher = get_password_hasher()
+        matches, needs_rehash = hasher.verify(password, result[3]) if result else hasher.verify_unknown_user(password)
+        
+        if matches and needs_rehash:
+            # Guarded so a concurrent password change is not overwritten
+            cursor.execute("UPDATE admins SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                           (self.hash_password(password), result[0], result[3]))
+            conn.commit()
         conn.close()
         
-        if result:
+        if matches:
             return {
                 "id": result[0],
                 "username": result[1],
@@ -139,9 +160,10 @@ class DatabaseManager:
             }
         return None
     
+    @cached_query('users', 'plans')
     def get_all_users(self, limit: int = 50, offset: int = 0) -> List[Dict]:
         """Get all users with pagination"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -171,18 +193,20 @@ class DatabaseManager:
         conn.close()
         return users
     
+    @cached_query('users')
     def get_user_count(self) -> int:
         """Get total user count"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM users")
         count = cursor.fetchone()[0]
         conn.close()
         return count
     
+    @cached_query(lambda self, user_id: f"user:{user_id}", 'plans')
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """Get user details by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -215,9 +239,10 @@ class DatabaseManager:
             }
         return None
     
+    @invalidates('users', lambda self, user_id, user_data: f"user:{user_id}")
     def update_user(self, user_id: int, user_data: Dict) -> bool:
         """Update user information"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -231,7 +256,7 @@ class DatabaseManager:
                     values.append(value)
             
             if fields:
-                fields.append("updated_at = CURRENT_TIMESTAMP")
+                fields.append(f"updated_at = {USER_VERSION_SQL}")
                 values.append(user_id)
                 
                 query = f"UPDATE users SET {', '.join(fields)} WHERE id = ?"
@@ -244,9 +269,77 @@ class DatabaseManager:
             conn.close()
             return False
     
+    @invalidates('users', lambda self, edits: [f"user:{edit['id']}" for edit in edits])
+    def apply_user_edits(self, edits: List[Dict]) -> Dict:
+        """
+        Save edits to one or more users in a single transaction, with
+        optimistic concurrency.
+        
+        Each edit is {'id', 'version', 'original', 'changes'}: version is the
+        updated_at value the editor loaded, original the field values it
+        showed and changes only the fields the admin altered. Users whose
+        version has moved on are left untouched and reported in 'conflicts'
+        with their current row, the fields another writer changed ('theirs')
+        and the fields both sides changed differently ('overlapping'), so the
+        editor can merge without re-reading.
+        """
+        result = {'updated': [], 'unchanged': [], 'conflicts': [], 'versions': {}, 'error': None}
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for edit in edits:
+                user_id = edit['id']
+                changes = {k: v for k, v in edit['changes'].items() if k in EDITABLE_USER_FIELDS}
+                if not changes:
+                    result['unchanged'].append(user_id)
+                    continue
+        
+                assignments = ", ".join(f"{field} = ?" for field in changes)
+                cursor.execute(f"UPDATE users SET {assignments}, updated_at = {USER_VERSION_SQL} "
+                               f"WHERE id = ? AND updated_at IS ?",
+                               list(changes.values()) + [user_id, edit['version']])
+        
+                if cursor.rowcount == 1:
+                    cursor.execute("SELECT updated_at FROM users WHERE id = ?", (user_id,))
+                    result['versions'][user_id] = cursor.fetchone()[0]
+                    result['updated'].append(user_id)
+                    continue
+        
+                cursor.execute(f"SELECT {', '.join(EDITABLE_USER_FIELDS)}, updated_at FROM users WHERE id = ?", (user_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    result['conflicts'].append({'id': user_id, 'deleted': True, 'changes': changes})
+                    continue
+        
+                current = dict(zip(EDITABLE_USER_FIELDS, row[:-1]))
+                original = edit.get('original', {})
+                theirs = {field: current[field] for field in EDITABLE_USER_FIELDS
+                          if field in original and current[field] != original[field]}
+                result['conflicts'].append({
+                    'id': user_id,
+                    'deleted': False,
+                    'version': row[-1],
+                    'current': current,
+                    'theirs': theirs,
+                    'overlapping': [field for field in changes if field in theirs and theirs[field] != changes[field]],
+                    'changes': changes
+                })
+        
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            result.update(updated=[], versions={}, error=str(e))
+        finally:
+            conn.close()
+        
+        return result
+    
+    @invalidates('users', lambda self, user_id: f"user:{user_id}")
     def delete_user(self, user_id: int) -> bool:
         """Delete user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -258,9 +351,10 @@ class DatabaseManager:
             conn.close()
             return False
     
+    @cached_query('plans')
     def get_all_plans(self) -> List[Dict]:
         """Get all plans"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -286,19 +380,15 @@ class DatabaseManager:
     
     def create_impersonation_session(self, admin_id: int, user_id: int) -> str:
         """Create impersonation session"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        session_token = str(uuid.uuid4())
-        
-        cursor.execute('''
-        INSERT INTO admin_sessions (admin_id, impersonated_user_id, session_token)
-        VALUES (?, ?, ?)
-        ''', (admin_id, user_id, session_token))
-        
-        conn.commit()
-        conn.close()
-        return session_token
+        return get_session_store(self.db_path).create_session(admin_id, user_id)
+    
+    def validate_impersonation_session(self, session_token: Optional[str]) -> Optional[Dict]:
+        """Active impersonation session for a token, or None once expired/revoked"""
+        return get_session_store(self.db_path).validate(session_token)
+    
+    def end_impersonation_session(self, session_token: Optional[str]):
+        """Revoke impersonation session"""
+        get_session_store(self.db_path).revoke(session_token)
 
 # Session management
 class SessionManager:
@@ -311,6 +401,8 @@ class SessionManager:
             st.session_state.admin_user = None
         if 'impersonated_user' not in st.session_state:
             st.session_state.impersonated_user = None
+        if 'impersonation_token' not in st.session_state:
+            st.session_state.impersonation_token = None
         if 'current_page' not in st.session_state:
             st.session_state.current_page = 'login'
     
@@ -327,18 +419,21 @@ class SessionManager:
         st.session_state.admin_logged_in = False
         st.session_state.admin_user = None
         st.session_state.impersonated_user = None
+        st.session_state.impersonation_token = None
         st.session_state.current_page = 'login'
     
     @staticmethod
-    def impersonate_user(user_data):
+    def impersonate_user(user_data, session_token: str):
         """Start user impersonation"""
         st.session_state.impersonated_user = user_data
+        st.session_state.impersonation_token = session_token
         st.session_state.current_page = 'user_dashboard'
     
     @staticmethod
     def end_impersonation():
         """End user impersonation"""
         st.session_state.impersonated_user = None
+        st.session_state.impersonation_token = None
         st.session_state.current_page = 'dashboard'
 
 # UI Components
@@ -387,9 +482,17 @@ class AdminUI:
             st.markdown("### 🇮🇳 Admin Dashboard")
             st.markdown(f"**Welcome:** {st.session_state.admin_user['username']}")
             
+            if st.session_state.impersonated_user:
+                session = self.db.validate_impersonation_session(st.session_state.impersonation_token)
+                if (session is None or session['admin_id'] != st.session_state.admin_user['id']
+                        or session['user_id'] != st.session_state.impersonated_user['id']):
+                    SessionManager.end_impersonation()
+                    st.info("Impersonation session expired. Returned to admin view.")
+            
             if st.session_state.impersonated_user:
                 st.warning(f"**Impersonating:** {st.session_state.impersonated_user['username']}")
                 if st.button("🔙 Return to Admin", use_container_width=True):
+                    self.db.end_impersonation_session(st.session_state.impersonation_token)
                     SessionManager.end_impersonation()
                     st.rerun()
                 st.markdown("---")
@@ -410,6 +513,7 @@ class AdminUI:
             
             st.markdown("---")
             if st.button("🚪 Logout", use_container_width=True):
+                self.db.end_impersonation_session(st.session_state.impersonation_token)
                 SessionManager.logout_admin()
                 st.rerun()
     
@@ -526,12 +630,16 @@ class AdminUI:
                         
                         with action_cols[0]:
                             if st.button("👤", key=f"login_{user['id']}", help="Login as User"):
-                                SessionManager.impersonate_user(user)
+                                session_token = self.db.create_impersonation_session(
+                                    st.session_state.admin_user['id'], user['id'])
+                                SessionManager.impersonate_user(user, session_token)
                                 st.rerun()
                         
                         with action_cols[1]:
                             if st.button("✏️", key=f"edit_{user['id']}", help="Edit User"):
                                 st.session_state.edit_user_id = user['id']
+                                st.session_state.edit_user_snapshot = None
+                                st.session_state.edit_user_conflict = None
                                 st.session_state.current_page = 'edit_user'
                                 st.rerun()
                         
@@ -554,13 +662,23 @@ class AdminUI:
             st.rerun()
             return
         
-        user = self.db.get_user_by_id(st.session_state.edit_user_id)
-        if not user:
-            st.error("User not found")
-            return
+        # Edit against the row as first loaded; its updated_at is the
+        # version the save is checked against
+        user = st.session_state.get('edit_user_snapshot')
+        if not user or user['id'] != st.session_state.edit_user_id:
+            user = self.db.get_user_by_id(st.session_state.edit_user_id)
+            if not user:
+                st.error("User not found")
+                return
+            st.session_state.edit_user_snapshot = user
         
         st.markdown(f"# ✏️ Edit User: {user['username']}")
         
+        conflict_state = st.session_state.get('edit_user_conflict')
+        if conflict_state and conflict_state['conflict']['id'] == user['id']:
+            self.render_edit_conflict(user, conflict_state['changes'], conflict_state['conflict'])
+            return
+        
         col1, col2 = st.columns([2, 1])
         
         with col1:
@@ -589,7 +707,8 @@ class AdminUI:
                 # Device settings
                 st.markdown("### Device Settings")
                 new_device_limit = st.number_input("Device Limit", min_value=1, max_value=1000, value=user['device_limit'])
-                new_current_devices = st.number_input("Current Devices", min_value=0, max_value=1000, value=user['current_devices'])
+                st.number_input("Current Devices", value=user['current_devices'], disabled=True,
+                                help="Counted from registered devices; remove devices below to free slots")
                 
                 # Subscription settings
                 st.markdown("### Subscription")
@@ -622,21 +741,20 @@ class AdminUI:
                         'email': new_email,
                         'plan_id': selected_plan_id,
                         'device_limit': new_device_limit,
-                        'current_devices': new_current_devices,
                         'dealer_code': new_dealer_code,
                         'subscription_status': new_status,
                         'subscription_start': new_start_date.isoformat(),
                         'subscription_end': new_end_date.isoformat()
                     }
                     
-                    if self.db.update_user(user['id'], update_data):
-                        st.success("User updated successfully!")
-                        st.session_state.current_page = 'users'
-                        st.rerun()
+                    changes = diff_user_fields(user, update_data)
+                    if changes:
+                        self.save_user_changes(user, changes)
                     else:
-                        st.error("Failed to update user")
+                        st.info("No changes to save")
                 
                 if cancel_button:
+                    st.session_state.edit_user_snapshot = None
                     st.session_state.current_page = 'users'
                     st.rerun()
         
@@ -650,6 +768,94 @@ class AdminUI:
             **Status:** {user['subscription_status'].title()}
             **Created:** {user['created_at'][:10]}
             """)
+            
+            st.markdown("### 📱 Registered Devices")
+            registry = get_device_registry(self.db.db_path)
+            devices = registry.list_devices(user['id'])
+            for device in devices:
+                dev_col1, dev_col2 = st.columns([4, 1])
+                with dev_col1:
+                    status = "🟢" if device['is_active'] else "⚪"
+                    st.write(f"{status} {device['device_name'] or device['device_id']} ({device['device_type'] or 'Unknown'})")
+                    st.caption(f"Last active: {device['last_active'] or 'never'}")
+                with dev_col2:
+                    if st.button("🗑️", key=f"remove_device_{device['device_id']}", help="Remove Device"):
+                        registry.remove_device(user['id'], device['device_id'])
+                        user['current_devices'] = self.db.get_user_by_id(user['id'])['current_devices']
+                        st.rerun()
+            if not devices:
+                st.caption("No devices registered")
+    
+    def save_user_changes(self, user: Dict, changes: Dict):
+        """Save only the changed fields, checked against the version the editor loaded"""
+        edit = {'id': user['id'], 'version': user['updated_at'], 'original': user, 'changes': changes}
+        result = self.db.apply_user_edits([edit])
+        
+        if result['conflicts']:
+            conflict = result['conflicts'][0]
+            if conflict['deleted']:
+                st.error("This user was deleted by another admin")
+                return
+            
+            if not conflict['overlapping']:
+                # The other admin changed different fields: apply ours on top of their version
+                edit = {'id': user['id'], 'version': conflict['version'], 'original': conflict['current'], 'changes': changes}
+                result = self.db.apply_user_edits([edit])
+            
+            if result['conflicts']:
+                st.session_state.edit_user_conflict = {'changes': changes, 'conflict': result['conflicts'][0]}
+                st.rerun()
+                return
+        
+        if result['error']:
+            st.error(f"Failed to update user: {result['error']}")
+            return
+        
+        st.success("User updated successfully!")
+        st.session_state.edit_user_snapshot = None
+        st.session_state.current_page = 'users'
+        st.rerun()
+    
+    def render_edit_conflict(self, user: Dict, changes: Dict, conflict: Dict):
+        """Let the admin resolve fields another admin changed while they were editing"""
+        st.warning("⚠️ Another admin changed this user while you were editing. Choose which values to keep.")
+        
+        rows = [{
+            'Field': field.replace('_', ' ').title(),
+            'Original': user.get(field),
+            'Yours': changes[field],
+            'Theirs': conflict['theirs'][field]
+        } for field in conflict['overlapping']]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        
+        merged = [field for field in changes if field not in conflict['overlapping']]
+        if merged:
+            st.caption(f"Your other changes ({', '.join(merged)}) will be applied either way")
+        
+        col1, col2, col3 = st.columns(3)
+        resolution = None
+        with col1:
+            if st.button("Keep Mine", use_container_width=True):
+                resolution = changes
+        with col2:
+            if st.button("Keep Theirs", use_container_width=True):
+                resolution = {field: changes[field] for field in merged}
+        with col3:
+            if st.button("Discard My Changes", use_container_width=True):
+                st.session_state.edit_user_conflict = None
+                st.session_state.edit_user_snapshot = None
+                st.rerun()
+        
+        if resolution is not None:
+            st.session_state.edit_user_conflict = None
+            current = dict(user, **conflict['current'], updated_at=conflict['version'])
+            st.session_state.edit_user_snapshot = current
+            if resolution:
+                self.save_user_changes(current, resolution)
+            else:
+                st.session_state.edit_user_snapshot = None
+                st.session_state.current_page = 'users'
+                st.rerun()
     
     def render_user_dashboard(self):
         """Render impersonated user dashboard"""
@@ -702,24 +908,21 @@ class AdminUI:
         st.markdown("### 🤖 AI Assistant Features")
         st.info("This is where the user would interact with the Veterans India AI Assistant")
         
-        # Mock features based on plan
-        if user['plan_name'] != "No Plan":
-            st.success("✅ Chat with AI Assistant")
-            st.success("✅ Document Analysis")
-            
-            if user['plan_name'] in ['Standard', 'Premium', 'Enterprise']:
-                st.success("✅ Real-time Web Search")
-                st.success("✅ Advanced AI Features")
-            
-            if user['plan_name'] in ['Premium', 'Enterprise']:
-                st.success("✅ Priority Support")
-                st.success("✅ Custom Training")
-            
-            if user['plan_name'] == 'Enterprise':
-                st.success("✅ Custom Integration")
-                st.success("✅ 24/7 Support")
-        else:
-            st.warning("No active plan - Limited features available")
+        # Features granted by the user's plan
+        features = get_entitlement_resolver(self.db.db_path).user_features(user['id'])
+        for label in feature_labels(features):
+            st.success(f"✅ {label}")
+        # Without an active plan users keep the guest features
+        if user.get('subscription_status') != 'active':
+            if user['plan_name'] != "No Plan":
+                st.warning("Subscription not active - Limited features available")
+            else:
+                st.warning("No active plan - Limited features available")
+
+@st.cache_resource
+def get_database_manager(db_path: str = "veterans_admin.db") -> DatabaseManager:
+    """Shared manager, so init_database runs once per process rather than on every rerun"""
+    return DatabaseManager(db_path)
 
 def main():
     """Main application entry point"""
@@ -730,8 +933,9 @@ def main():
     )
     
     # Initialize database and session
-    db_manager = DatabaseManager()
+    db_manager = get_database_manager()
     SessionManager.init_session()
+    query_metrics.set_query_page(st.session_state.current_page if st.session_state.admin_logged_in else 'login')
     ui = AdminUI(db_manager)
     
     # Route to appropriate page
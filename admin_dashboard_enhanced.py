@@ -15,22 +15,48 @@ import datetime
 from typing import Optional, Dict, List
 import uuid
 import json
+import os
 import plotly.express as px
 import plotly.graph_objects as go
+from admin_dashboard import DatabaseManager
+from subscription_operations import get_bulk_operations, get_expiry_sweeper, BULK_OPERATIONS
+from data_export import StreamingExporter, EXPORT_DATASETS, EXPORT_FORMATS, take_export, discard_export
+from audit_log import get_audit_log, AUDIT_DURABILITY_MODES
+from query_metrics import get_query_metrics, set_query_page
+from data_cache import cached_query, invalidates, get_query_cache
+from device_registry import init_device_schema
+
+# Subscription page filters, mapped to SQL predicates on the users table (alias u)
+SUBSCRIPTION_STATUS_FILTERS = {
+    "All": None,
+    "Active": "u.subscription_status = 'active'",
+    "Expired": "u.subscription_status = 'expired'",
+    "Expiring Soon": "u.subscription_status = 'active' AND u.subscription_end BETWEEN date('now') AND date('now', '+30 days')",
+}
+
+SUBSCRIPTION_PERIOD_FILTERS = {
+    "All Time": None,
+    "Last 30 Days": "u.subscription_start >= date('now', '-30 days')",
+    "Last 90 Days": "u.subscription_start >= date('now', '-90 days')",
+    "This Year": "u.subscription_start >= date('now', 'start of year')",
+}
+
+SUBSCRIPTION_SORT_OPTIONS = {
+    "Expiry (Soonest)": "u.subscription_end ASC, u.id ASC",
+    "Expiry (Latest)": "u.subscription_end DESC, u.id DESC",
+    "Newest Users": "u.created_at DESC, u.id DESC",
+    "Username": "u.username ASC",
+}
 
 # Enhanced Database Manager with additional features
-class EnhancedDatabaseManager:
-    def __init__(self, db_path="veterans_admin.db"):
-        self.db_path = db_path
-        self.init_database()
-    
+class EnhancedDatabaseManager(DatabaseManager):
     def init_database(self):
         """Initialize database with all required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Base tables (admins, plans, users, admin_sessions) from admin_dashboard.py
+        super().init_database()
         
-        # Previous tables from admin_dashboard.py
-        # ... (keeping all previous table definitions)
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
         # Additional tables for enhanced features
         cursor.execute('''
@@ -49,19 +75,9 @@ class EnhancedDatabaseManager:
         )
         ''')
         
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_devices (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            device_name TEXT,
-            device_type TEXT,
-            device_id TEXT UNIQUE,
-            last_active TIMESTAMP,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        ''')
+        # Device table plus the triggers that enforce device_limit and keep
+        # users.current_devices in sync
+        init_device_schema(cursor)
         
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS admin_logs (
@@ -76,27 +92,38 @@ class EnhancedDatabaseManager:
         )
         ''')
         
+        # Indexes backing the subscriptions page filters and sorting
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_status_end ON users (subscription_status, subscription_end)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_plan_status ON users (plan_id, subscription_status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_subscription_start ON users (subscription_start)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)")
+        
+        # Indexes backing the audit log viewer (by admin, by target, by time)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_admin_logs_admin_time ON admin_logs (admin_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_admin_logs_target_time ON admin_logs (target_type, target_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_admin_logs_time ON admin_logs (created_at)")
+        
         conn.commit()
         conn.close()
     
+    @cached_query('users', 'plans')
     def get_dashboard_stats(self) -> Dict:
         """Get comprehensive dashboard statistics"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         stats = {}
         
-        # User statistics
-        cursor.execute("SELECT COUNT(*) FROM users")
-        stats['total_users'] = cursor.fetchone()[0]
+        # User statistics (one pass over the status index; the expiry
+        # sweeper keeps subscription_status current)
+        cursor.execute("SELECT subscription_status, COUNT(*) FROM users GROUP BY subscription_status")
+        status_counts = dict(cursor.fetchall())
+        stats['total_users'] = sum(status_counts.values())
+        stats['active_users'] = status_counts.get('active', 0)
+        stats['expired_users'] = status_counts.get('expired', 0)
         
-        cursor.execute("SELECT COUNT(*) FROM users WHERE subscription_status = 'active'")
-        stats['active_users'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM users WHERE subscription_status = 'expired'")
-        stats['expired_users'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM users WHERE subscription_end < date('now')")
+        # Active subscriptions past their end date that the sweeper has not reached yet
+        cursor.execute("SELECT COUNT(*) FROM users WHERE subscription_status = 'active' AND subscription_end < date('now')")
         stats['overdue_users'] = cursor.fetchone()[0]
         
         # Revenue statistics
@@ -121,9 +148,10 @@ class EnhancedDatabaseManager:
         conn.close()
         return stats
     
+    @invalidates('plans')
     def create_plan(self, plan_data: Dict) -> bool:
         """Create new subscription plan"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -145,9 +173,10 @@ class EnhancedDatabaseManager:
             conn.close()
             return False
     
+    @invalidates('plans')
     def update_plan(self, plan_id: int, plan_data: Dict) -> bool:
         """Update existing plan"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -172,9 +201,10 @@ class EnhancedDatabaseManager:
             conn.close()
             return False
     
+    @cached_query('users', 'plans')
     def get_subscription_analytics(self) -> Dict:
         """Get subscription analytics data"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         # Subscription trends over time
@@ -189,36 +219,126 @@ class EnhancedDatabaseManager:
         
         # Expiring subscriptions in next 30 days
         cursor.execute('''
-        SELECT * FROM users
+        SELECT username, email, subscription_end FROM users
         WHERE subscription_end BETWEEN date('now') AND date('now', '+30 days')
         AND subscription_status = 'active'
         ORDER BY subscription_end
         ''')
-        expiring_soon = cursor.fetchall()
+        expiring_soon = [
+            {'username': row[0], 'email': row[1], 'subscription_end': row[2]}
+            for row in cursor.fetchall()
+        ]
         
         conn.close()
         return {
             'signup_trends': signup_trends,
             'expiring_soon': expiring_soon
         }
-    
-    def log_admin_action(self, admin_id: int, action: str, target_type: str, target_id: int, details: str):
-        """Log admin actions for audit trail"""
-        conn = sqlite3.connect(self.db_path)
+
+    @cached_query('users', 'plans')
+    def query_subscriptions(self, status: str = "All", plan_id: Optional[int] = None,
+                            period: str = "All Time", sort: str = "Expiry (Soonest)",
+                            page: int = 1, page_size: int = 20) -> Dict:
+        """Get one page of filtered subscriptions plus facet counts for every filter"""
+        status_clause = SUBSCRIPTION_STATUS_FILTERS.get(status)
+        period_clause = SUBSCRIPTION_PERIOD_FILTERS.get(period)
+        plan_clause = "u.plan_id = ?" if plan_id is not None else None
+        order_by = SUBSCRIPTION_SORT_OPTIONS.get(sort, SUBSCRIPTION_SORT_OPTIONS["Expiry (Soonest)"])
+
+        def where(*clauses):
+            # Combine the active filters, skipping the facet being counted
+            active = [c for c in clauses if c]
+            params = [plan_id] if plan_clause in active else []
+            return (" WHERE " + " AND ".join(f"({c})" for c in active)) if active else "", params
+
+        conn = self.get_connection()
         cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO admin_logs (admin_id, action, target_type, target_id, details)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (admin_id, action, target_type, target_id, details))
-        
+
+        # Read every query from one snapshot so counts and rows agree
+        cursor.execute("BEGIN")
+
+        # Status facet (plan and period filters applied)
+        where_sql, params = where(plan_clause, period_clause)
+        status_sums = ", ".join(
+            f"SUM(CASE WHEN {clause} THEN 1 ELSE 0 END)" if clause else "COUNT(*)"
+            for clause in SUBSCRIPTION_STATUS_FILTERS.values()
+        )
+        cursor.execute(f"SELECT {status_sums} FROM users u{where_sql}", params)
+        status_facet = dict(zip(SUBSCRIPTION_STATUS_FILTERS, (n or 0 for n in cursor.fetchone())))
+
+        # Plan facet (status and period filters applied)
+        where_sql, params = where(status_clause, period_clause)
+        cursor.execute(f"SELECT u.plan_id, COUNT(*) FROM users u{where_sql} GROUP BY u.plan_id", params)
+        plan_facet = {row[0]: row[1] for row in cursor.fetchall()}
+
+        # Period facet (status and plan filters applied)
+        where_sql, params = where(status_clause, plan_clause)
+        period_sums = ", ".join(
+            f"SUM(CASE WHEN {clause} THEN 1 ELSE 0 END)" if clause else "COUNT(*)"
+            for clause in SUBSCRIPTION_PERIOD_FILTERS.values()
+        )
+        cursor.execute(f"SELECT {period_sums} FROM users u{where_sql}", params)
+        period_facet = dict(zip(SUBSCRIPTION_PERIOD_FILTERS, (n or 0 for n in cursor.fetchone())))
+
+        # Requested page
+        total = status_facet.get(status, status_facet["All"])
+        total_pages = max((total - 1) // page_size + 1, 1)
+        page = min(max(page, 1), total_pages)
+
+        where_sql, params = where(status_clause, plan_clause, period_clause)
+        cursor.execute(f'''
+        SELECT u.id, u.username, u.email, u.device_limit, u.current_devices,
+               u.dealer_code, u.subscription_status, u.subscription_start,
+               u.subscription_end, p.plan_name
+        FROM users u
+        LEFT JOIN plans p ON u.plan_id = p.id{where_sql}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+        ''', params + [page_size, (page - 1) * page_size])
+
+        rows = []
+        for row in cursor.fetchall():
+            rows.append({
+                "id": row[0],
+                "username": row[1],
+                "email": row[2],
+                "device_limit": row[3],
+                "current_devices": row[4],
+                "dealer_code": row[5],
+                "subscription_status": row[6],
+                "subscription_start": row[7],
+                "subscription_end": row[8],
+                "plan_name": row[9] or "No Plan"
+            })
+
         conn.commit()
         conn.close()
+        return {
+            'rows': rows,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': total_pages,
+            'facets': {
+                'status': status_facet,
+                'plan': plan_facet,
+                'period': period_facet
+            }
+        }
+
+    def log_admin_action(self, admin_id: int, action: str, target_type: str, target_id: int, details: str) -> bool:
+        """Log admin actions for audit trail; False if a 'sync' mode write failed (it is retried later)"""
+        return get_audit_log(self.db_path).log(admin_id, action, target_type, target_id, details)
+    
+    def get_admin_logs(self, **filters) -> List[Dict]:
+        """Get audit trail entries filtered by admin, target, action or time range"""
+        return get_audit_log(self.db_path).query(**filters)
 
 # Enhanced UI Components
 class EnhancedAdminUI:
     def __init__(self, db_manager):
         self.db = db_manager
+        self.bulk_ops = get_bulk_operations(db_manager.db_path)
     
     def render_enhanced_dashboard(self):
         """Render enhanced dashboard with analytics"""
@@ -311,8 +431,12 @@ class EnhancedAdminUI:
                         }
                         
                         if self.db.create_plan(plan_data):
+                            logged = self.db.log_admin_action(st.session_state.admin_user['id'], 'plan_created',
+                                                              'plan', None, json.dumps({'plan_name': plan_name}))
                             st.success("Plan created successfully!")
-                            st.rerun()
+                            if logged:
+                                st.rerun()
+                            st.warning("The audit entry could not be written yet; it will be retried")
                         else:
                             st.error("Failed to create plan")
                     else:
@@ -359,40 +483,98 @@ class EnhancedAdminUI:
         # Quick actions
         col1, col2, col3, col4 = st.columns(4)
         
+        admin_id = st.session_state.admin_user['id']
+        
         with col1:
             if st.button("🔄 Renew Expiring", use_container_width=True):
-                st.info("Bulk renewal feature")
+                job_id = self.bulk_ops.create_job(admin_id, 'renew', 'expiring_soon')
+                self.bulk_ops.start_job(job_id)
+                st.success(f"Bulk renewal job #{job_id} started")
         
         with col2:
             if st.button("📧 Send Reminders", use_container_width=True):
-                st.info("Email reminder feature")
+                job_id = self.bulk_ops.create_job(admin_id, 'remind', 'expiring_soon')
+                self.bulk_ops.start_job(job_id)
+                st.success(f"Reminder job #{job_id} started")
         
         with col3:
             if st.button("📊 Export Data", use_container_width=True):
-                st.info("Data export feature")
+                st.session_state.show_export = not st.session_state.get('show_export', False)
         
         with col4:
             if st.button("💰 Revenue Report", use_container_width=True):
                 st.info("Revenue analytics")
         
-        # Subscription filters
-        col1, col2, col3 = st.columns(3)
+        self.render_bulk_jobs()
+        
+        # Subscription filters (current values are read first so the facet
+        # counts shown in each selectbox come from the same query as the rows)
+        plans = self.db.get_all_plans()
+        plan_options = {None: "All Plans"}
+        plan_options.update({p['id']: p['plan_name'] for p in plans})
+        
+        filters = (
+            st.session_state.get('sub_status_filter', "All"),
+            st.session_state.get('sub_plan_filter'),
+            st.session_state.get('sub_period_filter', "All Time"),
+            st.session_state.get('sub_sort', "Expiry (Soonest)")
+        )
+        if st.session_state.get('sub_filters') != filters:
+            st.session_state.sub_filters = filters
+            st.session_state.subscription_page = 1
+        
+        result = self.db.query_subscriptions(
+            status=filters[0],
+            plan_id=filters[1],
+            period=filters[2],
+            sort=filters[3],
+            page=st.session_state.get('subscription_page', 1),
+            page_size=20
+        )
+        facets = result['facets']
+        
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            status_filter = st.selectbox("Status", ["All", "Active", "Expired", "Expiring Soon"])
+            st.selectbox("Status", list(SUBSCRIPTION_STATUS_FILTERS), key='sub_status_filter',
+                         format_func=lambda s: f"{s} ({facets['status'].get(s, 0):,})")
         
         with col2:
-            plan_filter = st.selectbox("Plan", ["All Plans"] + [p['plan_name'] for p in self.db.get_all_plans()])
+            st.selectbox("Plan", list(plan_options), key='sub_plan_filter',
+                         format_func=lambda p: f"{plan_options[p]} ({sum(facets['plan'].values()) if p is None else facets['plan'].get(p, 0):,})")
         
         with col3:
-            date_range = st.selectbox("Period", ["All Time", "Last 30 Days", "Last 90 Days", "This Year"])
+            st.selectbox("Period", list(SUBSCRIPTION_PERIOD_FILTERS), key='sub_period_filter',
+                         format_func=lambda d: f"{d} ({facets['period'].get(d, 0):,})")
+        
+        with col4:
+            st.selectbox("Sort By", list(SUBSCRIPTION_SORT_OPTIONS), key='sub_sort')
+        
+        if st.session_state.get('show_export'):
+            self.render_export_panel(filters)
+        
+        st.markdown(f"### 📊 Subscription Details ({result['total']:,} matching)")
         
-        # Subscription list with enhanced info
-        users = self.db.get_all_users(limit=100)  # Get more for filtering
+        # Pagination
+        col1, col2, col3 = st.columns([1, 2, 1])
         
-        st.markdown("### 📊 Subscription Details")
+        with col1:
+            if st.button("⬅️ Previous", key="sub_prev", disabled=result['page'] <= 1):
+                st.session_state.subscription_page = result['page'] - 1
+                st.rerun()
+        
+        with col2:
+            st.markdown(f"<div style='text-align: center'>Page {result['page']} of {result['total_pages']}</div>", unsafe_allow_html=True)
         
-        for user in users[:20]:  # Show first 20 for demo
+        with col3:
+            if st.button("Next ➡️", key="sub_next", disabled=result['page'] >= result['total_pages']):
+                st.session_state.subscription_page = result['page'] + 1
+                st.rerun()
+        
+        if not result['rows']:
+            st.info("No subscriptions match the selected filters")
+        
+        for user in result['rows']:
             with st.container():
                 col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 2])
                 
@@ -415,7 +597,11 @@ class EnhancedAdminUI:
                     
                     with action_col1:
                         if st.button("🔄", key=f"renew_{user['id']}", help="Renew Subscription"):
-                            st.info("Renewal dialog would open here")
+                            if self.bulk_ops.renew_user(admin_id, user['id']):
+                                st.success(f"Renewed {user['username']}")
+                                st.rerun()
+                            else:
+                                st.error("User has no plan to renew")
                     
                     with action_col2:
                         if st.button("💰", key=f"billing_{user['id']}", help="Billing History"):
@@ -423,11 +609,102 @@ class EnhancedAdminUI:
                 
                 st.divider()
     
+    def render_export_panel(self, filters):
+        """Render streaming export options for the filtered subscriptions"""
+        with st.container(border=True):
+            st.markdown("#### 📤 Export Data")
+            col1, col2, col3 = st.columns([2, 2, 1])
+            
+            with col1:
+                dataset = st.selectbox("Dataset", list(EXPORT_DATASETS), key='export_dataset',
+                                       format_func=lambda d: EXPORT_DATASETS[d]['label'])
+            
+            with col2:
+                fmt = st.selectbox("Format", list(EXPORT_FORMATS), key='export_format',
+                                   format_func=lambda f: EXPORT_FORMATS[f]['label'])
+            
+            # Subscriptions export honours the page filters
+            status, plan_id, period = filters[:3]
+            clauses = [c for c in (SUBSCRIPTION_STATUS_FILTERS.get(status),
+                                   "u.plan_id = ?" if plan_id is not None else None,
+                                   SUBSCRIPTION_PERIOD_FILTERS.get(period)) if c]
+            use_filters = dataset == 'subscriptions' and clauses
+            
+            with col3:
+                st.write("")
+                prepare = st.button("Prepare", key="prepare_export", use_container_width=True)
+            
+            if use_filters:
+                st.caption("Applying the current Status, Plan and Period filters")
+            
+            if prepare:
+                previous = st.session_state.get('export_result')
+                if previous:
+                    discard_export(previous['path'])
+                
+                exporter = StreamingExporter(self.db.db_path)
+                try:
+                    with st.spinner("Exporting..."):
+                        st.session_state.export_result = exporter.export_to_tempfile(
+                            dataset, fmt,
+                            where=" AND ".join(f"({c})" for c in clauses) if use_filters else None,
+                            params=(plan_id,) if use_filters and plan_id is not None else ()
+                        )
+                except RuntimeError as e:
+                    st.session_state.export_result = None
+                    st.error(str(e))
+            
+            export = st.session_state.get('export_result')
+            if export and os.path.exists(export['path']):
+                st.caption(f"{export['rows']:,} rows · {export['bytes'] / 1_000_000:.1f} MB · "
+                           f"{export['seconds']}s ({export['rows_per_sec']:,} rows/sec)")
+                # The file is read and removed only when the download is clicked
+                st.download_button(
+                    f"⬇️ Download {EXPORT_DATASETS[export['dataset']]['label']}",
+                    data=lambda path=export['path']: take_export(path),
+                    file_name=f"veterans_india_{export['dataset']}{EXPORT_FORMATS[export['format']]['extension']}",
+                    mime=EXPORT_FORMATS[export['format']]['mime']
+                )
+    
+    def render_bulk_jobs(self):
+        """Render progress of recent bulk subscription jobs"""
+        jobs = self.bulk_ops.list_jobs(limit=5)
+        if not jobs:
+            return
+        
+        with st.expander("⚙️ Bulk Jobs", expanded=any(job['is_running'] for job in jobs)):
+            if st.button("🔃 Refresh Progress", key="refresh_bulk_jobs"):
+                st.rerun()
+            
+            for job in jobs:
+                col1, col2, col3 = st.columns([2, 3, 1])
+                
+                with col1:
+                    st.write(f"**#{job['id']} {BULK_OPERATIONS[job['operation']]}**")
+                    st.caption(f"{job['target'].replace('_', ' ').title()} · {job['created_at']}")
+                
+                with col2:
+                    st.progress(job['progress'], text=f"{job['status'].title()}: {job['processed']:,} of {job['total']:,} applied"
+                                + (f", {job['skipped']:,} skipped" if job['skipped'] else ""))
+                    if job['error']:
+                        st.error(job['error'])
+                
+                with col3:
+                    if job['is_running']:
+                        if st.button("⏸️ Pause", key=f"pause_job_{job['id']}"):
+                            self.bulk_ops.pause_job(job['id'])
+                            st.rerun()
+                    elif job['status'] in ('pending', 'running', 'paused', 'failed'):
+                        if st.button("▶️ Resume", key=f"resume_job_{job['id']}"):
+                            self.bulk_ops.start_job(job['id'])
+                            st.rerun()
+    
     def render_settings_page(self):
         """Render admin settings page"""
         st.markdown("# ⚙️ Admin Settings")
         
-        tab1, tab2, tab3, tab4 = st.tabs(["🔧 General", "👥 Admin Users", "📧 Notifications", "🔒 Security"])
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🔧 General", "👥 Admin Users", "📧 Notifications", "🔒 Security",
+                                                      "📜 Audit Log", "⚡ DB Performance"])
         
         with tab1:
             st.markdown("### General Settings")
@@ -446,6 +723,35 @@ class EnhancedAdminUI:
             
             if st.button("Save General Settings"):
                 st.success("Settings saved successfully!")
+            
+            st.markdown("### ⏱️ Expiry Sweeper")
+            sweeper = get_expiry_sweeper(self.db.db_path)
+            sweep_stats = sweeper.stats
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Status", "Running" if sweeper.is_running() else "Stopped")
+            with col2:
+                st.metric("Interval", f"{sweeper.interval_seconds / 60:g} min")
+            with col3:
+                st.metric("Last Run Expired", sweep_stats['last_expired'])
+            with col4:
+                st.metric("Total Expired", sweep_stats['total_expired'])
+            
+            st.caption(f"Last run: {sweep_stats['last_run_at'] or 'never'}"
+                       + (f" ({sweep_stats['last_duration_ms']} ms)" if sweep_stats['last_duration_ms'] is not None else ""))
+            if sweep_stats['last_error']:
+                st.error(f"Last sweep failed: {sweep_stats['last_error']}")
+            
+            interval_minutes = st.number_input("Sweep Interval (Minutes)", min_value=1.0,
+                                               value=float(sweeper.interval_seconds / 60), step=1.0)
+            if st.button("Apply Interval") and interval_minutes * 60 != sweeper.interval_seconds:
+                sweeper.set_interval(interval_minutes * 60)
+                st.success(f"Sweeping every {interval_minutes:g} min")
+            
+            if st.button("Run Sweep Now"):
+                expired = sweeper.sweep()
+                st.success(f"Expired {expired} overdue subscriptions")
         
         with tab2:
             st.markdown("### Admin User Management")
@@ -487,8 +793,117 @@ class EnhancedAdminUI:
             st.checkbox("Log all admin actions", value=True)
             st.number_input("Password minimum length", value=8)
             
+            audit_log = get_audit_log(self.db.db_path)
+            durability_modes = list(AUDIT_DURABILITY_MODES)
+            durability = st.selectbox("Audit Log Durability", durability_modes,
+                                      index=durability_modes.index(audit_log.durability),
+                                      format_func=lambda m: m.title())
+            st.caption(AUDIT_DURABILITY_MODES[durability])
+            
             if st.button("Save Security Settings"):
+                if durability != audit_log.durability:
+                    audit_log.set_durability(durability)
+                    if not self.db.log_admin_action(st.session_state.admin_user['id'], 'settings_updated', 'system',
+                                                    None, json.dumps({'audit_durability': durability})):
+                        st.warning("The audit entry could not be written yet; it will be retried")
                 st.success("Security settings saved!")
+        
+        with tab5:
+            self.render_audit_log()
+        
+        with tab6:
+            self.render_db_performance()
+    
+    def render_audit_log(self):
+        """Render the admin audit log viewer"""
+        st.markdown("### Audit Log")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            admin_id = st.number_input("Admin ID", min_value=0, value=0, help="0 = all admins")
+        
+        with col2:
+            target_type = st.selectbox("Target Type", ["All", "user", "plan", "subscription", "system"])
+        
+        with col3:
+            target_id = st.number_input("Target ID", min_value=0, value=0, help="0 = all targets")
+        
+        with col4:
+            date_range = st.date_input("Date Range", value=(datetime.date.today() - datetime.timedelta(days=30),
+                                                            datetime.date.today()))
+        
+        filters = {
+            'admin_id': admin_id or None,
+            'target_type': None if target_type == "All" else target_type,
+            'target_id': target_id or None,
+            'limit': 200
+        }
+        if isinstance(date_range, tuple) and len(date_range) == 2:
+            filters['start'] = date_range[0].isoformat()
+            filters['end'] = (date_range[1] + datetime.timedelta(days=1)).isoformat()
+        
+        get_audit_log(self.db.db_path).flush()
+        entries = self.db.get_admin_logs(**filters)
+        
+        if entries:
+            st.dataframe(pd.DataFrame(entries), use_container_width=True, hide_index=True)
+            st.caption(f"Showing the {len(entries)} most recent matching entries")
+        else:
+            st.info("No audit entries match the selected filters")
+
+    def render_db_performance(self):
+        """Render live query timings collected by query_metrics"""
+        st.markdown("### DB Performance")
+        metrics = get_query_metrics()
+        pages = metrics.page_summary()
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Queries Recorded", f"{metrics.total_queries:,}")
+        with col2:
+            st.metric("Slow Queries", sum(p['slow'] for p in pages))
+        with col3:
+            total_ms = sum(p['total_ms'] for p in pages)
+            st.metric("Avg Query Time", f"{total_ms / metrics.total_queries:.2f} ms" if metrics.total_queries else "-")
+        with col4:
+            threshold = st.number_input("Slow Threshold (ms)", min_value=1.0, value=float(metrics.slow_query_ms), step=10.0)
+            if threshold != metrics.slow_query_ms:
+                metrics.slow_query_ms = threshold
+        
+        st.caption(f"Statements at or above the threshold are appended to {metrics.slow_log_path}")
+        
+        cache = get_query_cache(self.db.db_path)
+        lookups = cache.stats['hits'] + cache.stats['misses']
+        st.caption(f"Query cache: {len(cache)} entries, {cache.stats['hits']:,} hits / {lookups:,} lookups"
+                   + (f" ({cache.stats['hits'] / lookups:.0%})" if lookups else "")
+                   + f", {cache.stats['invalidated']:,} invalidated")
+        
+        st.markdown("#### Time by Page")
+        if pages:
+            st.dataframe(pd.DataFrame(pages), use_container_width=True, hide_index=True)
+        
+        st.markdown("#### Top Queries by Total Time")
+        queries = metrics.query_summary()
+        if queries:
+            st.dataframe(pd.DataFrame(queries)[['hash', 'calls', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'pages', 'sql']],
+                         use_container_width=True, hide_index=True)
+        
+        st.markdown("#### Recent Slow Queries")
+        slow = metrics.recent_slow()
+        if slow:
+            st.dataframe(pd.DataFrame(slow), use_container_width=True, hide_index=True)
+        else:
+            st.info("No queries above the slow threshold yet")
+        
+        if st.button("Reset Statistics"):
+            metrics.reset()
+            st.rerun()
+
+@st.cache_resource
+def get_enhanced_database_manager(db_path: str = "veterans_admin.db") -> EnhancedDatabaseManager:
+    """Shared manager, so init_database runs once per process rather than on every rerun"""
+    return EnhancedDatabaseManager(db_path)
 
 def main():
     """Enhanced main application"""
@@ -500,12 +915,14 @@ def main():
     )
     
     # Initialize enhanced system
-    db_manager = EnhancedDatabaseManager()
+    db_manager = get_enhanced_database_manager()
+    get_expiry_sweeper(db_manager.db_path)
     
     # Import and use components from original admin_dashboard.py
     from admin_dashboard import SessionManager, AdminUI
     
     SessionManager.init_session()
+    set_query_page(st.session_state.current_page if st.session_state.admin_logged_in else 'login')
     ui = AdminUI(db_manager)
     enhanced_ui = EnhancedAdminUI(db_manager)
     
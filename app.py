@@ -10,8 +10,9 @@ and their families with research queries, document analysis, and general assista
 """
 
 import streamlit as st
-import pandas as pd
-import PyPDF2
+import json
+import time
+import weakref
 import docx
 from langchain_ollama import ChatOllama
 from langchain.prompts import PromptTemplate
@@ -34,6 +35,35 @@ except ImportError as e:
     print(f"Warning: Could not import advanced search system: {e}")
     USE_WEB_SEARCH = False
 
+from document_ingestion import content_digest, get_document_ingestor
+from document_store import get_document_store
+from ocr_pipeline import get_ocr_pipeline
+from conversation_store import get_conversation_store
+from conversation_memory import get_conversation_memory
+from chat_view import ChatView, bubble_html
+from request_router import IDENTITY, ORG_KNOWLEDGE, WEB_SEARCH, LLM, CANNED, get_request_router
+from response_registry import get_response_registry
+from session_store import verify_user_link
+from veterans_india_profile import VETERANS_INDIA_PROFILE
+from tabular_data import load_table
+from document_index import ChunkIndex
+document_ingestor = get_document_ingestor()
+document_store = get_document_store()
+ocr_pipeline = get_ocr_pipeline()
+conversation_store = get_conversation_store()
+conversation_memory = get_conversation_memory()
+request_router = get_request_router()
+response_registry = get_response_registry()
+
+# Import plan entitlements
+try:
+    from entitlements import Feature, get_entitlement_resolver
+    entitlements = get_entitlement_resolver()
+    USE_ENTITLEMENTS = True
+except ImportError as e:
+    print(f"Warning: Could not import entitlements: {e}")
+    USE_ENTITLEMENTS = False
+
 # -------------------
 # Streamlit Page Config
 # -------------------
@@ -361,10 +391,58 @@ st.markdown(
 # -------------------
 # Initialize Session State
 # -------------------
+# Messages kept in the session (and rendered); older turns stay in the conversation store
+RECENT_MESSAGES = 30
+EARLIER_MESSAGES_PAGE = 30
+
+if "conversation_id" not in st.session_state:
+    # Resume the conversation in the link (?conversation=...) after a reload or server restart
+    conversation_param = st.query_params.get("conversation")
+    st.session_state["conversation_id"] = (
+        conversation_param if conversation_param and conversation_store.exists(conversation_param) else None
+    )
 if "messages" not in st.session_state:
-    st.session_state["messages"] = []
+    recent = (conversation_store.recent_messages(st.session_state["conversation_id"], RECENT_MESSAGES + 1)
+              if st.session_state["conversation_id"] else [])
+    st.session_state["has_earlier_messages"] = len(recent) > RECENT_MESSAGES
+    st.session_state["messages"] = recent[-RECENT_MESSAGES:]
+    st.session_state["message_window"] = RECENT_MESSAGES
+if "chat_view" not in st.session_state:
+    st.session_state["chat_view"] = ChatView()
 if "answer_mode" not in st.session_state:
     st.session_state["answer_mode"] = "Detailed"
+if "documents" not in st.session_state:
+    st.session_state["documents"] = {}
+if "document_index" not in st.session_state:
+    st.session_state["document_index"] = ChunkIndex()
+if "user_id" not in st.session_state:
+    # Subscriber identified by the portal's signed link (?user=<token>); None for guests
+    user_token = st.query_params.get("user")
+    st.session_state["user_id"] = verify_user_link(user_token)
+    if user_token and st.session_state["user_id"] is None:
+        st.toast("Your member link has expired or is invalid; continuing as a guest")
+
+def add_message(role, content):
+    """Append a message to the stored conversation and the session's window of recent messages"""
+    if st.session_state["conversation_id"] is None:
+        st.session_state["conversation_id"] = conversation_store.create_conversation(st.session_state["user_id"])
+        st.query_params["conversation"] = st.session_state["conversation_id"]
+    messages = st.session_state["messages"]
+    messages.append(conversation_store.append_message(st.session_state["conversation_id"], role, content))
+    overflow = len(messages) - st.session_state["message_window"]
+    if overflow > 0:
+        del messages[:overflow]
+        st.session_state["has_earlier_messages"] = True
+
+def load_earlier_messages():
+    messages = st.session_state["messages"]
+    earlier = conversation_store.messages_before(
+        st.session_state["conversation_id"], messages[0]["id"], EARLIER_MESSAGES_PAGE + 1
+    )
+    st.session_state["has_earlier_messages"] = len(earlier) > EARLIER_MESSAGES_PAGE
+    earlier = earlier[-EARLIER_MESSAGES_PAGE:]
+    messages[:0] = earlier
+    st.session_state["message_window"] += len(earlier)
 
 # -------------------
 # Load LLM Models
@@ -393,37 +471,44 @@ def load_model(model_id: str = "llama3.2:1b"):
 if "selected_model" not in st.session_state:
     st.session_state["selected_model"] = "llama3.2:1b"
 
-# Function to handle identity questions
-def handle_identity_response(user_input):
-    identity_keywords = ["who are you", "what are you", "your name", "who developed you", "who created you", "what's your name"]
-    if any(keyword in user_input.lower() for keyword in identity_keywords):
-        return "I'm Veterans India AI Assistant, developed by Veterans India Team. How can I help you today?"
-    return None
+# Reply to identity questions (routed by request_router)
+IDENTITY_RESPONSE = "I'm Veterans India AI Assistant, developed by Veterans India Team. How can I help you today?"
+
+def org_profile_context(topic):
+    """Organisation profile section for an org question; the overview when no section matched"""
+    sections = [topic] if topic else ["organization", "services_offered"]
+    return "\n".join(f"{section}: {json.dumps(VETERANS_INDIA_PROFILE[section], ensure_ascii=False)}"
+                     for section in sections)
 
 # Function to generate regular AI response
-def generate_regular_ai_response(user_input, placeholder, llm_model):
+def generate_regular_ai_response(user_input, placeholder, llm_model, org_context=None):
     """Generate regular AI response with streaming"""
     response_text = ""
     
     # Custom system context to ensure AI responds as Veterans India AI Assistant
     system_context = """You are Veterans India AI Assistant, created by Veterans India Team. When asked about your identity, always respond that you are Veterans India AI Assistant developed by Veterans India Team. Provide helpful, professional assistance."""
     
+    if org_context:
+        system_context += f"\n\nAnswer from this Veterans India profile information:\n{org_context}"
+
+    context = document_context(user_input)
+    if context:
+        system_context += f"\n\nUse these uploaded documents where relevant:\n{context}"
+
+    # Summary plus recent turns, bounded so the prompt does not grow with the conversation
+    history = conversation_memory.prompt_history(
+        st.session_state["conversation_id"], before_id=st.session_state["messages"][-1]["id"]
+    )
+    if history:
+        system_context += f"\n\n{history}"
+    
     modified_input = f"{system_context}\n\nAnswer in {st.session_state['answer_mode']} mode:\n{user_input}"
 
     for chunk in llm_model.stream(modified_input):
         if hasattr(chunk, "content"):
             response_text += chunk.content
-            placeholder.markdown(
-                f"""
-                <div style='text-align: left; margin: 8px;'>
-                    <div class='chat-bubble assistant-bubble'>
-                        {response_text}
-                    </div>
-                    <div class='timestamp'>{datetime.now().strftime("%H:%M")}</div>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+            placeholder.markdown(bubble_html("assistant", response_text, datetime.now().strftime("%H:%M")),
+                                 unsafe_allow_html=True)
     return response_text
 
 try:
@@ -438,23 +523,80 @@ except Exception as e:
 # -------------------
 # File Extractor
 # -------------------
-def extract_text(file):
+def extract_text(file, progress=None):
     if file.name.endswith(".pdf"):
-        reader = PyPDF2.PdfReader(file)
-        return "".join([page.extract_text() for page in reader.pages if page.extract_text()])
+        # Page-parallel; progress(done, total) per page. Reuse across sessions is ingest_document's job
+        return document_ingestor.extract_pdf(file.name, file.getvalue(), progress)["text"]
     elif file.name.endswith(".docx"):
         doc = docx.Document(file)
         return " ".join([para.text for para in doc.paragraphs])
-    elif file.name.endswith(".xlsx"):
-        df = pd.read_excel(file)
-        return df.to_string()
-    elif file.name.endswith(".csv"):
-        df = pd.read_csv(file)
-        return df.to_string()
+    elif file.name.endswith((".xlsx", ".csv")):
+        # Column summaries and sample rows, not the whole sheet
+        return load_table(file.name, file, progress=progress).summary_text()
     elif file.name.endswith(".txt"):
         return file.read().decode("utf-8")
     return None
 
+def ingest_document(file, progress=None):
+    """Session entry for an uploaded file; text documents come from (or go to) the shared document store"""
+    if file.name.endswith((".xlsx", ".csv")):
+        table = load_table(file.name, file, progress=progress)
+        return {"name": file.name, "table": table, "summary": table.summary_text(), "digest": None, "chunks": []}
+
+    data = file.getvalue()
+    digest = content_digest(data)
+    stored = document_store.get(digest)
+    if stored is None:
+        # First upload anywhere: extract once, then chunk and index it in the store
+        if file.name.endswith(".pdf"):
+            pages = document_ingestor.extract_pdf(file.name, data, progress)["pages"]
+        else:
+            pages = [extract_text(file, progress) or ""]
+        stored = document_store.put(digest, file.name, pages)
+
+    scanned_pages = 0
+    if file.name.endswith(".pdf"):
+        # Pages without a text layer are OCR'd in the background and indexed as they finish
+        scanned_pages = sum(1 for page in stored["pages"] if not page.strip())
+        ocr_pipeline.submit(digest, data, stored["pages"])
+    return {"name": file.name, "table": None, "summary": None, "digest": digest, "chunks": stored["chunks"],
+            "chunk_count": len(stored["chunks"]), "scanned_pages": scanned_pages}
+
+def sync_recognised_pages():
+    """Index scanned pages recognised since the last rerun; returns a status line per document still waiting"""
+    status = []
+    for file_key, document in st.session_state["documents"].items():
+        if not document.get("scanned_pages"):
+            continue
+        progress = ocr_pipeline.progress(document["digest"])
+        if progress is None:
+            status.append(f"⚠️ {document['name']}: {document['scanned_pages']} scanned pages can't be read (OCR not installed)")
+            continue
+        # Progress first: once it reports done, every finished page is already in the store
+        new_chunks = document_store.chunks_since(document["digest"], document["chunk_count"])
+        if new_chunks:
+            st.session_state["document_index"].extend_document(file_key, document["name"], new_chunks)
+            document["chunk_count"] += len(new_chunks)
+        if progress[0] < progress[1]:
+            status.append(f"🔍 {document['name']}: reading scanned pages {progress[0]}/{progress[1]}")
+        else:
+            document["scanned_pages"] = 0
+    return status
+
+# Uploaded document text included in prompts (keeps the prompt within the model's context)
+MAX_DOCUMENT_CONTEXT_CHARS = 6000
+
+def document_context(question):
+    documents = st.session_state["documents"].values()
+    # Aggregates computed from spreadsheet data go first so they are never cut off
+    answers = [answer for doc in documents
+               if doc["table"] is not None and (answer := doc["table"].answer(question))]
+    # Only the passages that match the question, however long the documents are
+    passages = [f"[{chunk['name']}, page {chunk['page']}]\n{chunk['text']}"
+                for chunk in st.session_state["document_index"].search(question)]
+    summaries = [f"[{doc['name']}]\n{doc['summary']}" for doc in documents if doc["summary"]]
+    return "\n\n".join(answers + passages + summaries)[:MAX_DOCUMENT_CONTEXT_CHARS]
+
 # -------------------
 # Sidebar (Clean ChatGPT-style Interface)
 # -------------------
@@ -471,7 +613,11 @@ with st.sidebar:
 
     # New Chat - Essential for clean interface
     if st.button("+ New Chat", use_container_width=True, type="primary"):
+        st.session_state["conversation_id"] = None
         st.session_state["messages"] = []
+        st.session_state["message_window"] = RECENT_MESSAGES
+        st.session_state["has_earlier_messages"] = False
+        st.query_params.pop("conversation", None)
         st.rerun()
 
     st.divider()
@@ -514,6 +660,41 @@ with st.sidebar:
         help="Choose response length and detail level"
     )
 
+    # Documents to answer from; each file is extracted once per session
+    uploaded_files = st.file_uploader(
+        "Documents",
+        type=["pdf", "docx", "xlsx", "csv", "txt"],
+        accept_multiple_files=True,
+        help="Upload circulars, manuals or records to ask questions about"
+    )
+    uploaded_keys = set()
+    for file in uploaded_files or []:
+        file_key = f"{file.name}:{file.size}"
+        uploaded_keys.add(file_key)
+        if file_key not in st.session_state["documents"]:
+            progress_bar = st.progress(0.0, text=f"Reading {file.name}...")
+            document = ingest_document(
+                file,
+                lambda done, total: progress_bar.progress(done / total, text=f"Reading {file.name}: {done / total:.0%}")
+            )
+            progress_bar.empty()
+            st.session_state["document_index"].add_document(file_key, file.name, chunks=document.pop("chunks"))
+            if document["digest"]:
+                # Keep it from eviction until the file is removed or the session ends
+                document_store.acquire(document["digest"])
+                document["release"] = weakref.finalize(
+                    st.session_state["document_index"], document_store.release, document["digest"]
+                )
+            st.session_state["documents"][file_key] = document
+    # Forget documents removed from the uploader
+    for file_key in set(st.session_state["documents"]) - uploaded_keys:
+        st.session_state["document_index"].remove_document(file_key)
+        document = st.session_state["documents"].pop(file_key)
+        if document.get("release"):
+            document["release"]()
+    for line in sync_recognised_pages():
+        st.caption(line)
+
     st.markdown(
         """
         <div style='margin-top: 2rem; padding: 1rem; text-align: center; color: #6b7280; font-size: 11px;'>
@@ -545,29 +726,9 @@ st.divider()
 chat_container = st.container()
 
 with chat_container:
-    for msg in st.session_state["messages"]:
-        role = msg["role"]
-        content = msg["content"]
-        timestamp = msg["time"]
-
-        if role == "user":
-            align = "right"
-            bubble_class = "chat-bubble user-bubble"
-        else:
-            align = "left"
-            bubble_class = "chat-bubble assistant-bubble"
-
-        st.markdown(
-            f"""
-            <div style='text-align: {align}; margin: 8px;'>
-                <div class='{bubble_class}'>
-                    {content}
-                </div>
-                <div class='timestamp'>{timestamp}</div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+    if st.session_state["has_earlier_messages"]:
+        st.button("Load earlier messages", on_click=load_earlier_messages)
+    st.session_state["chat_view"].render(st.session_state["messages"])
 
 # -------------------
 # Chat Input + Streaming Answer
@@ -576,76 +737,81 @@ st.divider()
 user_input = st.chat_input("Ask me anything...")
 
 if user_input:
-    st.session_state["messages"].append({
-        "role": "user",
-        "content": user_input,
-        "time": datetime.now().strftime("%H:%M"),
-    })
+    add_message("user", user_input)
 
-    placeholder = st.empty()
+    # Draw this turn under the history instead of rerunning the whole page afterwards
+    user_message = st.session_state["messages"][-1]
+    chat_container.markdown(bubble_html("user", user_message["content"], user_message["time"]),
+                            unsafe_allow_html=True)
+    placeholder = chat_container.empty()
     placeholder.markdown("<p style='color: #9ca3af; font-size: 13px; font-family: Inter, sans-serif;'>Generating response...</p>", unsafe_allow_html=True)
 
-    # Check if it's an identity question first
-    identity_response = handle_identity_response(user_input)
-    
-    if identity_response:
+    # Pick the answer path: identity, org profile, documents, web search or the model alone
+    decision = request_router.route(user_input, has_documents=bool(st.session_state["documents"]))
+    answered_by = decision["route"]
+    fallback = False
+    started = time.perf_counter()
+
+    if answered_by == WEB_SEARCH and not (USE_WEB_SEARCH and st.session_state.get("enable_web_search", True)):
+        answered_by = LLM
+    # Web search is a Standard-and-above feature
+    elif answered_by == WEB_SEARCH and USE_ENTITLEMENTS and not entitlements.has_feature(
+            st.session_state["user_id"], Feature.WEB_SEARCH):
+        st.toast("Real-time web search is available on Standard plans and above")
+        answered_by = LLM
+
+    # None when the section has no canned response (or it failed to render): the model answers instead
+    canned_response = response_registry.get(decision["topic"]) if answered_by == ORG_KNOWLEDGE else None
+
+    if answered_by == IDENTITY:
         # Direct identity response
-        response_text = identity_response
-        placeholder.markdown(
-            f"""
-            <div style='text-align: left; margin: 8px;'>
-                <div class='chat-bubble assistant-bubble'>
-                    {response_text}
-                </div>
-                <div class='timestamp'>{datetime.now().strftime("%H:%M")}</div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-    else:
-        # Check if user wants web search (contains keywords like "search", "latest", "current", "recent")
-        search_keywords = ["search", "latest", "current", "recent", "news", "today", "2025", "update"]
-        needs_web_search = (
-            any(keyword in user_input.lower() for keyword in search_keywords) 
-            and USE_WEB_SEARCH 
-            and st.session_state.get("enable_web_search", True)
-        )
+        response_text = IDENTITY_RESPONSE
+        placeholder.markdown(bubble_html("assistant", response_text, datetime.now().strftime("%H:%M")),
+                             unsafe_allow_html=True)
+    elif answered_by == WEB_SEARCH:
+        # Use web search for current/latest information
+        placeholder.markdown("<p style='color: #3b82f6; font-size: 13px; font-family: Inter, sans-serif;'>Searching for latest information...</p>", unsafe_allow_html=True)
         
-        if needs_web_search:
-            # Use web search for current/latest information
-            placeholder.markdown("<p style='color: #3b82f6; font-size: 13px; font-family: Inter, sans-serif;'>Searching for latest information...</p>", unsafe_allow_html=True)
-            
-            try:
-                response_text = search_web_and_answer(user_input, max_sites=6)
-                placeholder.markdown(
-                    f"""
-                    <div style='text-align: left; margin: 8px;'>
-                        <div class='chat-bubble assistant-bubble'>
-                            <div style='background: rgba(255,165,0,0.1); padding: 8px; border-radius: 5px; margin-bottom: 10px;'>
-                                <small>🔍 <strong>Web Search Results:</strong></small>
-                            </div>
-                            {response_text}
+        try:
+            response_text = search_web_and_answer(user_input, max_sites=6)
+            placeholder.markdown(
+                f"""
+                <div style='text-align: left; margin: 8px;'>
+                    <div class='chat-bubble assistant-bubble'>
+                        <div style='background: rgba(255,165,0,0.1); padding: 8px; border-radius: 5px; margin-bottom: 10px;'>
+                            <small>🔍 <strong>Web Search Results:</strong></small>
                         </div>
-                        <div class='timestamp'>{datetime.now().strftime("%H:%M")}</div>
+                        {response_text}
                     </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-            except Exception as e:
-                # Fallback to regular AI response if web search fails
-                placeholder.markdown("<p style='color: #ef4444; font-size: 13px; font-family: Inter, sans-serif;'>Search unavailable, using AI knowledge...</p>", unsafe_allow_html=True)
-                response_text = generate_regular_ai_response(user_input, placeholder, llm)
-        else:
-            # Regular AI response with enhanced prompting
+                    <div class='timestamp'>{datetime.now().strftime("%H:%M")}</div>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+        except Exception as e:
+            # Fallback to regular AI response if web search fails
+            placeholder.markdown("<p style='color: #ef4444; font-size: 13px; font-family: Inter, sans-serif;'>Search unavailable, using AI knowledge...</p>", unsafe_allow_html=True)
+            answered_by, fallback = LLM, True
             response_text = generate_regular_ai_response(user_input, placeholder, llm)
+    elif canned_response is not None:
+        # Jobs, internships and the directory are answered straight from the profile
+        answered_by = CANNED
+        response_text = canned_response
+        placeholder.markdown(bubble_html("assistant", response_text, datetime.now().strftime("%H:%M")),
+                             unsafe_allow_html=True)
+    else:
+        # Regular AI response with enhanced prompting; org questions get the matching profile section
+        response_text = generate_regular_ai_response(
+            user_input, placeholder, llm,
+            org_context=org_profile_context(decision["topic"]) if answered_by == ORG_KNOWLEDGE else None
+        )
 
-    st.session_state["messages"].append({
-        "role": "assistant",
-        "content": response_text,
-        "time": datetime.now().strftime("%H:%M"),
-    })
+    request_router.record(decision, answered_by, (time.perf_counter() - started) * 1000, fallback=fallback)
 
-    st.rerun()
+    add_message("assistant", response_text)
+    # Fold older turns into the conversation summary in the background
+    conversation_memory.after_reply(st.session_state["conversation_id"],
+                                    summarize=lambda prompt: llm.invoke(prompt).content)
 
 # -------------------
 # Professional Footer
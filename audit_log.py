@@ -0,0 +1,267 @@
+"""
+Veterans India AI Assistant - Admin Audit Log
+============================================
+Buffered audit trail writer for admin_logs. Entries are queued in memory
+and written in batched transactions by a background thread, so admin
+actions never wait on a disk sync. Also provides the indexed query API
+used by the audit log viewer.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import sqlite3
+import datetime
+import queue
+import atexit
+import logging
+import threading
+from typing import Optional, Dict, List
+import query_metrics
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AUDIT_DURABILITY_MODES = {
+    'sync': "Write and fsync each entry before the action returns (a failed write is reported to the caller and retried in the background)",
+    'batched': "Queue entries in memory and write them in background batches (entries not yet written, up to about a second's worth, are lost if the app crashes; the last batches may be lost on power failure)",
+    'relaxed': "As batched, but without fsync (fastest; more recent entries may also be lost on OS crash or power failure)"
+}
+
+# PRAGMA synchronous level used for each durability mode
+_SYNCHRONOUS_LEVELS = {'sync': "FULL", 'batched': "NORMAL", 'relaxed': "OFF"}
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_QUEUE = 10000
+
+
+class AuditLogWriter:
+    """
+    Writes admin_logs entries in batches from a background thread.
+
+    log() only stamps the entry and puts it on a bounded queue; the flusher
+    drains up to max_batch entries per transaction at least every
+    flush_interval seconds. In 'sync' mode entries are written directly
+    instead. flush() blocks until everything queued so far has been
+    written. A failed write (e.g. "database is locked") keeps its entries
+    in a retry buffer that is written before the next batch; the thread
+    itself never exits on an error.
+    """
+
+    def __init__(self, db_path: str = "veterans_admin.db", durability: str = 'batched',
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_queue: int = DEFAULT_MAX_QUEUE):
+        if durability not in AUDIT_DURABILITY_MODES:
+            raise ValueError(f"Unknown audit durability mode: {durability}")
+
+        self.db_path = db_path
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.stats = {'written': 0, 'batches': 0, 'errors': 0, 'dropped': 0}
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._held: List[tuple] = []
+        self._held_lock = threading.Lock()
+        self._max_held = max_queue
+        self._write_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = query_metrics.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={_SYNCHRONOUS_LEVELS[self.durability]}")
+        return conn
+
+    def set_durability(self, durability: str):
+        """Switch durability mode; queued entries are flushed first"""
+        if durability not in AUDIT_DURABILITY_MODES:
+            raise ValueError(f"Unknown audit durability mode: {durability}")
+        self.flush()
+        self.durability = durability
+
+    def log(self, admin_id: Optional[int], action: str, target_type: str,
+            target_id: Optional[int], details: str = None) -> bool:
+        """
+        Record an admin action.
+
+        In 'sync' mode returns whether the entry is durably written; False
+        means the write failed and the entry waits in memory for a retry,
+        so the caller can warn or hold back the action. Other modes return
+        True once the entry is queued.
+        """
+        # Stamp now (UTC, same format as CURRENT_TIMESTAMP) so the entry
+        # carries the action time rather than the flush time
+        created_at = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        entry = (admin_id, action, target_type, target_id, details, created_at)
+
+        if self.durability == 'sync':
+            if not self._write([entry]):
+                self._hold([entry])
+                return False
+        else:
+            # Blocks only if the flusher has fallen max_queue entries behind
+            self._queue.put(entry)
+        return True
+
+    def flush(self):
+        """Block until every queued entry has been written (or set aside for retry if the write failed)"""
+        self._queue.join()
+        self._write_held()
+
+    def close(self):
+        """Flush remaining entries and stop the background thread"""
+        self.flush()
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+
+    @property
+    def pending_retry(self) -> int:
+        """Entries whose write failed and that are waiting to be retried"""
+        with self._held_lock:
+            return len(self._held)
+
+    def _run(self):
+        # Nothing may end this thread: flush() and a full queue would then block forever
+        while not self._stop_event.is_set():
+            try:
+                self._flush_once()
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Audit log writer error: {e}")
+                self._stop_event.wait(self.flush_interval)
+
+    def _flush_once(self):
+        # Failed batches are retried first, once per flush interval, so entries stay in order
+        self._write_held()
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return
+
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            if not self._write(batch):
+                self._hold(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _hold(self, entries: List[tuple]):
+        """Keep entries whose write failed for the next retry (bounded like the queue)"""
+        with self._held_lock:
+            self._held.extend(entries)
+            overflow = len(self._held) - self._max_held
+            if overflow > 0:
+                del self._held[:overflow]
+                self.stats['dropped'] += overflow
+                logger.error(f"Audit log retry buffer full, dropped {overflow} oldest entries")
+
+    def _write_held(self):
+        with self._held_lock:
+            if not self._held:
+                return
+            entries, self._held = self._held, []
+        if not self._write(entries):
+            with self._held_lock:
+                self._held[:0] = entries
+
+    def _write(self, entries: List[tuple]) -> bool:
+        """Write entries in one transaction; returns False (after logging) if it failed"""
+        with self._write_lock:
+            conn = None
+            try:
+                conn = self._connect()
+                conn.executemany('''
+                INSERT INTO admin_logs (admin_id, action, target_type, target_id, details, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', entries)
+                conn.commit()
+                self.stats['written'] += len(entries)
+                self.stats['batches'] += 1
+                return True
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Failed to write {len(entries)} audit log entries, will retry: {e}")
+                return False
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def query(self, admin_id: Optional[int] = None, target_type: Optional[str] = None,
+              target_id: Optional[int] = None, action: Optional[str] = None,
+              start: Optional[str] = None, end: Optional[str] = None,
+              limit: int = 100, offset: int = 0) -> List[Dict]:
+        """
+        Get audit entries, newest first.
+
+        start/end are 'YYYY-MM-DD[ HH:MM:SS]' bounds on created_at (end is
+        exclusive). Filters by admin or by target use the matching
+        (…, created_at) index, so results come back in index order.
+        """
+        clauses, params = [], []
+        if admin_id is not None:
+            clauses.append("admin_id = ?")
+            params.append(admin_id)
+        if target_type is not None:
+            clauses.append("target_type = ?")
+            params.append(target_type)
+        if target_id is not None:
+            clauses.append("target_id = ?")
+            params.append(target_id)
+        if action is not None:
+            clauses.append("action = ?")
+            params.append(action)
+        if start is not None:
+            clauses.append("created_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("created_at < ?")
+            params.append(end)
+
+        where_sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+        conn = query_metrics.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT id, admin_id, action, target_type, target_id, details, created_at
+        FROM admin_logs{where_sql}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ? OFFSET ?
+        ''', params + [limit, offset])
+
+        entries = []
+        for row in cursor.fetchall():
+            entries.append({
+                "id": row[0],
+                "admin_id": row[1],
+                "action": row[2],
+                "target_type": row[3],
+                "target_id": row[4],
+                "details": row[5],
+                "created_at": row[6]
+            })
+
+        conn.close()
+        return entries
+
+
+# Shared writers, one per database, flushed at interpreter exit
+_writers: Dict[str, AuditLogWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_audit_log(db_path: str = "veterans_admin.db") -> AuditLogWriter:
+    """Get the shared audit log writer for a database."""
+    with _writers_lock:
+        if db_path not in _writers:
+            _writers[db_path] = AuditLogWriter(db_path)
+            atexit.register(_writers[db_path].close)
+        return _writers[db_path]
@@ -0,0 +1,232 @@
+"""
+Veterans India AI Assistant - Admin Query Benchmarks
+===================================================
+Measures latency (p50/p95) and memory of every DatabaseManager /
+EnhancedDatabaseManager query path against seeded datasets of several
+sizes, and writes the results to JSON so runs can be diffed between
+commits.
+
+Usage:
+    python benchmark_admin_queries.py --profiles small medium --output bench.json
+    python benchmark_admin_queries.py --compare before.json after.json
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from typing import Dict, List, Callable
+
+from generate_demo_data import DATASET_PROFILES, generate_profile, manifest_path
+from data_cache import get_query_cache
+from password_hashing import get_password_hasher
+
+DEFAULT_PROFILES = ['small', 'medium']
+DEFAULT_ITERATIONS = 30
+REGRESSION_THRESHOLD = 0.20  # flag p95 increases above 20%
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def build_query_paths(db, user_ids: List[int], plan_ids: List[int]) -> Dict[str, Callable]:
+    """Every admin query path, as zero-argument callables"""
+    rng = random.Random(7)
+    user_count = len(user_ids)
+
+    def update_user():
+        db.update_user(rng.choice(user_ids), {'dealer_code': f"DLR{rng.randint(1000, 9999)}"})
+
+    def verify_admin_cold():
+        # A first login (or one after the cache TTL): a full scrypt derivation
+        get_password_hasher().clear_cache()
+        db.verify_admin("admin", "admin123")
+
+    return {
+        'get_all_users.first_page': lambda: db.get_all_users(limit=20, offset=0),
+        'get_all_users.deep_page': lambda: db.get_all_users(limit=20, offset=max(user_count - 20, 0)),
+        'get_user_count': db.get_user_count,
+        'get_user_by_id': lambda: db.get_user_by_id(rng.choice(user_ids)),
+        'get_all_plans': db.get_all_plans,
+        'verify_admin.cold': verify_admin_cold,
+        # Streamlit reruns of a logged-in session hit the verification cache
+        'verify_admin.warm': lambda: db.verify_admin("admin", "admin123"),
+        'get_dashboard_stats': db.get_dashboard_stats,
+        'get_subscription_analytics': db.get_subscription_analytics,
+        'query_subscriptions.all': lambda: db.query_subscriptions(),
+        'query_subscriptions.expiring_by_plan': lambda: db.query_subscriptions(
+            status="Expiring Soon", plan_id=rng.choice(plan_ids), sort="Username"),
+        'query_subscriptions.deep_page': lambda: db.query_subscriptions(page=10_000),
+        'update_user': update_user
+    }
+
+
+def measure(fn: Callable, iterations: int) -> Dict:
+    """Latency percentiles over iterations plus peak traced memory of one call"""
+    fn()  # warm the page cache and statement cache
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def prepare_dataset(profile: str, data_dir: str, rebuild: bool = False) -> str:
+    """Profile database path, generating it when missing or when its settings changed"""
+    db_path = os.path.join(data_dir, f"bench_{profile.replace('-', '_')}.db")
+    manifest_file = manifest_path(db_path)
+
+    if not rebuild and os.path.exists(db_path) and os.path.exists(manifest_file):
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        settings = dict(DATASET_PROFILES[profile])
+        if manifest['settings'] == json.loads(json.dumps(settings)):
+            return db_path
+
+    generate_profile(profile, db_path)
+    return db_path
+
+
+def benchmark_profile(profile: str, db_path: str, iterations: int) -> Dict:
+    from admin_dashboard_enhanced import EnhancedDatabaseManager
+
+    with open(manifest_path(db_path)) as f:
+        manifest = json.load(f)
+
+    # Writes (update_user) go to a scratch copy so the dataset keeps its checksum
+    work_path = db_path + ".work"
+    shutil.copyfile(db_path, work_path)
+    try:
+        db = EnhancedDatabaseManager(work_path)
+        # Time the query paths themselves: every cached read is a miss
+        get_query_cache(work_path).ttl_seconds = 0
+        conn = sqlite3.connect(work_path)
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+        plan_ids = [row[0] for row in conn.execute("SELECT id FROM plans")]
+        conn.close()
+
+        results = {}
+        for name, fn in build_query_paths(db, user_ids, plan_ids).items():
+            results[name] = measure(fn, iterations)
+            print(f"  {name:<42} p50 {results[name]['p50_ms']:>9.2f} ms   "
+                  f"p95 {results[name]['p95_ms']:>9.2f} ms   peak {results[name]['peak_kb']:>9.1f} KB")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(work_path + suffix):
+                os.remove(work_path + suffix)
+
+    return {
+        'users': manifest['checksums']['tables']['users']['rows'],
+        'dataset_sha256': manifest['checksums']['sha256'],
+        'queries': results
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def run_benchmarks(profiles: List[str], iterations: int, data_dir: str, rebuild: bool = False) -> Dict:
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'iterations': iterations,
+        'profiles': {}
+    }
+
+    for profile in profiles:
+        db_path = prepare_dataset(profile, data_dir, rebuild)
+        print(f"\n📊 {profile} ({DATASET_PROFILES[profile]['description']})")
+        report['profiles'][profile] = benchmark_profile(profile, db_path, iterations)
+
+    return report
+
+
+def compare_reports(before: Dict, after: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Print p95 changes between two reports; returns the regressed query paths"""
+    regressions = []
+    print(f"Comparing {before.get('commit')} → {after.get('commit')}")
+
+    for profile, result in after['profiles'].items():
+        old = before['profiles'].get(profile)
+        if not old:
+            continue
+        if old['dataset_sha256'] != result['dataset_sha256']:
+            print(f"⚠️  {profile}: dataset checksum differs, timings are not directly comparable")
+
+        print(f"\n{profile}")
+        for name, stats in result['queries'].items():
+            if name not in old['queries']:
+                continue
+            old_p95 = old['queries'][name]['p95_ms']
+            change = (stats['p95_ms'] - old_p95) / old_p95 if old_p95 else 0.0
+            marker = "❌" if change > threshold else ("✅" if change < -threshold else "  ")
+            print(f"  {marker} {name:<42} p95 {old_p95:>9.2f} → {stats['p95_ms']:>9.2f} ms ({change:+.0%})")
+            if change > threshold:
+                regressions.append(f"{profile}:{name}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark admin dashboard query paths")
+    parser.add_argument("--profiles", nargs="+", choices=list(DATASET_PROFILES), default=DEFAULT_PROFILES)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--data-dir", default=".", help="where profile databases are kept between runs")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate profile databases")
+    parser.add_argument("--output", default="bench_admin_queries.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        regressions = compare_reports(before, after)
+        sys.exit(1 if regressions else 0)
+
+    report = run_benchmarks(args.profiles, args.iterations, args.data_dir, args.rebuild)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Veterans India AI Assistant - Chat Rendering Benchmark
+=====================================================
+Measures how long a rerun of the chat history takes as the history
+grows, for the old one-element-per-message loop and for the block-cached
+ChatView (chat_view.py). Each rerun appends one message, as a chat turn
+does, and runs the script through Streamlit's AppTest harness so the
+timing includes building and serialising the page elements. Message ids
+are spaced as if other conversations were being written at the same
+time (--conversations), since ids are shared by every conversation.
+
+Usage:
+    python benchmark_chat_render.py --lengths 50 200 500 1000 --conversations 1 25 --output bench_chat_render.json
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import os
+import json
+import time
+import argparse
+import datetime
+import platform
+import statistics
+from typing import Dict, List
+
+from streamlit.testing.v1 import AppTest
+
+from benchmark_admin_queries import percentile, git_commit
+
+DEFAULT_LENGTHS = [50, 200, 500, 1000]
+DEFAULT_CONVERSATIONS = [1, 25]
+DEFAULT_ITERATIONS = 20
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The app's chat history loop before ChatView
+LEGACY_RENDER = '''
+for msg in st.session_state["messages"]:
+    role = msg["role"]
+    content = msg["content"]
+    timestamp = msg["time"]
+
+    if role == "user":
+        align = "right"
+        bubble_class = "chat-bubble user-bubble"
+    else:
+        align = "left"
+        bubble_class = "chat-bubble assistant-bubble"
+
+    st.markdown(
+        f"""
+        <div style='text-align: {align}; margin: 8px;'>
+            <div class='{bubble_class}'>
+                {content}
+            </div>
+            <div class='timestamp'>{timestamp}</div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+'''
+
+CHAT_VIEW_RENDER = '''
+from chat_view import ChatView
+if "chat_view" not in st.session_state:
+    st.session_state["chat_view"] = ChatView()
+st.session_state["chat_view"].render(st.session_state["messages"])
+'''
+
+SCRIPT = '''
+import sys
+sys.path.insert(0, {repo_dir!r})
+import streamlit as st
+from benchmark_chat_render import sample_message
+
+messages = st.session_state["messages"]
+messages.append(sample_message(len(messages) + 1, {conversations}))
+{render}
+'''
+
+
+def sample_message(seq: int, conversations: int = 1) -> Dict:
+    """
+    Message seq of a conversation, of typical length; odd ones are the
+    user's. Its id leaves room for messages written meanwhile by the other
+    conversations - 1 chats.
+    """
+    if seq % 2:
+        content = f"Question {seq}: how do I renew my ECHS card and update my pension details?"
+    else:
+        content = f"Answer {seq}: " + "Visit the nearest ECHS polyclinic with your PPO and discharge book. " * 6
+    return {'id': (seq - 1) * conversations + 1, 'seq': seq, 'role': "user" if seq % 2 else "assistant",
+            'content': content, 'time': "10:30"}
+
+
+def measure_rerun(render: str, length: int, iterations: int, conversations: int = 1) -> Dict:
+    """Rerun latency with length messages of history, one message added per rerun"""
+    app = AppTest.from_string(SCRIPT.format(repo_dir=REPO_DIR, render=render, conversations=conversations),
+                              default_timeout=60)
+    app.session_state["messages"] = [sample_message(i, conversations) for i in range(1, length)]
+    app.run()  # first render fills any caches, as the first page load would
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'iterations': iterations,
+        'elements': len(app.markdown),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'mean_ms': round(statistics.mean(samples), 3)
+    }
+
+
+def run_benchmarks(lengths: List[int], iterations: int, conversations: List[int]) -> Dict:
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'conversations': {}
+    }
+
+    for writers in conversations:
+        print(f"  {writers} conversation(s) writing")
+        report['conversations'][str(writers)] = {}
+        for length in lengths:
+            results = {'legacy': measure_rerun(LEGACY_RENDER, length, iterations, writers),
+                       'chat_view': measure_rerun(CHAT_VIEW_RENDER, length, iterations, writers)}
+            report['conversations'][str(writers)][str(length)] = results
+            print(f"  {length:>5} messages   legacy p50 {results['legacy']['p50_ms']:>9.2f} ms "
+                  f"({results['legacy']['elements']} elements)   "
+                  f"chat_view p50 {results['chat_view']['p50_ms']:>9.2f} ms "
+                  f"({results['chat_view']['elements']} elements)")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat history rerun time against history length")
+    parser.add_argument("--lengths", nargs="+", type=int, default=DEFAULT_LENGTHS)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--conversations", nargs="+", type=int, default=DEFAULT_CONVERSATIONS,
+                        help="conversations written at the same time (spaces out message ids)")
+    parser.add_argument("--output", default="bench_chat_render.json")
+    args = parser.parse_args()
+
+    print("\n💬 Chat history rerun time")
+    report = run_benchmarks(args.lengths, args.iterations, args.conversations)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Veterans India AI Assistant - Routing Benchmark
+==============================================
+Runs a labelled set of chat questions through the request router and
+through the keyword chain app.py used before it, and reports routing
+accuracy, router overhead and what the misrouted questions cost in
+answer latency. Per-route latencies are the medians from the routing log
+when one exists (routing_decisions.log, written by the app), otherwise
+rough defaults.
+
+Usage:
+    python benchmark_routing.py --log routing_decisions.log --output bench_routing.json
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import json
+import time
+import argparse
+import datetime
+import platform
+import collections
+from typing import Callable, Dict, List, Tuple
+
+from benchmark_admin_queries import percentile, git_commit
+from request_router import (RequestRouter, IDENTITY, ORG_KNOWLEDGE, DOCUMENT_QA, WEB_SEARCH, LLM,
+                            read_routing_log, route_latencies)
+
+DEFAULT_ITERATIONS = 200
+
+# Typical answer times on the reference laptop (llama3.2:1b, six-site web search)
+DEFAULT_ROUTE_LATENCY_MS = {IDENTITY: 5.0, ORG_KNOWLEDGE: 3500.0, DOCUMENT_QA: 4000.0,
+                            WEB_SEARCH: 14000.0, LLM: 3500.0}
+
+# (question, documents uploaded, expected route)
+LABELLED_QUESTIONS: List[Tuple[str, bool, str]] = [
+    ("Who are you?", False, IDENTITY),
+    ("What's your name", False, IDENTITY),
+    ("who created you and why", False, IDENTITY),
+    ("Are you a bot or a human?", False, IDENTITY),
+    ("What job openings do you have?", False, ORG_KNOWLEDGE),
+    ("Any vacancies for ex-JCOs at Veterans India?", False, ORG_KNOWLEDGE),
+    ("Are you hiring in Bengaluru?", False, ORG_KNOWLEDGE),
+    ("Tell me about your internship programs", False, ORG_KNOWLEDGE),
+    ("What stipend do your interns get?", False, ORG_KNOWLEDGE),
+    ("Show me the employee directory", False, ORG_KNOWLEDGE),
+    ("Who is the CEO of Veterans India?", False, ORG_KNOWLEDGE),
+    ("What is the phone number of your headquarters?", False, ORG_KNOWLEDGE),
+    ("When is the Mega Job Fair 2025?", False, ORG_KNOWLEDGE),
+    ("What services does Veterans India offer?", False, ORG_KNOWLEDGE),
+    ("Which department handles pension processing at Veterans India?", False, ORG_KNOWLEDGE),
+    ("What updates are there on the Digital Skills Bootcamp 2025?", False, ORG_KNOWLEDGE),
+    ("Summarise the uploaded document", True, DOCUMENT_QA),
+    ("What does page 3 of the PDF say about my service record?", True, DOCUMENT_QA),
+    ("What is the total pension in this sheet?", True, DOCUMENT_QA),
+    ("What is my date of discharge?", True, DOCUMENT_QA),
+    ("Which rows in the table have pending status?", True, DOCUMENT_QA),
+    ("What are the latest news on OROP revision?", False, WEB_SEARCH),
+    ("Search for today's ECHS notification", False, WEB_SEARCH),
+    ("Any breaking news about defence pensions this week?", False, WEB_SEARCH),
+    ("What is the current DA rate announced for pensioners in 2025?", False, WEB_SEARCH),
+    ("Latest headlines on the Agniveer scheme", False, WEB_SEARCH),
+    ("What's the weather in Pune right now?", False, WEB_SEARCH),
+    ("Look up recent circular on CSD canteen prices", False, WEB_SEARCH),
+    ("How do I update my address in my pension records?", False, LLM),
+    ("Explain the 2016 7th pay commission pension rules", False, LLM),
+    ("How can I apply for an ECHS card for my wife?", False, LLM),
+    ("Write a cover letter for a security supervisor role", False, LLM),
+    ("What benefits do war widows get?", False, LLM),
+    ("How to prepare for a corporate interview after retirement?", False, LLM),
+    ("Translate 'thank you for your service' into Hindi", False, LLM),
+    ("What is the difference between SPARSH and PCDA pension?", False, LLM),
+    ("Give me a 2025 study plan for a management course", False, LLM),
+    ("How do I update my resume with military experience?", False, LLM),
+    # Generic org words about other organisations, and document words with nothing uploaded
+    ("Any vacancies in CAPF for ex-servicemen?", False, LLM),
+    ("Which PSUs are hiring ex-servicemen?", False, LLM),
+    ("latest job openings in railways 2025", False, WEB_SEARCH),
+    ("Is there any internship for my son in DRDO?", False, LLM),
+    ("Who are the staff at the Kendriya Sainik Board?", False, LLM),
+    ("Who is the CEO of Infosys?", False, LLM),
+    ("How do I contact ECHS helpline?", False, LLM),
+    ("What does page 3 of Form 16 cover?", False, LLM),
+    ("Show me a table of pension rates by rank", False, LLM),
+]
+
+# Identity and search keywords of the old if/else chain in app.py
+LEGACY_IDENTITY_KEYWORDS = ["who are you", "what are you", "your name", "who developed you", "who created you",
+                            "what's your name"]
+LEGACY_SEARCH_KEYWORDS = ["search", "latest", "current", "recent", "news", "today", "2025", "update"]
+
+
+def legacy_route(text: str, has_documents: bool) -> str:
+    lowered = text.lower()
+    if any(keyword in lowered for keyword in LEGACY_IDENTITY_KEYWORDS):
+        return IDENTITY
+    if any(keyword in lowered for keyword in LEGACY_SEARCH_KEYWORDS):
+        return WEB_SEARCH
+    # The plain model path always included uploaded documents
+    return DOCUMENT_QA if has_documents else LLM
+
+
+def evaluate(route_fn: Callable[[str, bool], str], latencies: Dict[str, float]) -> Dict:
+    """Accuracy, confusion and the latency misrouted questions added (or saved at the cost of a worse answer)"""
+    confusion = collections.defaultdict(int)
+    misrouted = []
+    extra_ms = 0.0
+    for question, has_documents, expected in LABELLED_QUESTIONS:
+        chosen = route_fn(question, has_documents)
+        confusion[f"{expected}->{chosen}"] += 1
+        if chosen != expected:
+            cost = latencies[chosen] - latencies[expected]
+            extra_ms += max(cost, 0.0)
+            misrouted.append({'question': question, 'expected': expected, 'chosen': chosen,
+                              'latency_cost_ms': round(cost, 1)})
+    correct = len(LABELLED_QUESTIONS) - len(misrouted)
+    return {
+        'accuracy': round(correct / len(LABELLED_QUESTIONS), 3),
+        'misrouted': misrouted,
+        'extra_latency_ms': round(extra_ms, 1),
+        'extra_latency_per_question_ms': round(extra_ms / len(LABELLED_QUESTIONS), 1),
+        'confusion': dict(sorted(confusion.items()))
+    }
+
+
+def measure_overhead(router: RequestRouter, iterations: int) -> Dict:
+    samples = []
+    for _ in range(iterations):
+        for question, has_documents, _ in LABELLED_QUESTIONS:
+            started = time.perf_counter()
+            router.route(question, has_documents)
+            samples.append((time.perf_counter() - started) * 1_000_000)
+    return {'p50_us': round(percentile(samples, 50), 2), 'p95_us': round(percentile(samples, 95), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request routing accuracy and misrouting latency")
+    parser.add_argument("--log", default=None, help="routing log to take per-route latencies from")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--output", default="bench_routing.json")
+    args = parser.parse_args()
+
+    latencies = dict(DEFAULT_ROUTE_LATENCY_MS)
+    if args.log:
+        latencies.update(route_latencies(read_routing_log(args.log)))
+
+    router = RequestRouter(log_path=None)
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'questions': len(LABELLED_QUESTIONS),
+        'route_latency_ms': latencies,
+        'legacy': evaluate(legacy_route, latencies),
+        'router': evaluate(lambda text, has_documents: router.route(text, has_documents)['route'], latencies),
+        'router_overhead': measure_overhead(router, args.iterations)
+    }
+
+    print(f"\n🧭 Routing {report['questions']} labelled questions")
+    for name in ('legacy', 'router'):
+        result = report[name]
+        print(f"  {name:<8} accuracy {result['accuracy']:>6.1%}   misrouted {len(result['misrouted']):>3}   "
+              f"extra latency {result['extra_latency_per_question_ms']:>8.1f} ms/question")
+        for miss in result['misrouted']:
+            print(f"      {miss['expected']:>13} → {miss['chosen']:<13} {miss['question']}")
+    print(f"  router overhead p50 {report['router_overhead']['p50_us']} µs, "
+          f"p95 {report['router_overhead']['p95_us']} µs")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Veterans India AI Assistant - Chat View
+======================================
+Renders the chat history. Messages are grouped into fixed blocks by
+their position in the conversation and each block is emitted as one
+markdown element whose HTML is built once and cached, so a rerun sends a
+handful of elements that are identical to the last run except for the
+newest block, instead of re-formatting one element per message.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import itertools
+from typing import Dict, List, Tuple
+
+import streamlit as st
+
+# Messages per rendered block; only the block holding the newest messages changes
+BLOCK_MESSAGES = 20
+
+
+def bubble_html(role: str, content: str, timestamp: str) -> str:
+    """One chat bubble, unindented so markdown never reads it as a code block"""
+    if role == "user":
+        align, bubble_class = "right", "chat-bubble user-bubble"
+    else:
+        align, bubble_class = "left", "chat-bubble assistant-bubble"
+    return (f"<div style='text-align: {align}; margin: 8px;'><div class='{bubble_class}'>{content}</div>"
+            f"<div class='timestamp'>{timestamp}</div></div>")
+
+
+class ChatView:
+    """
+    Per-session cache of rendered history blocks.
+
+    Blocks follow each message's seq (its number within the conversation),
+    not its id, which is shared by every conversation and so would scatter
+    one conversation's messages over many blocks once several users chat
+    at the same time. Stored messages are immutable, so a block is
+    identified by its first and last message id; when a new message lands
+    in the last block that block is rebuilt and every other one is reused.
+    """
+
+    def __init__(self):
+        self._blocks: Dict[Tuple[int, int], str] = {}
+        self.stats = {'hits': 0, 'built': 0}
+
+    def blocks(self, messages: List[Dict]) -> List[str]:
+        """HTML for each block of messages, oldest first"""
+        html_blocks = []
+        used = {}
+        for _, group in itertools.groupby(messages, key=lambda message: (message['seq'] - 1) // BLOCK_MESSAGES):
+            group = list(group)
+            key = (group[0]['id'], group[-1]['id'])
+            html = self._blocks.get(key)
+            if html is None:
+                html = "\n".join(bubble_html(message['role'], message['content'], message['time'])
+                                 for message in group)
+                self.stats['built'] += 1
+            else:
+                self.stats['hits'] += 1
+            used[key] = html
+            html_blocks.append(html)
+        # Keep only what this render used, so the cache follows the visible window
+        self._blocks = used
+        return html_blocks
+
+    def render(self, messages: List[Dict]):
+        for html in self.blocks(messages):
+            st.markdown(html, unsafe_allow_html=True)
@@ -0,0 +1,200 @@
+"""
+Veterans India AI Assistant - Conversation Memory
+================================================
+Chat history for prompts: a token-bounded window of the most recent turns
+plus a rolling summary of everything older. The summary is brought up to
+date in the background after each reply, so follow-up questions keep
+their context while the prompt stays roughly the same size however long
+the conversation runs.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from conversation_store import ConversationStore, get_conversation_store
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Prompt budget for recent turns and for the summary of older ones
+HISTORY_TOKENS = 1200
+SUMMARY_TOKENS = 250
+# Upper bound on messages read for the window, however short they are
+MAX_WINDOW_MESSAGES = 40
+# Older messages are folded into the summary once at least this many are
+# waiting (one LLM call per couple of turns rather than every turn) and at
+# most this many per call
+SUMMARY_MIN_MESSAGES = 4
+SUMMARY_BATCH_MESSAGES = 20
+
+Summarizer = Callable[[str], str]
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and the Veterans India AI Assistant.
+Keep the facts the user gave about themselves (service, rank, location, needs), what they asked and the answers given.
+Write at most {words} words of plain prose and reply with the summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def format_messages(messages: List[Dict]) -> str:
+    return "\n".join(f"{ROLE_LABELS.get(message['role'], message['role'])}: {message['content']}"
+                     for message in messages)
+
+
+def extractive_summary(summary: str, messages: List[Dict], max_tokens: int = SUMMARY_TOKENS) -> str:
+    """Fallback without a model: the user's questions, newest kept when space runs out"""
+    questions = [message['content'].strip().split("\n")[0][:160] for message in messages if message['role'] == "user"]
+    text = " ".join(part for part in [summary] + [f"User asked: {question}" for question in questions] if part)
+    max_chars = max_tokens * 4
+    return text[-max_chars:].lstrip() if len(text) > max_chars else text
+
+
+class ConversationMemory:
+    """
+    Builds the history part of a prompt for a stored conversation.
+
+    context() returns the summary and the newest turns that fit in
+    HISTORY_TOKENS; both are read from the conversation store, so any
+    session (or a restarted server) sees the same memory. after_reply()
+    queues the summary update on a single background thread; a
+    conversation is never queued twice (a reply arriving during its update
+    marks it dirty, and the update runs again before finishing), and turns
+    that have left the window but are not yet summarised are simply left
+    out meanwhile.
+    """
+
+    def __init__(self, store: ConversationStore, history_tokens: int = HISTORY_TOKENS,
+                 summary_tokens: int = SUMMARY_TOKENS):
+        self.store = store
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.stats = {'summaries': 0, 'failed': 0}
+
+        self._pending = set()
+        # Pending conversations that got another reply since their update started
+        self._dirty: Dict[str, Optional[Summarizer]] = {}
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-summary")
+
+    def context(self, conversation_id: Optional[str], before_id: Optional[int] = None) -> Tuple[str, List[Dict]]:
+        """(summary, recent messages oldest first) for messages before before_id"""
+        if not conversation_id:
+            return "", []
+        summary, through_id = self.store.get_summary(conversation_id)
+        return summary, self._window(conversation_id, before_id, through_id)
+
+    def prompt_history(self, conversation_id: Optional[str], before_id: Optional[int] = None) -> str:
+        """The conversation so far, formatted for the prompt ("" for a new conversation)"""
+        summary, messages = self.context(conversation_id, before_id)
+        parts = []
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if messages:
+            parts.append(f"Recent conversation:\n{format_messages(messages)}")
+        return "\n\n".join(parts)
+
+    def after_reply(self, conversation_id: Optional[str], summarize: Optional[Summarizer] = None):
+        """Queue a summary update for the conversation; returns immediately"""
+        if not conversation_id:
+            return
+        with self._pending_lock:
+            if conversation_id in self._pending:
+                self._dirty[conversation_id] = summarize
+                return
+            self._pending.add(conversation_id)
+        self._executor.submit(self._update_summary, conversation_id, summarize)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _window(self, conversation_id: str, before_id: Optional[int], through_id: int) -> List[Dict]:
+        """Newest messages after through_id that fit in the token budget"""
+        if before_id is None:
+            candidates = self.store.recent_messages(conversation_id, MAX_WINDOW_MESSAGES)
+        else:
+            candidates = self.store.messages_before(conversation_id, before_id, MAX_WINDOW_MESSAGES)
+        window = []
+        used = 0
+        for message in reversed(candidates):
+            if message['id'] <= through_id:
+                break
+            used += estimate_tokens(message['content']) + 2
+            if used > self.history_tokens and window:
+                break
+            window.append(message)
+        window.reverse()
+        return window
+
+    def _update_summary(self, conversation_id: str, summarize: Optional[Summarizer]):
+        while True:
+            self._fold_older_messages(conversation_id, summarize)
+            with self._pending_lock:
+                if conversation_id not in self._dirty:
+                    self._pending.discard(conversation_id)
+                    return
+                summarize = self._dirty.pop(conversation_id)
+
+    def _fold_older_messages(self, conversation_id: str, summarize: Optional[Summarizer]):
+        try:
+            summary, through_id = self.store.get_summary(conversation_id)
+            while True:
+                window = self._window(conversation_id, None, through_id)
+                if not window:
+                    break
+                older = self.store.messages_between(conversation_id, through_id, window[0]['id'],
+                                                    SUMMARY_BATCH_MESSAGES)
+                if len(older) < SUMMARY_MIN_MESSAGES:
+                    break
+                summary = self._summarize(summary, older, summarize)
+                through_id = older[-1]['id']
+                self.store.save_summary(conversation_id, summary, through_id)
+                self.stats['summaries'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"Summary update for conversation {conversation_id[:12]} failed: {e}")
+
+    def _summarize(self, summary: str, messages: List[Dict], summarize: Optional[Summarizer]) -> str:
+        if summarize is not None:
+            try:
+                prompt = SUMMARY_PROMPT.format(words=self.summary_tokens * 3 // 4, summary=summary or "(none)",
+                                               messages=format_messages(messages))
+                text = (summarize(prompt) or "").strip()
+                if text:
+                    # Models overshoot the word limit; the budget is what matters
+                    return text[:self.summary_tokens * 4]
+            except Exception as e:
+                logger.warning(f"Model summary failed, using extractive summary: {e}")
+        return extractive_summary(summary, messages, self.summary_tokens)
+
+
+# Shared memory, so summary updates for all sessions go through one thread
+_memory: Optional[ConversationMemory] = None
+_memory_lock = threading.Lock()
+
+def get_conversation_memory() -> ConversationMemory:
+    """Get the shared conversation memory for the shared conversation store."""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = ConversationMemory(get_conversation_store())
+            atexit.register(_memory.shutdown)
+        return _memory
@@ -0,0 +1,211 @@
+"""
+Veterans India AI Assistant - Conversation Store
+===============================================
+Persists chat conversations in SQLite (WAL) so they survive restarts and
+do not have to live in session memory. Messages are append-only; the chat
+page keeps only the most recent turns in session state and pages older
+ones in from here when asked.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import uuid
+import sqlite3
+import logging
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+import query_metrics
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONVERSATION_DB = "conversations.db"
+
+
+def _message(row) -> Dict:
+    message_id, seq, role, content, created_at = row
+    return {"id": message_id, "seq": seq, "role": role, "content": content, "time": created_at[11:16],
+            "created_at": created_at}
+
+
+class ConversationStore:
+    """
+    Append-only message log per conversation.
+
+    Messages are read newest-first through the (conversation_id, id)
+    index, so fetching the last N turns or the page before a given
+    message costs the same however long the conversation is. ids are
+    shared by all conversations; seq numbers a conversation's own
+    messages from 1.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CONVERSATION_DB):
+        self.db_path = db_path
+        self.init_tables()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = query_metrics.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def init_tables(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversations (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id TEXT NOT NULL REFERENCES conversations (id),
+            seq INTEGER,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id)")
+        # Databases from before seq: number existing messages within their conversation
+        cursor.execute("PRAGMA table_info(messages)")
+        if 'seq' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE messages ADD COLUMN seq INTEGER")
+            cursor.execute('''
+            UPDATE messages SET seq = (SELECT COUNT(*) FROM messages earlier
+                                       WHERE earlier.conversation_id = messages.conversation_id
+                                       AND earlier.id <= messages.id)
+            ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            conversation_id TEXT PRIMARY KEY REFERENCES conversations (id),
+            summary TEXT NOT NULL,
+            through_message_id INTEGER NOT NULL,
+            updated_at TIMESTAMP
+        )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def create_conversation(self, user_id: Optional[int] = None) -> str:
+        conversation_id = uuid.uuid4().hex
+        now = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        conn = self._connect()
+        try:
+            conn.execute("INSERT INTO conversations (id, user_id, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                         (conversation_id, user_id, now, now))
+            conn.commit()
+        finally:
+            conn.close()
+        return conversation_id
+
+    def exists(self, conversation_id: str) -> bool:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def append_message(self, conversation_id: str, role: str, content: str) -> Dict:
+        """Add a message to the end of a conversation; returns it as the read methods do"""
+        now = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            row = cursor.execute("SELECT seq FROM messages WHERE conversation_id = ? ORDER BY id DESC LIMIT 1",
+                                 (conversation_id,)).fetchone()
+            seq = row[0] + 1 if row else 1
+            cursor.execute('''
+            INSERT INTO messages (conversation_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)
+            ''', (conversation_id, seq, role, content, now))
+            message_id = cursor.lastrowid
+            cursor.execute("UPDATE conversations SET updated_at = ? WHERE id = ?", (now, conversation_id))
+            conn.commit()
+        finally:
+            conn.close()
+        return _message((message_id, seq, role, content, now))
+
+    def recent_messages(self, conversation_id: str, limit: int) -> List[Dict]:
+        """The last limit messages, oldest first"""
+        return self._page(conversation_id, None, limit)
+
+    def messages_before(self, conversation_id: str, before_id: int, limit: int) -> List[Dict]:
+        """Up to limit messages older than before_id, oldest first"""
+        return self._page(conversation_id, before_id, limit)
+
+    def messages_between(self, conversation_id: str, after_id: int, before_id: int, limit: int) -> List[Dict]:
+        """Up to limit messages with after_id < id < before_id, oldest first"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT id, seq, role, content, created_at FROM messages
+            WHERE conversation_id = ? AND id > ? AND id < ?
+            ORDER BY id LIMIT ?
+            ''', (conversation_id, after_id, before_id, limit))
+            return [_message(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def get_summary(self, conversation_id: str) -> Tuple[str, int]:
+        """(summary, id of the last message it covers); ("", 0) before the first summary"""
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+            SELECT summary, through_message_id FROM conversation_summaries WHERE conversation_id = ?
+            ''', (conversation_id,)).fetchone()
+            return (row[0], row[1]) if row else ("", 0)
+        finally:
+            conn.close()
+
+    def save_summary(self, conversation_id: str, summary: str, through_message_id: int):
+        now = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        conn = self._connect()
+        try:
+            conn.execute('''
+            INSERT OR REPLACE INTO conversation_summaries (conversation_id, summary, through_message_id, updated_at)
+            VALUES (?, ?, ?, ?)
+            ''', (conversation_id, summary, through_message_id, now))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def count_messages(self, conversation_id: str) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM messages WHERE conversation_id = ?",
+                                (conversation_id,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _page(self, conversation_id: str, before_id: Optional[int], limit: int) -> List[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT id, seq, role, content, created_at FROM messages
+            WHERE conversation_id = ? AND id < ?
+            ORDER BY id DESC LIMIT ?
+            ''', (conversation_id, before_id if before_id is not None else 2 ** 63 - 1, limit))
+            return [_message(row) for row in reversed(cursor.fetchall())]
+        finally:
+            conn.close()
+
+
+# Shared store, one per database
+_stores: Dict[str, ConversationStore] = {}
+_stores_lock = threading.Lock()
+
+def get_conversation_store(db_path: str = DEFAULT_CONVERSATION_DB) -> ConversationStore:
+    """Get the shared conversation store for a database."""
+    with _stores_lock:
+        if db_path not in _stores:
+            _stores[db_path] = ConversationStore(db_path)
+        return _stores[db_path]
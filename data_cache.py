@@ -0,0 +1,145 @@
+"""
+Veterans India AI Assistant - Query Result Cache
+===============================================
+Process-wide cache for admin database reads so Streamlit reruns are
+served from memory. Entries are keyed by query method and arguments and
+carry tags (e.g. 'users', 'user:42', 'plans'); writes invalidate their
+tags, dropping exactly the entries that depend on the changed rows.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import copy
+import time
+import threading
+import functools
+import collections
+from typing import Any, Callable, Dict, List, Union
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 512
+
+# A tag is a fixed string or a function of the decorated method's arguments
+# returning one tag or a list of them
+Tag = Union[str, Callable[..., Union[str, List[str]]]]
+
+
+class QueryCache:
+    """
+    LRU cache with tag-based invalidation. The TTL only bounds staleness
+    from writers outside this process; in-process writes invalidate
+    immediately. Values are deep-copied on the way out, so callers may
+    mutate what they get back.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'invalidated': 0}
+        self._entries: "collections.OrderedDict[tuple, tuple]" = collections.OrderedDict()
+        self._tags: Dict[str, set] = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation so a load that raced a write is not stored
+        self._generation = 0
+
+    def get_or_load(self, key: tuple, tags: tuple, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return copy.deepcopy(entry[1])
+            self.stats['misses'] += 1
+            generation = self._generation
+
+        # Load outside the lock; a concurrent miss on the same key just loads twice
+        value = loader()
+
+        with self._lock:
+            if generation != self._generation:
+                return copy.deepcopy(value)
+            self._drop(key)
+            self._entries[key] = (now + self.ttl_seconds, value, tags)
+            for tag in tags:
+                self._tags[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        return copy.deepcopy(value)
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    if self._drop(key):
+                        self.stats['invalidated'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, key: tuple) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+
+def _resolve_tags(tags, args, kwargs) -> tuple:
+    resolved = []
+    for tag in tags:
+        value = tag(*args, **kwargs) if callable(tag) else tag
+        resolved.extend(value if isinstance(value, (list, tuple)) else [value])
+    return tuple(resolved)
+
+
+def cached_query(*tags: Tag):
+    """Cache a DatabaseManager read method in its database's QueryCache"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (method.__qualname__, args, tuple(sorted(kwargs.items())))
+            return get_query_cache(self.db_path).get_or_load(
+                key, _resolve_tags(tags, (self,) + args, kwargs),
+                lambda: method(self, *args, **kwargs))
+        wrapper.uncached = method
+        return wrapper
+    return decorator
+
+
+def invalidates(*tags: Tag):
+    """Invalidate tags after a DatabaseManager write method runs (even if it fails)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                get_query_cache(self.db_path).invalidate(*_resolve_tags(tags, (self,) + args, kwargs))
+        return wrapper
+    return decorator
+
+
+# Shared caches, one per database
+_caches: Dict[str, QueryCache] = {}
+_caches_lock = threading.Lock()
+
+def get_query_cache(db_path: str = "veterans_admin.db") -> QueryCache:
+    """Get the shared query cache for a database."""
+    with _caches_lock:
+        if db_path not in _caches:
+            _caches[db_path] = QueryCache()
+        return _caches[db_path]
@@ -0,0 +1,233 @@
+"""
+Veterans India AI Assistant - Streaming Data Export
+==================================================
+Streams admin database query results to CSV, gzip CSV or Parquet in
+fixed-size chunks, so exports of millions of rows run in bounded memory.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import os
+import csv
+import gzip
+import atexit
+import tempfile
+import threading
+import time
+import logging
+from typing import Optional, Dict, List, Iterator, Tuple
+import query_metrics
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Exportable datasets: SQL (users aliased as u) and column types for Parquet
+EXPORT_DATASETS = {
+    'users': {
+        'label': "Users",
+        'query': '''
+        SELECT u.id, u.username, u.email, u.dealer_code, u.device_limit,
+               u.current_devices, u.subscription_status, u.created_at, u.updated_at
+        FROM users u
+        ''',
+        'columns': [
+            ('id', 'int'), ('username', 'str'), ('email', 'str'), ('dealer_code', 'str'),
+            ('device_limit', 'int'), ('current_devices', 'int'),
+            ('subscription_status', 'str'), ('created_at', 'str'), ('updated_at', 'str')
+        ]
+    },
+    'subscriptions': {
+        'label': "Subscriptions",
+        'query': '''
+        SELECT u.id, u.username, u.email, p.plan_name, p.price, u.subscription_status,
+               u.subscription_start, u.subscription_end, u.dealer_code
+        FROM users u
+        LEFT JOIN plans p ON u.plan_id = p.id
+        ''',
+        'columns': [
+            ('user_id', 'int'), ('username', 'str'), ('email', 'str'), ('plan_name', 'str'),
+            ('price', 'float'), ('subscription_status', 'str'), ('subscription_start', 'str'),
+            ('subscription_end', 'str'), ('dealer_code', 'str')
+        ]
+    },
+    'subscription_history': {
+        'label': "Subscription History",
+        'query': '''
+        SELECT h.id, h.user_id, u.username, p.plan_name, h.action, h.start_date,
+               h.end_date, h.amount, h.created_at
+        FROM subscription_history h
+        LEFT JOIN users u ON h.user_id = u.id
+        LEFT JOIN plans p ON h.plan_id = p.id
+        ''',
+        'columns': [
+            ('id', 'int'), ('user_id', 'int'), ('username', 'str'), ('plan_name', 'str'),
+            ('action', 'str'), ('start_date', 'str'), ('end_date', 'str'),
+            ('amount', 'float'), ('created_at', 'str')
+        ]
+    }
+}
+
+EXPORT_FORMATS = {
+    'csv': {'label': "CSV", 'extension': ".csv", 'mime': "text/csv"},
+    'csv.gz': {'label': "CSV (gzip)", 'extension': ".csv.gz", 'mime': "application/gzip"},
+    'parquet': {'label': "Parquet", 'extension': ".parquet", 'mime': "application/vnd.apache.parquet"}
+}
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Temporary export files not yet downloaded, removed at exit at the latest
+_temp_exports = set()
+_temp_exports_lock = threading.Lock()
+
+
+class StreamingExporter:
+    """
+    Exports a dataset by pulling fetchmany() chunks from SQLite and writing
+    each chunk straight to the output file. At most one chunk of rows is
+    held in memory at a time, regardless of table size.
+    """
+
+    def __init__(self, db_path: str = "veterans_admin.db", chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self, dataset: str, where: Optional[str] = None,
+                    params: Tuple = ()) -> Iterator[List[tuple]]:
+        """Yield lists of up to chunk_size rows for a dataset"""
+        spec = EXPORT_DATASETS[dataset]
+        query = spec['query'] + (f" WHERE {where}" if where else "")
+
+        conn = query_metrics.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def export_to_file(self, dataset: str, path: str, fmt: str = 'csv',
+                       where: Optional[str] = None, params: Tuple = ()) -> Dict:
+        """Stream a dataset into path; returns row count, size and throughput"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        started = time.perf_counter()
+        chunks = self.iter_chunks(dataset, where, params)
+
+        if fmt == 'parquet':
+            rows = self._write_parquet(dataset, chunks, path)
+        else:
+            rows = self._write_csv(dataset, chunks, path, compress=(fmt == 'csv.gz'))
+
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(path)
+        stats = {
+            'dataset': dataset,
+            'format': fmt,
+            'path': path,
+            'rows': rows,
+            'bytes': size,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(rows / elapsed) if elapsed else 0,
+            'mb_per_sec': round(size / elapsed / 1_000_000, 2) if elapsed else 0
+        }
+        logger.info(f"Exported {rows} {dataset} rows to {path} in {elapsed:.2f}s "
+                    f"({stats['rows_per_sec']} rows/sec)")
+        return stats
+
+    def export_to_tempfile(self, dataset: str, fmt: str = 'csv',
+                           where: Optional[str] = None, params: Tuple = ()) -> Dict:
+        """
+        Export into a new temporary file (for download buttons). Hand it out
+        with take_export(), or drop it with discard_export().
+        """
+        fd, path = tempfile.mkstemp(prefix=f"veterans_{dataset}_", suffix=EXPORT_FORMATS[fmt]['extension'])
+        os.close(fd)
+        try:
+            stats = self.export_to_file(dataset, path, fmt, where, params)
+        except Exception:
+            os.remove(path)
+            raise
+        with _temp_exports_lock:
+            _temp_exports.add(path)
+        return stats
+
+    def _write_csv(self, dataset: str, chunks: Iterator[List[tuple]], path: str, compress: bool) -> int:
+        header = [name for name, _ in EXPORT_DATASETS[dataset]['columns']]
+        opener = gzip.open if compress else open
+        rows = 0
+
+        with opener(path, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for chunk in chunks:
+                writer.writerows(chunk)
+                rows += len(chunk)
+        return rows
+
+    def _write_parquet(self, dataset: str, chunks: Iterator[List[tuple]], path: str) -> int:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        arrow_types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string()}
+        columns = EXPORT_DATASETS[dataset]['columns']
+        schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+        rows = 0
+
+        # One row group per chunk keeps the writer's buffer bounded
+        with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+            for chunk in chunks:
+                arrays = [pa.array(values, type=schema.field(i).type)
+                          for i, values in enumerate(zip(*chunk))]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                rows += len(chunk)
+        return rows
+
+
+def take_export(path: str) -> bytes:
+    """Read a temporary export for download and remove the file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    discard_export(path)
+    return data
+
+
+def discard_export(path: str):
+    """Remove a temporary export if it is still there"""
+    with _temp_exports_lock:
+        _temp_exports.discard(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@atexit.register
+def _remove_temp_exports():
+    for path in list(_temp_exports):
+        discard_export(path)
+
+
+if __name__ == "__main__":
+    # Export a dataset from the local admin database
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream admin data to CSV/Parquet")
+    parser.add_argument("dataset", choices=list(EXPORT_DATASETS))
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default='csv')
+    parser.add_argument("--db", default="veterans_admin.db")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    stats = StreamingExporter(args.db, args.chunk_size).export_to_file(args.dataset, args.output, args.format)
+    print(f"{stats['rows']:,} rows, {stats['bytes'] / 1_000_000:.1f} MB in {stats['seconds']}s "
+          f"({stats['rows_per_sec']:,} rows/sec, {stats['mb_per_sec']} MB/s)")
@@ -0,0 +1,288 @@
+"""
+Veterans India AI Assistant - Device Registry
+============================================
+Registers and removes user devices. SQLite triggers enforce each user's
+device_limit and keep users.current_devices equal to their number of
+active user_devices rows, so the limit holds for every writer and the
+counter can be read without counting. Device check-ins are coalesced in
+memory and flushed in one transaction per interval.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import sqlite3
+import datetime
+import atexit
+import logging
+import threading
+from typing import Optional, Dict, List
+import query_metrics
+from data_cache import get_query_cache
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEVICE_LIMIT_ERROR = "device limit reached"
+DEFAULT_CHECKIN_FLUSH_INTERVAL = 5.0
+
+# Limit checks run inside the inserting/reactivating statement, so two
+# concurrent registrations can never both take the last slot. The insert
+# check skips existing device ids: an upsert of a known device is handled
+# by the update triggers
+DEVICE_TRIGGERS = {
+    'trg_user_devices_limit_insert': f'''
+    CREATE TRIGGER IF NOT EXISTS trg_user_devices_limit_insert
+    BEFORE INSERT ON user_devices
+    WHEN NEW.is_active = 1
+     AND (SELECT current_devices >= device_limit FROM users WHERE id = NEW.user_id)
+     AND NOT EXISTS (SELECT 1 FROM user_devices WHERE device_id = NEW.device_id)
+    BEGIN
+        SELECT RAISE(ABORT, '{DEVICE_LIMIT_ERROR}');
+    END
+    ''',
+    'trg_user_devices_limit_update': f'''
+    CREATE TRIGGER IF NOT EXISTS trg_user_devices_limit_update
+    BEFORE UPDATE OF is_active, user_id ON user_devices
+    WHEN NEW.is_active = 1 AND (OLD.is_active = 0 OR OLD.user_id != NEW.user_id)
+     AND (SELECT current_devices >= device_limit FROM users WHERE id = NEW.user_id)
+    BEGIN
+        SELECT RAISE(ABORT, '{DEVICE_LIMIT_ERROR}');
+    END
+    ''',
+    'trg_user_devices_count_insert': '''
+    CREATE TRIGGER IF NOT EXISTS trg_user_devices_count_insert
+    AFTER INSERT ON user_devices
+    WHEN NEW.is_active = 1
+    BEGIN
+        UPDATE users SET current_devices = current_devices + 1 WHERE id = NEW.user_id;
+    END
+    ''',
+    'trg_user_devices_count_delete': '''
+    CREATE TRIGGER IF NOT EXISTS trg_user_devices_count_delete
+    AFTER DELETE ON user_devices
+    WHEN OLD.is_active = 1
+    BEGIN
+        UPDATE users SET current_devices = current_devices - 1 WHERE id = OLD.user_id;
+    END
+    ''',
+    'trg_user_devices_count_update': '''
+    CREATE TRIGGER IF NOT EXISTS trg_user_devices_count_update
+    AFTER UPDATE OF is_active, user_id ON user_devices
+    BEGIN
+        UPDATE users SET current_devices = current_devices - 1 WHERE id = OLD.user_id AND OLD.is_active = 1;
+        UPDATE users SET current_devices = current_devices + 1 WHERE id = NEW.user_id AND NEW.is_active = 1;
+    END
+    '''
+}
+
+
+def resync_device_counters(cursor):
+    """Recompute every users.current_devices from the active user_devices rows"""
+    cursor.execute('''
+    UPDATE users SET current_devices = (
+        SELECT COUNT(*) FROM user_devices d WHERE d.user_id = users.id AND d.is_active = 1
+    )
+    ''')
+
+
+def init_device_schema(cursor):
+    """Create user_devices, its lookup index and the counter/limit triggers (idempotent)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_devices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        device_name TEXT,
+        device_type TEXT,
+        device_id TEXT UNIQUE,
+        last_active TIMESTAMP,
+        is_active BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_devices_user_active ON user_devices (user_id, is_active)")
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'user_devices'")
+    existing = {row[0] for row in cursor.fetchall()}
+    if existing >= set(DEVICE_TRIGGERS):
+        return
+
+    for sql in DEVICE_TRIGGERS.values():
+        cursor.execute(sql)
+    # Counters were hand-edited before the triggers existed
+    resync_device_counters(cursor)
+
+
+class DeviceRegistry:
+    """
+    Device registration API plus a coalescing check-in buffer.
+
+    register_device/remove_device are single short transactions; the
+    triggers do the limit check and counter update inside them.
+    check_in() only records the latest timestamp per device in memory;
+    a background thread writes all pending check-ins with one executemany
+    every flush_interval seconds, so thousands of check-ins per minute
+    cost one brief write lock per interval instead of one per check-in.
+    """
+
+    def __init__(self, db_path: str = "veterans_admin.db",
+                 flush_interval: float = DEFAULT_CHECKIN_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.stats = {'check_ins': 0, 'flushed': 0, 'flushes': 0}
+
+        self._pending_check_ins: Dict[str, str] = {}
+        self._check_in_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.init_tables()
+
+        self._thread = threading.Thread(target=self._run, name="device-check-ins", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = query_metrics.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def init_tables(self):
+        conn = self._connect()
+        init_device_schema(conn.cursor())
+        conn.commit()
+        conn.close()
+
+    def register_device(self, user_id: int, device_id: str, device_name: str = None,
+                        device_type: str = None) -> Dict:
+        """
+        Register (or reactivate) a device for a user.
+
+        Returns {'registered': bool, 'reason': str or None}; reason is
+        'limit_reached' when the user has no free device slot and
+        'owned_by_other_user' when the device id belongs to someone else.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT user_id FROM user_devices WHERE device_id = ?", (device_id,))
+            row = cursor.fetchone()
+            if row and row[0] != user_id:
+                conn.rollback()
+                return {'registered': False, 'reason': 'owned_by_other_user'}
+
+            cursor.execute('''
+            INSERT INTO user_devices (user_id, device_name, device_type, device_id, last_active, is_active)
+            VALUES (?, ?, ?, ?, ?, 1)
+            ON CONFLICT (device_id) DO UPDATE SET
+                is_active = 1,
+                last_active = excluded.last_active,
+                device_name = COALESCE(excluded.device_name, device_name),
+                device_type = COALESCE(excluded.device_type, device_type)
+            ''', (user_id, device_name, device_type, device_id, now))
+            conn.commit()
+            return {'registered': True, 'reason': None}
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            if DEVICE_LIMIT_ERROR in str(e):
+                return {'registered': False, 'reason': 'limit_reached'}
+            raise
+        finally:
+            conn.close()
+            get_query_cache(self.db_path).invalidate('users', f"user:{user_id}")
+
+    def remove_device(self, user_id: int, device_id: str) -> bool:
+        """Delete a user's device; returns False if it was not registered to them"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM user_devices WHERE user_id = ? AND device_id = ?", (user_id, device_id))
+            removed = cursor.rowcount == 1
+            conn.commit()
+        finally:
+            conn.close()
+
+        with self._check_in_lock:
+            self._pending_check_ins.pop(device_id, None)
+        get_query_cache(self.db_path).invalidate('users', f"user:{user_id}")
+        return removed
+
+    def list_devices(self, user_id: int) -> List[Dict]:
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT device_id, device_name, device_type, last_active, is_active, created_at
+        FROM user_devices WHERE user_id = ?
+        ORDER BY is_active DESC, last_active DESC
+        ''', (user_id,))
+        devices = [{
+            "device_id": row[0],
+            "device_name": row[1],
+            "device_type": row[2],
+            "last_active": row[3],
+            "is_active": bool(row[4]),
+            "created_at": row[5]
+        } for row in cursor.fetchall()]
+        conn.close()
+        return devices
+
+    def check_in(self, device_id: str, at: Optional[str] = None):
+        """Record device activity; written on the next flush"""
+        at = at or datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._check_in_lock:
+            # Later check-ins for the same device supersede earlier ones
+            if at > self._pending_check_ins.get(device_id, ""):
+                self._pending_check_ins[device_id] = at
+            self.stats['check_ins'] += 1
+
+    def flush_check_ins(self) -> int:
+        """Write pending check-ins now; returns the number of devices updated"""
+        with self._flush_lock:
+            with self._check_in_lock:
+                pending, self._pending_check_ins = self._pending_check_ins, {}
+            if not pending:
+                return 0
+
+            conn = self._connect()
+            try:
+                conn.executemany("UPDATE user_devices SET last_active = ? WHERE device_id = ?",
+                                 [(at, device_id) for device_id, at in pending.items()])
+                conn.commit()
+                self.stats['flushed'] += len(pending)
+                self.stats['flushes'] += 1
+            except sqlite3.Error as e:
+                logger.error(f"Failed to flush {len(pending)} device check-ins: {e}")
+                # Put them back unless newer check-ins arrived meanwhile
+                with self._check_in_lock:
+                    for device_id, at in pending.items():
+                        if at > self._pending_check_ins.get(device_id, ""):
+                            self._pending_check_ins[device_id] = at
+                return 0
+            finally:
+                conn.close()
+            return len(pending)
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+        self.flush_check_ins()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush_check_ins()
+
+
+# Shared registries, one per database
+_registries: Dict[str, DeviceRegistry] = {}
+_registries_lock = threading.Lock()
+
+def get_device_registry(db_path: str = "veterans_admin.db") -> DeviceRegistry:
+    """Get the shared device registry for a database."""
+    with _registries_lock:
+        if db_path not in _registries:
+            _registries[db_path] = DeviceRegistry(db_path)
+            atexit.register(_registries[db_path].close)
+        return _registries[db_path]
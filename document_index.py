@@ -0,0 +1,145 @@
+"""
+Veterans India AI Assistant - Document Chunk Index
+=================================================
+Splits uploaded documents into overlapping passages and indexes them with
+BM25 so each chat question pulls in only the few passages that match it.
+Search touches just the posting lists of the question's terms, so prompt
+size and answer latency stay flat however large the documents are.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import re
+import math
+import heapq
+import collections
+from typing import Dict, Iterable, List, Optional
+
+# Bump when chunking or tokenization changes so stored chunks are rebuilt
+CHUNKER_VERSION = 1
+
+CHUNK_WORDS = 180
+CHUNK_OVERLAP_WORDS = 40
+DEFAULT_TOP_K = 4
+# Query terms found in more than this share of chunks are skipped when the
+# query has rarer terms: their IDF is too low to change the ranking, and
+# their posting lists are the ones that grow with document size
+COMMON_TERM_RATIO = 0.5
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have i in is it its me my of on or our please
+so than that the their them there these this to was we were what when where which
+who will with you your can do does how about tell
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_pages(pages: Iterable[str], chunk_words: int = CHUNK_WORDS,
+                overlap_words: int = CHUNK_OVERLAP_WORDS) -> List[Dict]:
+    """
+    Overlapping word windows within each page.
+
+    Returns [{'page': 1-based page number, 'text': str}]; plain text is
+    passed as a single page.
+    """
+    chunks = []
+    step = max(1, chunk_words - overlap_words)
+    for page_number, page in enumerate(pages, start=1):
+        words = (page or "").split()
+        for start in range(0, len(words), step):
+            chunks.append({'page': page_number, 'text': " ".join(words[start:start + chunk_words])})
+            if start + chunk_words >= len(words):
+                break
+    return chunks
+
+
+class ChunkIndex:
+    """
+    In-memory BM25 index over the chunks of one session's documents.
+
+    Postings map term → {chunk_id: term frequency}; documents can be added
+    and removed independently as files come and go from the uploader.
+    """
+
+    def __init__(self):
+        self.chunks: Dict[int, Dict] = {}
+        self._postings: Dict[str, Dict[int, int]] = collections.defaultdict(dict)
+        self._lengths: Dict[int, int] = {}
+        self._chunk_terms: Dict[int, List[str]] = {}
+        self._documents: Dict[str, List[int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._documents
+
+    def add_document(self, doc_id: str, name: str, pages: Iterable[str] = None,
+                     chunks: Optional[List[Dict]] = None):
+        """
+        Index a document from its pages, or from chunks made earlier by
+        chunk_pages(); chunks that carry their 'terms' counts (as stored by
+        the document store) are added without re-tokenizing.
+        """
+        self.remove_document(doc_id)
+        self._documents[doc_id] = []
+        self.extend_document(doc_id, name, chunks if chunks is not None else chunk_pages(pages or []))
+
+    def extend_document(self, doc_id: str, name: str, chunks: List[Dict]):
+        """Add more chunks to an indexed document (e.g. pages recognised later)"""
+        ids = self._documents.setdefault(doc_id, [])
+        for chunk in chunks:
+            terms = chunk.get('terms') or collections.Counter(tokenize(chunk['text']))
+            if not terms:
+                continue
+            chunk_id = self._next_id
+            self._next_id += 1
+            self.chunks[chunk_id] = {'doc_id': doc_id, 'name': name, 'page': chunk['page'], 'text': chunk['text']}
+            for term, count in terms.items():
+                self._postings[term][chunk_id] = count
+            length = sum(terms.values())
+            self._lengths[chunk_id] = length
+            self._chunk_terms[chunk_id] = list(terms)
+            self._total_length += length
+            ids.append(chunk_id)
+
+    def remove_document(self, doc_id: str):
+        for chunk_id in self._documents.pop(doc_id, []):
+            del self.chunks[chunk_id]
+            for term in self._chunk_terms.pop(chunk_id):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._lengths.pop(chunk_id)
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[Dict]:
+        """Best-matching chunks, each with its BM25 'score'"""
+        if not self.chunks:
+            return []
+        count = len(self.chunks)
+        average_length = self._total_length / count
+        scores: Dict[int, float] = collections.defaultdict(float)
+
+        term_postings = [self._postings[term] for term in set(tokenize(query)) if term in self._postings]
+        rare = [postings for postings in term_postings if len(postings) <= count * COMMON_TERM_RATIO]
+        for postings in rare or term_postings:
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [dict(self.chunks[chunk_id], score=round(score, 3)) for chunk_id, score in best]
@@ -0,0 +1,178 @@
+"""
+Veterans India AI Assistant - Document Ingestion
+===============================================
+Text extraction for uploaded documents. PDF pages are extracted in
+parallel on a shared process pool and streamed back as they finish, so
+long manuals report progress instead of blocking the page. The PDF is
+handed to the workers once through shared memory rather than pickled
+into every page-range task. Extracted documents are kept by the document
+store (document_store.py), keyed by content_digest().
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import io
+import os
+import atexit
+import hashlib
+import logging
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Below this many pages starting worker processes costs more than it saves
+INLINE_PAGE_LIMIT = 8
+MIN_PAGES_PER_TASK = 4
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _page_text(page) -> str:
+    try:
+        return page.extract_text() or ""
+    except Exception as e:
+        # One malformed page should not lose the rest of the document
+        logger.warning(f"Could not extract page text: {e}")
+        return ""
+
+
+def _extract_page_range(data: bytes, start: int, stop: int) -> Tuple[int, List[str]]:
+    """Text of pages [start, stop), each extracted once"""
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return start, [_page_text(reader.pages[i]) for i in range(start, stop)]
+
+
+# Worker side: the PDF currently being extracted, as ((shared memory name, size), reader)
+_worker_document: Tuple[Optional[Tuple[str, int]], Optional[PyPDF2.PdfReader]] = (None, None)
+
+
+def _extract_shared_page_range(shm_name: str, size: int, start: int, stop: int) -> Tuple[int, List[str]]:
+    """Worker: text of pages [start, stop) of the PDF in shared memory block shm_name"""
+    global _worker_document
+    key, reader = _worker_document
+    if key != (shm_name, size):
+        # First range of this PDF in this worker: copy it out once and keep the parsed reader
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            data = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        _worker_document = ((shm_name, size), reader)
+    return start, [_page_text(reader.pages[i]) for i in range(start, stop)]
+
+
+class DocumentIngestor:
+    """
+    Extracts document text.
+
+    PDFs are split into page ranges; each range is parsed and extracted in
+    a worker process, so extraction uses every core and never holds the
+    GIL of the Streamlit server. The pool is created on first use and
+    shared by all sessions.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.stats = {'extracted': 0, 'pages': 0}
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def iter_pdf_pages(self, data: bytes) -> Iterator[Tuple[int, str, int]]:
+        """Yield (page_index, text, page_count) as pages finish, not necessarily in order"""
+        page_count = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+
+        if page_count <= INLINE_PAGE_LIMIT or self.max_workers == 1:
+            _, texts = _extract_page_range(data, 0, page_count)
+            for index, text in enumerate(texts):
+                yield index, text, page_count
+            return
+
+        # A few tasks per worker keeps progress moving and balances uneven pages
+        per_task = max(MIN_PAGES_PER_TASK, -(-page_count // (self.max_workers * 4)))
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        futures = []
+        try:
+            shm.buf[:len(data)] = data
+            pool = self._get_pool()
+            futures = [pool.submit(_extract_shared_page_range, shm.name, len(data),
+                                   start, min(start + per_task, page_count))
+                       for start in range(0, page_count, per_task)]
+            for future in as_completed(futures):
+                start, texts = future.result()
+                for offset, text in enumerate(texts):
+                    yield start + offset, text, page_count
+        finally:
+            for future in futures:
+                future.cancel()
+            # Ranges already running may still attach to the block
+            wait(futures)
+            shm.close()
+            shm.unlink()
+
+    def extract_pdf(self, name: str, data: bytes, progress: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Extract a PDF.
+
+        Returns {'digest', 'name', 'pages': [text per page], 'text'}.
+        progress(done, total) is called as pages complete.
+        """
+        pages: List[Optional[str]] = []
+        done = 0
+        for index, text, page_count in self.iter_pdf_pages(data):
+            if not pages:
+                pages = [None] * page_count
+            pages[index] = text
+            done += 1
+            if progress:
+                progress(done, page_count)
+
+        self.stats['extracted'] += 1
+        self.stats['pages'] += len(pages)
+        return {
+            'digest': content_digest(data),
+            'name': name,
+            'pages': pages,
+            'text': "\n".join(page for page in pages if page)
+        }
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking the multi-threaded Streamlit server is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+
+# Shared ingestor, so every session uses one worker pool
+_ingestor: Optional[DocumentIngestor] = None
+_ingestor_lock = threading.Lock()
+
+def get_document_ingestor() -> DocumentIngestor:
+    """Get the shared document ingestor."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = DocumentIngestor()
+            atexit.register(_ingestor.shutdown)
+        return _ingestor
@@ -0,0 +1,363 @@
+"""
+Veterans India AI Assistant - Persistent Document Store
+======================================================
+Content-addressed store for uploaded documents, shared by every chat
+session. Documents are keyed by the SHA-256 of the uploaded bytes and
+keep their extracted pages, chunks and per-chunk term counts (the BM25
+index entries), so a re-upload by anyone skips extraction and indexing.
+Sessions hold references to the documents they use; unreferenced
+documents are evicted least-recently-used first when the store outgrows
+its size cap, and a background job re-chunks documents made by an older
+chunker.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import json
+import atexit
+import sqlite3
+import logging
+import datetime
+import threading
+import collections
+from typing import Dict, List, Optional, Tuple
+import query_metrics
+from document_index import CHUNKER_VERSION, chunk_pages, tokenize
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = "document_store.db"
+DEFAULT_MAX_STORE_BYTES = 512 * 2 ** 20
+DEFAULT_MAINTENANCE_INTERVAL = 600.0
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def build_chunks(pages: List[str]) -> List[Dict]:
+    """Chunks with their term counts, ready for ChunkIndex.add_document(chunks=...)"""
+    return [dict(chunk, terms=dict(collections.Counter(tokenize(chunk['text']))))
+            for chunk in chunk_pages(pages)]
+
+
+def _chunk_rows(digest: str, pages: List[str]) -> Tuple[List[Dict], List[tuple], int]:
+    """(chunks, document_chunks rows, size_bytes) for a document's pages"""
+    chunks = build_chunks(pages)
+    rows = [(digest, number, chunk['page'], chunk['text'], json.dumps(chunk['terms']))
+            for number, chunk in enumerate(chunks)]
+    size_bytes = sum(len(page) for page in pages) + sum(len(row[3]) + len(row[4]) for row in rows)
+    return chunks, rows, size_bytes
+
+
+class DocumentStore:
+    """
+    SQLite-backed document store with reference counting and a size cap.
+
+    refcount counts live sessions using a document in this process; it is
+    reset when the store opens, since sessions do not outlive the server.
+    size_bytes approximates what a document occupies (pages, chunk text
+    and term counts) and drives eviction.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_STORE_PATH, max_bytes: int = DEFAULT_MAX_STORE_BYTES,
+                 maintenance_interval: float = DEFAULT_MAINTENANCE_INTERVAL):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.maintenance_interval = maintenance_interval
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0, 'reindexed': 0, 'unapplied': 0}
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.init_tables()
+
+        self._thread = threading.Thread(target=self._run, name="document-store", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = query_metrics.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def init_tables(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            digest TEXT PRIMARY KEY,
+            name TEXT,
+            page_count INTEGER,
+            size_bytes INTEGER,
+            chunker_version INTEGER,
+            refcount INTEGER DEFAULT 0,
+            created_at TIMESTAMP,
+            last_used_at TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS document_pages (
+            digest TEXT REFERENCES documents (digest) ON DELETE CASCADE,
+            page_number INTEGER,
+            text TEXT,
+            PRIMARY KEY (digest, page_number)
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS document_chunks (
+            digest TEXT REFERENCES documents (digest) ON DELETE CASCADE,
+            chunk_number INTEGER,
+            page_number INTEGER,
+            text TEXT,
+            terms TEXT,
+            PRIMARY KEY (digest, chunk_number)
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_evictable ON documents (refcount, last_used_at)")
+        # References from a previous server process are gone with its sessions
+        cursor.execute("UPDATE documents SET refcount = 0 WHERE refcount != 0")
+        conn.commit()
+        conn.close()
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """
+        Stored document, or None.
+
+        Returns {'digest', 'name', 'pages', 'chunks'}; documents from an
+        older chunker are re-chunked first.
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name, chunker_version FROM documents WHERE digest = ?", (digest,))
+            row = cursor.fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            name, chunker_version = row
+            cursor.execute("UPDATE documents SET last_used_at = ? WHERE digest = ?", (_now(), digest))
+            conn.commit()
+
+            cursor.execute("SELECT text FROM document_pages WHERE digest = ? ORDER BY page_number", (digest,))
+            pages = [page for (page,) in cursor.fetchall()]
+            if chunker_version != CHUNKER_VERSION:
+                chunks = self._reindex(conn, digest, pages)
+            else:
+                cursor.execute('''
+                SELECT page_number, text, terms FROM document_chunks
+                WHERE digest = ? ORDER BY chunk_number
+                ''', (digest,))
+                chunks = [{'page': page, 'text': text, 'terms': json.loads(terms)}
+                          for page, text, terms in cursor.fetchall()]
+        finally:
+            conn.close()
+
+        self.stats['hits'] += 1
+        return {'digest': digest, 'name': name, 'pages': pages, 'chunks': chunks}
+
+    def put(self, digest: str, name: str, pages: List[str]) -> Dict:
+        """Chunk and store a newly extracted document; returns it as get() would"""
+        # Whitespace-only pages are stored empty, so OCR can fill them in later
+        pages = [page if page.strip() else "" for page in pages]
+        chunks, chunk_rows, size_bytes = _chunk_rows(digest, pages)
+        now = _now()
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute('''
+            INSERT INTO documents (digest, name, page_count, size_bytes, chunker_version, refcount, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+            ON CONFLICT (digest) DO NOTHING
+            ''', (digest, name, len(pages), size_bytes, CHUNKER_VERSION, now, now))
+            if cursor.rowcount == 1:
+                cursor.executemany("INSERT INTO document_pages (digest, page_number, text) VALUES (?, ?, ?)",
+                                   [(digest, number, page) for number, page in enumerate(pages, start=1)])
+                cursor.executemany('''
+                INSERT INTO document_chunks (digest, chunk_number, page_number, text, terms)
+                VALUES (?, ?, ?, ?, ?)
+                ''', chunk_rows)
+                self.stats['stored'] += 1
+            conn.commit()
+        finally:
+            conn.close()
+
+        # The caller acquires the new document only after put() returns
+        self.evict(keep=digest)
+        return {'digest': digest, 'name': name, 'pages': pages, 'chunks': chunks}
+
+    def apply_page_text(self, digest: str, page_number: int, text: str) -> int:
+        """
+        Fill in a page that had no text (e.g. from OCR) and index it.
+
+        New chunks are appended after the document's existing ones; returns
+        how many were added (0, counted in stats['unapplied'], if the page
+        already has text or the document is no longer stored).
+        """
+        chunks, chunk_rows, size_bytes = _chunk_rows(digest, [text])
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT text FROM document_pages WHERE digest = ? AND page_number = ?",
+                           (digest, page_number))
+            row = cursor.fetchone()
+            # Blank as Python sees it, like the callers that decided the page was scanned
+            if row is None or (row[0] or "").strip():
+                conn.rollback()
+                self.stats['unapplied'] += 1
+                reason = "document is no longer stored" if row is None else "page already has text"
+                logger.warning(f"Recognised text for page {page_number} of {digest[:12]} not applied: {reason}")
+                return 0
+            cursor.execute("UPDATE document_pages SET text = ? WHERE digest = ? AND page_number = ?",
+                           (text, digest, page_number))
+            cursor.execute("SELECT COALESCE(MAX(chunk_number) + 1, 0) FROM document_chunks WHERE digest = ?",
+                           (digest,))
+            first = cursor.fetchone()[0]
+            cursor.executemany('''
+            INSERT INTO document_chunks (digest, chunk_number, page_number, text, terms)
+            VALUES (?, ?, ?, ?, ?)
+            ''', [(digest, first + offset, page_number, row[3], row[4]) for offset, row in enumerate(chunk_rows)])
+            cursor.execute("UPDATE documents SET size_bytes = size_bytes + ? WHERE digest = ?", (size_bytes, digest))
+            conn.commit()
+        finally:
+            conn.close()
+        return len(chunks)
+
+    def chunks_since(self, digest: str, start: int) -> List[Dict]:
+        """A document's chunks from chunk number start on, for sessions catching up on added pages"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT page_number, text, terms FROM document_chunks
+            WHERE digest = ? AND chunk_number >= ? ORDER BY chunk_number
+            ''', (digest, start))
+            return [{'page': page, 'text': text, 'terms': json.loads(terms)}
+                    for page, text, terms in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def acquire(self, digest: str):
+        """Mark a document as in use by a session, protecting it from eviction"""
+        self._adjust_refcount(digest, 1)
+
+    def release(self, digest: str):
+        self._adjust_refcount(digest, -1)
+
+    def total_bytes(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM documents").fetchone()[0]
+        finally:
+            conn.close()
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Drop least recently used unreferenced documents (other than keep) until under the size cap"""
+        evicted = 0
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM documents")
+                total = cursor.fetchone()[0]
+                if total <= self.max_bytes:
+                    return 0
+                cursor.execute('''
+                SELECT digest, size_bytes FROM documents
+                WHERE refcount <= 0 ORDER BY last_used_at
+                ''')
+                victims = []
+                for digest, size_bytes in cursor.fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    if digest == keep:
+                        continue
+                    victims.append((digest,))
+                    total -= size_bytes
+                # Re-check refcount: a session may have taken the document meanwhile
+                cursor.executemany("DELETE FROM documents WHERE digest = ? AND refcount <= 0", victims)
+                evicted = len(victims)
+                conn.commit()
+            finally:
+                conn.close()
+
+        if evicted:
+            self.stats['evicted'] += evicted
+            logger.info(f"Evicted {evicted} documents from the document store")
+        return evicted
+
+    def reindex_stale(self) -> int:
+        """Re-chunk every document made by an older chunker; returns how many"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT digest FROM documents WHERE chunker_version != ?", (CHUNKER_VERSION,))
+            digests = [digest for (digest,) in cursor.fetchall()]
+            for digest in digests:
+                if self._stop_event.is_set():
+                    break
+                cursor.execute("SELECT text FROM document_pages WHERE digest = ? ORDER BY page_number", (digest,))
+                self._reindex(conn, digest, [page for (page,) in cursor.fetchall()])
+        finally:
+            conn.close()
+        if digests:
+            logger.info(f"Re-indexed {len(digests)} documents for chunker version {CHUNKER_VERSION}")
+        return len(digests)
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+
+    def _reindex(self, conn: sqlite3.Connection, digest: str, pages: List[str]) -> List[Dict]:
+        # One transaction per document, so readers never see it half re-chunked
+        chunks, chunk_rows, size_bytes = _chunk_rows(digest, pages)
+
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM document_chunks WHERE digest = ?", (digest,))
+        cursor.executemany('''
+        INSERT INTO document_chunks (digest, chunk_number, page_number, text, terms)
+        VALUES (?, ?, ?, ?, ?)
+        ''', chunk_rows)
+        cursor.execute("UPDATE documents SET chunker_version = ?, size_bytes = ? WHERE digest = ?",
+                       (CHUNKER_VERSION, size_bytes, digest))
+        conn.commit()
+        self.stats['reindexed'] += 1
+        return chunks
+
+    def _adjust_refcount(self, digest: str, delta: int):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE documents SET refcount = MAX(refcount + ?, 0) WHERE digest = ?", (delta, digest))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            try:
+                self.reindex_stale()
+                self.evict()
+            except sqlite3.Error as e:
+                logger.error(f"Document store maintenance failed: {e}")
+            if self._stop_event.wait(self.maintenance_interval):
+                return
+
+
+# Shared store, so every session dedupes against the same documents
+_store: Optional[DocumentStore] = None
+_store_lock = threading.Lock()
+
+def get_document_store(db_path: str = DEFAULT_STORE_PATH) -> DocumentStore:
+    """Get the shared document store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DocumentStore(db_path)
+            atexit.register(_store.close)
+        return _store
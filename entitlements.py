@@ -0,0 +1,169 @@
+"""
+Veterans India AI Assistant - Plan Entitlements
+==============================================
+Resolves what a user may do from their plan. Each plan's features JSON is
+parsed once into a bitmap of Feature flags; a user's entitlements are the
+bitmap of their plan while their subscription is active. Both are held in
+the shared query cache, so plan and user writes invalidate them and a
+check on every chat request is a dictionary lookup.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import os
+import enum
+import json
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict, List
+import query_metrics
+from data_cache import get_query_cache
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Feature(enum.IntFlag):
+    NONE = 0
+    CHAT = enum.auto()
+    DOCUMENT_ANALYSIS = enum.auto()
+    WEB_SEARCH = enum.auto()
+    ADVANCED_AI = enum.auto()
+    PRIORITY_SUPPORT = enum.auto()
+    CUSTOM_TRAINING = enum.auto()
+    CUSTOM_INTEGRATION = enum.auto()
+    SUPPORT_24_7 = enum.auto()
+
+
+# Every plan includes the assistant itself
+BASE_PLAN_FEATURES = Feature.CHAT | Feature.DOCUMENT_ANALYSIS
+
+# What guests get, and everyone when there is no admin database to resolve
+# plans from: no more than the lowest plan, so dropping the member link never
+# unlocks anything. A deployment can open web search to guests with
+# VETERANS_INDIA_GUEST_WEB_SEARCH=1.
+GUEST_WEB_SEARCH_ENV = "VETERANS_INDIA_GUEST_WEB_SEARCH"
+
+
+def guest_features() -> Feature:
+    features = BASE_PLAN_FEATURES
+    if os.environ.get(GUEST_WEB_SEARCH_ENV, "").strip().lower() in ("1", "true", "yes", "on"):
+        features |= Feature.WEB_SEARCH
+    return features
+
+# plans.features holds free-text labels entered on the Plans page; these
+# are the ones that grant something (matched case-insensitively)
+FEATURE_LABELS = {
+    "chat support": Feature.CHAT,
+    "basic ai features": Feature.CHAT | Feature.DOCUMENT_ANALYSIS,
+    "document analysis": Feature.DOCUMENT_ANALYSIS,
+    "web search": Feature.WEB_SEARCH,
+    "real-time web search": Feature.WEB_SEARCH,
+    "advanced ai": Feature.ADVANCED_AI,
+    "all features": Feature.WEB_SEARCH | Feature.ADVANCED_AI,
+    "unlimited features": (Feature.WEB_SEARCH | Feature.ADVANCED_AI
+                           | Feature.PRIORITY_SUPPORT | Feature.CUSTOM_TRAINING),
+    "priority support": Feature.PRIORITY_SUPPORT,
+    "custom training": Feature.CUSTOM_TRAINING,
+    "custom integration": Feature.CUSTOM_INTEGRATION,
+    "24/7 support": Feature.SUPPORT_24_7
+}
+
+# Display order and labels for the user dashboard
+FEATURE_DISPLAY = [
+    (Feature.CHAT, "Chat with AI Assistant"),
+    (Feature.DOCUMENT_ANALYSIS, "Document Analysis"),
+    (Feature.WEB_SEARCH, "Real-time Web Search"),
+    (Feature.ADVANCED_AI, "Advanced AI Features"),
+    (Feature.PRIORITY_SUPPORT, "Priority Support"),
+    (Feature.CUSTOM_TRAINING, "Custom Training"),
+    (Feature.CUSTOM_INTEGRATION, "Custom Integration"),
+    (Feature.SUPPORT_24_7, "24/7 Support")
+]
+
+
+def parse_plan_features(features_json: Optional[str]) -> Feature:
+    """Bitmap for a plans.features JSON list; unknown labels grant nothing"""
+    try:
+        labels = json.loads(features_json) if features_json else []
+    except (ValueError, TypeError):
+        logger.warning(f"Unreadable plan features: {features_json!r}")
+        labels = []
+
+    features = BASE_PLAN_FEATURES
+    for label in labels:
+        features |= FEATURE_LABELS.get(str(label).strip().lower(), Feature.NONE)
+    return features
+
+
+def feature_labels(features: Feature) -> List[str]:
+    return [label for feature, label in FEATURE_DISPLAY if feature in features]
+
+
+class EntitlementResolver:
+    """
+    Plan → feature bitmap and user → entitlement lookups for one database.
+
+    Results live in the database's QueryCache under the 'plans' and
+    'user:<id>' tags, so the admin dashboard's writes drop them at once
+    and the cache TTL bounds staleness for other processes (the chat app).
+    Guests (user_id None) get guest_features; so does everyone when the
+    database does not exist. Subscribers never get less than a guest,
+    whether their subscription has lapsed or the lookup fails.
+    """
+
+    def __init__(self, db_path: str = "veterans_admin.db", guest: Optional[Feature] = None):
+        self.db_path = db_path
+        self.guest = guest if guest is not None else guest_features()
+
+    def plan_features(self) -> Dict[int, Feature]:
+        """Feature bitmap per active plan id"""
+        return get_query_cache(self.db_path).get_or_load(
+            ('EntitlementResolver.plan_features',), ('plans',), self._load_plan_features)
+
+    def user_features(self, user_id: Optional[int]) -> Feature:
+        if user_id is None or not os.path.exists(self.db_path):
+            return self.guest
+        return get_query_cache(self.db_path).get_or_load(
+            ('EntitlementResolver.user_features', user_id), (f"user:{user_id}", 'plans'),
+            lambda: self._load_user_features(user_id))
+
+    def has_feature(self, user_id: Optional[int], feature: Feature) -> bool:
+        return feature in self.user_features(user_id)
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        if not os.path.exists(self.db_path):
+            return []
+        try:
+            conn = query_metrics.connect(self.db_path)
+            try:
+                return conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Entitlement lookup failed: {e}")
+            return []
+
+    def _load_plan_features(self) -> Dict[int, Feature]:
+        rows = self._query("SELECT id, features FROM plans WHERE is_active = 1")
+        return {plan_id: parse_plan_features(features) for plan_id, features in rows}
+
+    def _load_user_features(self, user_id: int) -> Feature:
+        rows = self._query("SELECT plan_id, subscription_status FROM users WHERE id = ?", (user_id,))
+        if not rows or rows[0][1] != 'active':
+            return self.guest
+        return self.guest | self.plan_features().get(rows[0][0], Feature.NONE)
+
+
+# Shared resolvers, one per database
+_resolvers: Dict[str, EntitlementResolver] = {}
+_resolvers_lock = threading.Lock()
+
+def get_entitlement_resolver(db_path: str = "veterans_admin.db") -> EntitlementResolver:
+    """Get the shared entitlement resolver for a database."""
+    with _resolvers_lock:
+        if db_path not in _resolvers:
+            _resolvers[db_path] = EntitlementResolver(db_path)
+        return _resolvers[db_path]
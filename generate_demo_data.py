@@ -7,10 +7,18 @@ with sample users, subscriptions, and usage patterns.
 © 2025 Veterans India Team. All rights reserved.
 """
 
+import os
 import sqlite3
 import random
+import hashlib
 import datetime
+import time
+import argparse
+import multiprocessing
+import faker
 from faker import Faker
+import numpy as np
+from device_registry import init_device_schema, resync_device_counters
 import json
 
 fake = Faker('en_IN')  # Indian locale for realistic data
@@ -128,6 +136,10 @@ class DemoDataGenerator:
                     last_active.isoformat(), is_active
                 ))
         
+        # current_devices is maintained by the device triggers: reset the
+        # generated counts to the existing devices, the inserts add the rest
+        init_device_schema(cursor)
+        resync_device_counters(cursor)
         cursor.executemany('''
         INSERT INTO user_devices (
             user_id, device_name, device_type, device_id, last_active, is_active
@@ -253,12 +265,485 @@ class DemoDataGenerator:
         print("- Admin activity logs")
         print("\nYou can now test the admin dashboard with realistic data!")
 
+# ----------------------------------------------------------------------
+# High-volume generation for load testing
+# ----------------------------------------------------------------------
+SUBSCRIPTION_STATUSES = ['active', 'expired', 'suspended']
+SUBSCRIPTION_ACTIONS = ['created', 'renewed', 'upgraded', 'downgraded']
+ADMIN_LOG_ACTIONS = [
+    'user_created', 'user_updated', 'user_deleted', 'user_impersonated',
+    'plan_created', 'plan_updated', 'subscription_renewed', 'login'
+]
+ADMIN_LOG_TARGETS = ['user', 'plan', 'subscription', 'system']
+DEVICE_TYPES = ['Mobile', 'Desktop', 'Tablet', 'Laptop']
+DEVICE_NAMES = [
+    ['iPhone 13', 'Samsung Galaxy S21', 'OnePlus 9', 'Xiaomi Mi 11'],
+    ['Windows PC', 'Mac Studio', 'Linux Workstation', 'Gaming PC'],
+    ['iPad Pro', 'Samsung Tab S7', 'Surface Pro', 'Lenovo Tab'],
+    ['MacBook Pro', 'Dell XPS', 'HP Spectre', 'Lenovo ThinkPad']
+]
+
+# Worker state, set once per process by _init_worker
+_worker_context = None
+
+def _init_worker(context):
+    global _worker_context
+    _worker_context = context
+
+def _generate_chunk(task):
+    """Build the rows for one chunk of users (runs in a worker process)"""
+    chunk_index, first_id, count = task
+    ctx = _worker_context
+    # Seed from (seed, chunk) so output does not depend on the worker count
+    rng = np.random.default_rng([ctx['seed'], chunk_index])
+    today = np.datetime64(ctx['today'], 'D')
+
+    user_ids = np.arange(first_id, first_id + count)
+    plans = ctx['plans']
+
+    # Users
+    plan_idx = rng.choice(len(plans), size=count, p=ctx['plan_weights'])
+    plan_ids = np.array([p[0] for p in plans])[plan_idx]
+    device_limits = np.array([p[1] for p in plans])[plan_idx]
+    current_devices = rng.integers(1, np.minimum(device_limits, 15) + 1)
+    has_dealer = rng.random(count) > 0.3
+    dealer_codes = rng.integers(1000, 10000, size=count)
+    status_idx = rng.choice(len(SUBSCRIPTION_STATUSES), size=count, p=ctx['status_weights'])
+
+    start_offsets = rng.integers(0, ctx['signup_days'] + 1, size=count)
+    start_dates = today - start_offsets
+    end_dates = np.where(
+        status_idx == 0,
+        today + rng.integers(0, ctx['active_end_days'] + 1, size=count),   # active: future end
+        np.where(
+            status_idx == 1,
+            start_dates + (rng.random(count) * (start_offsets + 1)).astype(int),    # expired: start..today
+            start_dates + (rng.random(count) * (start_offsets + 91)).astype(int)    # suspended: start..+3m
+        )
+    ).astype('datetime64[D]')
+    created_at = np.char.replace(
+        (start_dates.astype('datetime64[s]') + rng.integers(0, 86400, size=count)).astype(str), 'T', ' ').tolist()
+
+    names = ctx['name_pool']
+    domains = ctx['domain_pool']
+    name_idx = rng.integers(0, len(names), size=count)
+    domain_idx = rng.integers(0, len(domains), size=count)
+
+    ids = user_ids.tolist()
+    usernames = [f"{names[n]}{uid}" for n, uid in zip(name_idx.tolist(), ids)]
+    users = list(zip(
+        ids,
+        usernames,
+        [f"{u}@{domains[d]}" for u, d in zip(usernames, domain_idx.tolist())],
+        [f"demo_hash_{uid}" for uid in ids],
+        plan_ids.tolist(),
+        device_limits.tolist(),
+        current_devices.tolist(),
+        [f"DLR{code}" if dealer else None for code, dealer in zip(dealer_codes.tolist(), has_dealer.tolist())],
+        [SUBSCRIPTION_STATUSES[s] for s in status_idx.tolist()],
+        start_dates.astype(str).tolist(),
+        end_dates.astype(str).tolist(),
+        created_at,
+        created_at
+    ))
+
+    # Devices: min(current_devices, max_devices_per_user) per user
+    device_counts = np.minimum(current_devices, ctx['max_devices_per_user'])
+    device_user_ids = np.repeat(user_ids, device_counts)
+    total_devices = int(device_counts.sum())
+    device_seq = np.arange(total_devices) - np.repeat(np.cumsum(device_counts) - device_counts, device_counts)
+    device_type_idx = rng.integers(0, len(DEVICE_TYPES), size=total_devices)
+    device_name_idx = rng.integers(0, 4, size=total_devices)
+    last_active = (np.datetime64(ctx['today'], 's') + 86400
+                   - rng.integers(0, 30 * 86400, size=total_devices))
+    devices = list(zip(
+        device_user_ids.tolist(),
+        [DEVICE_NAMES[t][n] for t, n in zip(device_type_idx.tolist(), device_name_idx.tolist())],
+        [DEVICE_TYPES[t] for t in device_type_idx.tolist()],
+        [f"DEV_{uid}_{seq}" for uid, seq in zip(device_user_ids.tolist(), device_seq.tolist())],
+        last_active.astype(str).tolist(),
+        (rng.random(total_devices) > 0.2).tolist(),
+        [created_at[i] for i in np.repeat(np.arange(count), device_counts).tolist()]
+    ))
+
+    # Subscription history: one 'created' row plus 0-3 changes per user
+    history_counts = 1 + rng.integers(0, 4, size=count)
+    history_user_idx = np.repeat(np.arange(count), history_counts)
+    total_history = int(history_counts.sum())
+    is_created = np.zeros(total_history, dtype=bool)
+    is_created[np.cumsum(history_counts) - history_counts] = True
+    user_offsets = start_offsets[history_user_idx]
+    action_dates = start_dates[history_user_idx] + np.where(
+        is_created, 0, (rng.random(total_history) * (user_offsets + 1)).astype(int))
+    action_idx = np.where(is_created, 0, rng.integers(1, len(SUBSCRIPTION_ACTIONS), size=total_history))
+    history_plan_ids = plan_ids[history_user_idx].tolist()
+    action_dates = action_dates.astype(str).tolist()
+    history = list(zip(
+        user_ids[history_user_idx].tolist(),
+        history_plan_ids,
+        [SUBSCRIPTION_ACTIONS[a] for a in action_idx.tolist()],
+        [None if created else plan for created, plan in zip(is_created.tolist(), history_plan_ids)],
+        action_dates,
+        action_dates,
+        np.round(rng.uniform(99, 1999, size=total_history), 2).tolist(),
+        [f"{d} 00:00:00" for d in action_dates]
+    ))
+
+    # Admin logs
+    log_count = int(count * ctx['admin_logs_per_user'])
+    ips = ctx['ip_pool']
+    agents = ctx['agent_pool']
+    log_actions = rng.integers(0, len(ADMIN_LOG_ACTIONS), size=log_count).tolist()
+    log_times = (np.datetime64(ctx['today'], 's') + 86400
+                 - rng.integers(0, 30 * 86400, size=log_count)).astype(str).tolist()
+    ip_idx = rng.integers(0, len(ips), size=log_count).tolist()
+    agent_idx = rng.integers(0, len(agents), size=log_count).tolist()
+    admin_logs = list(zip(
+        np.array(ctx['admin_ids'])[rng.integers(0, len(ctx['admin_ids']), size=log_count)].tolist(),
+        [ADMIN_LOG_ACTIONS[a] for a in log_actions],
+        [ADMIN_LOG_TARGETS[t] for t in rng.integers(0, len(ADMIN_LOG_TARGETS), size=log_count).tolist()],
+        rng.choice(user_ids, size=log_count).tolist(),
+        [json.dumps({'action': ADMIN_LOG_ACTIONS[a], 'timestamp': t, 'ip_address': ips[i], 'user_agent': agents[g]})
+         for a, t, i, g in zip(log_actions, log_times, ip_idx, agent_idx)],
+        [t.replace('T', ' ') for t in log_times]
+    ))
+
+    return users, devices, history, admin_logs
+
+
+class HighVolumeDataGenerator:
+    """
+    Load-test data generator for 1M+ users.
+
+    Distributions are sampled with NumPy a whole chunk at a time, names and
+    emails come from pools pre-generated with Faker, and chunks are built by
+    a pool of worker processes that feed a single SQLite writer running
+    with bulk-load pragmas.
+    """
+
+    def __init__(self, db_path="veterans_admin.db", seed=42, workers=None, chunk_size=50000,
+                 status_weights=(0.70, 0.20, 0.10), plan_weights=None, signup_days=365,
+                 active_end_days=182, max_devices_per_user=5, admin_logs_per_user=2.0,
+                 pool_size=5000, reference_date=None):
+        self.db_path = db_path
+        self.seed = seed
+        self.reference_date = reference_date or datetime.date.today().isoformat()
+        self.workers = workers or max(multiprocessing.cpu_count() - 1, 1)
+        self.chunk_size = chunk_size
+        self.status_weights = status_weights
+        self.plan_weights = plan_weights
+        self.signup_days = signup_days
+        self.active_end_days = active_end_days
+        self.max_devices_per_user = max_devices_per_user
+        self.admin_logs_per_user = admin_logs_per_user
+        self.pool_size = pool_size
+
+    def _build_context(self, conn):
+        """Everything workers need: plans, pools and distribution settings"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, device_limit FROM plans ORDER BY id")
+        plans = cursor.fetchall()
+        cursor.execute("SELECT id FROM admins ORDER BY id")
+        admin_ids = [row[0] for row in cursor.fetchall()] or [1]
+
+        plan_weights = self.plan_weights or [1.0] * len(plans)
+        if len(plan_weights) != len(plans):
+            raise ValueError(f"plan_weights has {len(plan_weights)} entries but there are {len(plans)} plans")
+
+        # Name/email pools generated once with Faker instead of per row
+        pool_faker = Faker('en_IN')
+        pool_faker.seed_instance(self.seed)
+        return {
+            'seed': self.seed,
+            'today': self.reference_date,
+            'plans': plans,
+            'plan_weights': np.array(plan_weights) / sum(plan_weights),
+            'status_weights': np.array(self.status_weights) / sum(self.status_weights),
+            'signup_days': self.signup_days,
+            'active_end_days': self.active_end_days,
+            'max_devices_per_user': self.max_devices_per_user,
+            'admin_logs_per_user': self.admin_logs_per_user,
+            'admin_ids': admin_ids,
+            'name_pool': [pool_faker.user_name() for _ in range(self.pool_size)],
+            'domain_pool': [pool_faker.free_email_domain() for _ in range(50)],
+            'ip_pool': [pool_faker.ipv4() for _ in range(1000)],
+            'agent_pool': [pool_faker.user_agent() for _ in range(200)]
+        }
+
+    def _begin_bulk_load(self, conn):
+        """Bulk-load pragmas; secondary indexes and triggers are dropped and returned for rebuilding"""
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+        AND tbl_name IN ('users', 'user_devices', 'subscription_history', 'admin_logs')
+        ''')
+        schema = cursor.fetchall()
+        for kind, name, _ in schema:
+            cursor.execute(f"DROP {kind.upper()} {name}")
+        return schema, journal_mode
+
+    def _end_bulk_load(self, conn, schema, journal_mode):
+        for kind, _, sql in schema:
+            if kind == 'index':
+                conn.execute(sql)
+        # Generated counts are a target, not a fact: derive current_devices
+        # from the loaded device rows, then re-arm the device triggers
+        resync_device_counters(conn.cursor())
+        for kind, _, sql in schema:
+            if kind == 'trigger':
+                conn.execute(sql)
+        conn.commit()
+        conn.execute("PRAGMA locking_mode=NORMAL")
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        conn.execute("ANALYZE")
+
+    def generate(self, user_count=1_000_000):
+        """Generate user_count users with devices, history and admin logs; returns timing stats"""
+        # Make sure the full admin schema exists
+        from admin_dashboard_enhanced import EnhancedDatabaseManager
+        EnhancedDatabaseManager(self.db_path)
+
+        started = time.perf_counter()
+        conn = sqlite3.connect(self.db_path)
+        context = self._build_context(conn)
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+        first_id = cursor.fetchone()[0] + 1
+
+        tasks = []
+        for chunk_index, offset in enumerate(range(0, user_count, self.chunk_size)):
+            tasks.append((chunk_index, first_id + offset, min(self.chunk_size, user_count - offset)))
+
+        schema, journal_mode = self._begin_bulk_load(conn)
+        counts = {'users': 0, 'user_devices': 0, 'subscription_history': 0, 'admin_logs': 0}
+        print(f"Generating {user_count:,} users with {self.workers} workers...")
+
+        with multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(context,)) as pool:
+            for users, devices, history, admin_logs in pool.imap(_generate_chunk, tasks):
+                cursor.executemany('''
+                INSERT INTO users (
+                    id, username, email, password_hash, plan_id, device_limit, current_devices,
+                    dealer_code, subscription_status, subscription_start, subscription_end,
+                    created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', users)
+                cursor.executemany('''
+                INSERT INTO user_devices (
+                    user_id, device_name, device_type, device_id, last_active, is_active, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', devices)
+                cursor.executemany('''
+                INSERT INTO subscription_history (
+                    user_id, plan_id, action, previous_plan_id, start_date, end_date, amount, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', history)
+                cursor.executemany('''
+                INSERT INTO admin_logs (admin_id, action, target_type, target_id, details, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', admin_logs)
+                conn.commit()
+
+                counts['users'] += len(users)
+                counts['user_devices'] += len(devices)
+                counts['subscription_history'] += len(history)
+                counts['admin_logs'] += len(admin_logs)
+                elapsed = time.perf_counter() - started
+                print(f"  {counts['users']:,}/{user_count:,} users "
+                      f"({sum(counts.values()) / elapsed:,.0f} rows/sec)")
+
+        load_seconds = time.perf_counter() - started
+        self._end_bulk_load(conn, schema, journal_mode)
+        conn.close()
+
+        total_seconds = time.perf_counter() - started
+        total_rows = sum(counts.values())
+        stats = {
+            'rows': counts,
+            'total_rows': total_rows,
+            'load_seconds': round(load_seconds, 2),
+            'index_seconds': round(total_seconds - load_seconds, 2),
+            'total_seconds': round(total_seconds, 2),
+            'rows_per_sec': round(total_rows / total_seconds)
+        }
+        print(f"Generated {total_rows:,} rows in {stats['total_seconds']}s "
+              f"({stats['rows_per_sec']:,} rows/sec, index rebuild {stats['index_seconds']}s)")
+        return stats
+
+
+# ----------------------------------------------------------------------
+# Seeded dataset profiles for reproducible benchmarks
+# ----------------------------------------------------------------------
+# Every profile pins its seed and reference date, so the same profile always
+# produces the same rows (for the same NumPy/Faker versions).
+DATASET_PROFILES = {
+    'small': {
+        'description': "1k users, default distributions",
+        'users': 1_000,
+        'seed': 1001,
+        'reference_date': '2025-09-01',
+        'status_weights': (0.70, 0.20, 0.10),
+        'plan_weights': None,
+        'signup_days': 365,
+        'active_end_days': 182
+    },
+    'medium': {
+        'description': "100k users, default distributions",
+        'users': 100_000,
+        'seed': 1002,
+        'reference_date': '2025-09-01',
+        'status_weights': (0.70, 0.20, 0.10),
+        'plan_weights': None,
+        'signup_days': 730,
+        'active_end_days': 182
+    },
+    'large': {
+        'description': "1M users, default distributions",
+        'users': 1_000_000,
+        'seed': 1003,
+        'reference_date': '2025-09-01',
+        'status_weights': (0.70, 0.20, 0.10),
+        'plan_weights': None,
+        'signup_days': 1095,
+        'active_end_days': 182
+    },
+    'skewed-expiring': {
+        'description': "100k users, mostly active Basic plans ending within 30 days",
+        'users': 100_000,
+        'seed': 1004,
+        'reference_date': '2025-09-01',
+        'status_weights': (0.90, 0.08, 0.02),
+        'plan_weights': (0.60, 0.25, 0.10, 0.05),
+        'signup_days': 365,
+        'active_end_days': 30
+    }
+}
+
+# Columns covered by manifest checksums (excludes admins/plans timestamps
+# that are set at schema creation time)
+CHECKSUM_QUERIES = {
+    'plans': "SELECT id, plan_name, device_limit, price, duration_days, features, is_active FROM plans ORDER BY id",
+    'users': "SELECT * FROM users ORDER BY id",
+    'user_devices': "SELECT * FROM user_devices ORDER BY id",
+    'subscription_history': "SELECT * FROM subscription_history ORDER BY id",
+    'admin_logs': "SELECT * FROM admin_logs ORDER BY id"
+}
+
+def manifest_path(db_path):
+    return f"{db_path}.manifest.json"
+
+def compute_dataset_checksums(db_path):
+    """Row counts and SHA-256 checksums of every generated table"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    tables = {}
+    
+    for table, query in CHECKSUM_QUERIES.items():
+        digest = hashlib.sha256()
+        rows = 0
+        cursor.execute(query)
+        while True:
+            chunk = cursor.fetchmany(10000)
+            if not chunk:
+                break
+            for row in chunk:
+                digest.update(("\x1f".join("" if v is None else repr(v) for v in row) + "\n").encode())
+            rows += len(chunk)
+        tables[table] = {'rows': rows, 'sha256': digest.hexdigest()}
+    
+    conn.close()
+    combined = hashlib.sha256("".join(t['sha256'] for t in tables.values()).encode()).hexdigest()
+    return {'tables': tables, 'sha256': combined}
+
+def generate_profile(profile_name, db_path=None, workers=None, reference_date=None):
+    """Build a fresh database for a named profile and write its manifest"""
+    if profile_name not in DATASET_PROFILES:
+        raise ValueError(f"Unknown dataset profile: {profile_name}")
+    profile = DATASET_PROFILES[profile_name]
+    db_path = db_path or f"bench_{profile_name.replace('-', '_')}.db"
+    
+    # Profiles always start from an empty database so ids are reproducible
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    
+    generator = HighVolumeDataGenerator(
+        db_path,
+        seed=profile['seed'],
+        workers=workers,
+        status_weights=profile['status_weights'],
+        plan_weights=profile['plan_weights'],
+        signup_days=profile['signup_days'],
+        active_end_days=profile['active_end_days'],
+        reference_date=reference_date or profile['reference_date']
+    )
+    stats = generator.generate(profile['users'])
+    
+    manifest = {
+        'profile': profile_name,
+        'settings': dict(profile, reference_date=generator.reference_date),
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'generation': stats,
+        'versions': {
+            'numpy': np.__version__,
+            'faker': faker.VERSION,
+            'sqlite': sqlite3.sqlite_version
+        },
+        'checksums': compute_dataset_checksums(db_path)
+    }
+    with open(manifest_path(db_path), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    print(f"Dataset '{profile_name}' written to {db_path} (checksum {manifest['checksums']['sha256'][:12]})")
+    return manifest
+
+def verify_dataset(db_path):
+    """Check a database still matches its manifest; returns the mismatched tables"""
+    with open(manifest_path(db_path)) as f:
+        manifest = json.load(f)
+    current = compute_dataset_checksums(db_path)
+    return [table for table, expected in manifest['checksums']['tables'].items()
+            if current['tables'].get(table) != expected]
+
+
 def main():
     """Generate demo data for testing"""
-    generator = DemoDataGenerator()
+    parser = argparse.ArgumentParser(description="Generate demo data for the admin dashboard")
+    parser.add_argument("--profile", choices=list(DATASET_PROFILES), help="generate a seeded benchmark dataset")
+    parser.add_argument("--verify", metavar="DB", help="check a profile database against its manifest")
+    parser.add_argument("--reference-date", help="override a profile's reference date (YYYY-MM-DD)")
+    parser.add_argument("--users", type=int, help="generate this many users with the high-volume generator")
+    parser.add_argument("--workers", type=int, help="worker processes for high-volume generation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default="veterans_admin.db")
+    args = parser.parse_args()
+    
+    if args.verify:
+        mismatched = verify_dataset(args.verify)
+        print("Dataset matches its manifest" if not mismatched else f"Checksum mismatch: {', '.join(mismatched)}")
+        return
+    
+    if args.profile:
+        db_path = args.db if args.db != "veterans_admin.db" else None
+        generate_profile(args.profile, db_path, workers=args.workers, reference_date=args.reference_date)
+        return
+    
+    if args.users:
+        HighVolumeDataGenerator(args.db, seed=args.seed, workers=args.workers).generate(args.users)
+        return
+    
+    generator = DemoDataGenerator(args.db)
     
     # Check if demo data already exists
-    conn = sqlite3.connect("veterans_admin.db")
+    conn = sqlite3.connect(args.db)
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM users")
     user_count = cursor.fetchone()[0]
@@ -0,0 +1,194 @@
+"""
+Veterans India AI Assistant - OCR Pipeline
+=========================================
+Background text recognition for scanned PDF pages (discharge books, PPOs)
+that have no text layer. Only those pages are OCR'd, on a small worker
+pool; each result is cached by a hash of the page's images and written
+into the document store as soon as it is ready, so chat sessions can
+index and answer from finished pages while the rest are still queued.
+
+Uses Tesseract through pytesseract when installed; without it scanned
+pages are reported but left empty.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import io
+import atexit
+import hashlib
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import PyPDF2
+import query_metrics
+from document_store import DocumentStore, get_document_store
+
+try:
+    import pytesseract
+    from PIL import Image
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OCR_WORKERS = 2
+# Page images waiting for OCR; the scanner blocks beyond this, bounding memory
+MAX_QUEUED_PAGES = 64
+
+Recognizer = Callable[[List[bytes]], str]
+
+
+def tesseract_page_text(images: List[bytes]) -> str:
+    """OCR a page's images in order"""
+    texts = []
+    for data in images:
+        with Image.open(io.BytesIO(data)) as image:
+            texts.append(pytesseract.image_to_string(image))
+    return "\n".join(text.strip() for text in texts if text.strip())
+
+
+def page_images(page) -> List[bytes]:
+    try:
+        return [image.data for image in page.images]
+    except Exception as e:
+        logger.warning(f"Could not read page images: {e}")
+        return []
+
+
+def page_image_digest(images: List[bytes]) -> str:
+    digest = hashlib.sha256()
+    for data in images:
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+class OcrPipeline:
+    """
+    Queues scanned pages of stored documents for OCR.
+
+    submit() hands the PDF to a single scanner thread, which pulls the
+    images of each text-less page and queues one OCR job per page on the
+    worker pool. Tesseract runs as a subprocess, so worker threads run in
+    parallel; max_workers bounds CPU use and MAX_QUEUED_PAGES bounds the
+    page images held in memory. Results are cached in ocr_pages by page
+    image hash, so the same scan inside another PDF is not recognised twice.
+    """
+
+    def __init__(self, store: DocumentStore, max_workers: int = DEFAULT_OCR_WORKERS,
+                 recognize: Optional[Recognizer] = None):
+        self.store = store
+        self.recognize = recognize or (tesseract_page_text if OCR_AVAILABLE else None)
+        self.stats = {'pages': 0, 'cache_hits': 0, 'failed': 0}
+
+        self._progress: Dict[str, List[int]] = {}
+        self._progress_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(MAX_QUEUED_PAGES)
+        self._scanner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-scanner")
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+        self.init_tables()
+
+    @property
+    def available(self) -> bool:
+        return self.recognize is not None
+
+    def init_tables(self):
+        conn = query_metrics.connect(self.store.db_path, timeout=30)
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_pages (
+            page_digest TEXT PRIMARY KEY,
+            text TEXT,
+            created_at TIMESTAMP
+        )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def submit(self, digest: str, data: bytes, pages: List[str]) -> int:
+        """Queue a stored PDF's text-less pages; returns how many (0 if already queued or none)"""
+        missing = [number for number, text in enumerate(pages, start=1) if not (text or "").strip()]
+        if not missing or not self.available:
+            return 0
+        with self._progress_lock:
+            progress = self._progress.get(digest)
+            if progress is not None and progress[0] < progress[1]:
+                return 0
+            self._progress[digest] = [0, len(missing)]
+        self._scanner.submit(self._scan, digest, data, missing)
+        return len(missing)
+
+    def progress(self, digest: str) -> Optional[Tuple[int, int]]:
+        """(pages done, pages queued) for a document, or None if it was never queued"""
+        with self._progress_lock:
+            progress = self._progress.get(digest)
+            return tuple(progress) if progress else None
+
+    def shutdown(self):
+        self._scanner.shutdown(wait=False, cancel_futures=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _scan(self, digest: str, data: bytes, page_numbers: List[int]):
+        queued = 0
+        try:
+            reader = PyPDF2.PdfReader(io.BytesIO(data))
+            for page_number in page_numbers:
+                images = page_images(reader.pages[page_number - 1])
+                self._slots.acquire()
+                self._pool.submit(self._ocr_page, digest, page_number, images)
+                queued += 1
+        except Exception as e:
+            logger.error(f"OCR scan of {digest[:12]} failed: {e}")
+            # Pages never queued will not report back
+            with self._progress_lock:
+                self._progress[digest][1] -= len(page_numbers) - queued
+
+    def _ocr_page(self, digest: str, page_number: int, images: List[bytes]):
+        try:
+            text = self._cached_text(images) if images else ""
+            if text:
+                self.store.apply_page_text(digest, page_number, text)
+            self.stats['pages'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"OCR of page {page_number} of {digest[:12]} failed: {e}")
+        finally:
+            self._slots.release()
+            with self._progress_lock:
+                self._progress[digest][0] += 1
+
+    def _cached_text(self, images: List[bytes]) -> str:
+        page_digest = page_image_digest(images)
+        conn = query_metrics.connect(self.store.db_path, timeout=30)
+        try:
+            row = conn.execute("SELECT text FROM ocr_pages WHERE page_digest = ?", (page_digest,)).fetchone()
+            if row is not None:
+                self.stats['cache_hits'] += 1
+                return row[0]
+
+            text = self.recognize(images)
+            conn.execute('''
+            INSERT OR REPLACE INTO ocr_pages (page_digest, text, created_at) VALUES (?, ?, ?)
+            ''', (page_digest, text, datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+            return text
+        finally:
+            conn.close()
+
+
+# Shared pipeline, so all sessions share one bounded worker pool
+_pipeline: Optional[OcrPipeline] = None
+_pipeline_lock = threading.Lock()
+
+def get_ocr_pipeline() -> OcrPipeline:
+    """Get the shared OCR pipeline for the shared document store."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = OcrPipeline(get_document_store())
+            atexit.register(_pipeline.shutdown)
+        return _pipeline
@@ -0,0 +1,271 @@
+"""
+Veterans India AI Assistant - Password Hashing Service
+=====================================================
+Salted scrypt hashing for admin passwords. Cost parameters are calibrated
+to a target latency on the host, KDF work runs on a bounded worker pool,
+successful verifications are cached briefly so Streamlit reruns don't
+re-derive keys, and legacy unsalted SHA-256 hashes are recognised so they
+can be upgraded on the next successful login.
+
+Stored format: scrypt$<n>$<r>$<p>$<salt b64>$<key b64>
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import os
+import hmac
+import time
+import base64
+import hashlib
+import logging
+import threading
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Calibration bounds: 2^14 (16 MiB at r=8) is the floor for interactive
+# logins, 2^17 (128 MiB) the most we let one login hold in memory
+MIN_SCRYPT_N = 2 ** 14
+MAX_SCRYPT_N = 2 ** 17
+DEFAULT_TARGET_MS = 100
+
+DEFAULT_WORKERS = 2
+VERIFY_CACHE_TTL_SECONDS = 300
+VERIFY_CACHE_SIZE = 256
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text.encode('ascii'))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # OpenSSL needs 128 * r * (n + p + 2) bytes; allow a little headroom
+    maxmem = 128 * r * (n + p + 2) + 2 ** 20
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=KEY_BYTES)
+
+
+def is_legacy_hash(stored: str) -> bool:
+    """Unsalted SHA-256 hex digest written by the original DatabaseManager"""
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+
+def calibrate_scrypt_cost(target_ms: float = DEFAULT_TARGET_MS, r: int = SCRYPT_R, p: int = SCRYPT_P) -> int:
+    """Largest power-of-two n (within bounds) whose hash time stays under target_ms"""
+    n = MIN_SCRYPT_N
+    salt = os.urandom(SALT_BYTES)
+    while n < MAX_SCRYPT_N:
+        started = time.perf_counter()
+        _scrypt("calibration", salt, n * 2, r, p)
+        if (time.perf_counter() - started) * 1000 > target_ms:
+            break
+        n *= 2
+    return n
+
+
+class PasswordHasher:
+    """
+    scrypt hasher with a bounded worker pool and a verification cache.
+
+    hashlib.scrypt releases the GIL, so other Streamlit sessions keep
+    running while a login derives its key, and max_workers caps how much
+    CPU and memory concurrent logins can take. The pool does not make a
+    login itself non-blocking: hash() and verify() wait for the result on
+    the caller's (script) thread, and a login beyond max_workers also
+    waits for a free worker. Use hash_async()/verify_async() to do other
+    work meanwhile. The cache
+    remembers successful (hash, password) pairs under a per-process HMAC
+    key for a few minutes; failures are never cached.
+    """
+
+    def __init__(self, n: int = MIN_SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P,
+                 max_workers: int = DEFAULT_WORKERS, cache_ttl: float = VERIFY_CACHE_TTL_SECONDS,
+                 cache_size: int = VERIFY_CACHE_SIZE):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.stats = {'hashes': 0, 'verifications': 0, 'cache_hits': 0, 'legacy_verifications': 0}
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._cache_key = os.urandom(32)
+        self._cache: "collections.OrderedDict[bytes, float]" = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._dummy_hash: Optional[str] = None
+        self._dummy_lock = threading.Lock()
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the current cost parameters"""
+        return self.hash_async(password).result()
+
+    def hash_async(self, password: str) -> Future:
+        return self._pool.submit(self._hash, password)
+
+    def verify(self, password: str, stored: str) -> Tuple[bool, bool]:
+        """Check a password; returns (matches, needs_rehash)"""
+        return self.verify_async(password, stored).result()
+
+    def verify_async(self, password: str, stored: str) -> Future:
+        cache_key = self._cache_entry_key(password, stored)
+        if self._cache_hit(cache_key):
+            self.stats['cache_hits'] += 1
+            future = Future()
+            future.set_result((True, self.needs_rehash(stored)))
+            return future
+        return self._pool.submit(self._verify, password, stored, cache_key)
+
+    def verify_unknown_user(self, password: str) -> Tuple[bool, bool]:
+        """
+        Spend a real verification on a login for a username that does not
+        exist, so its timing does not reveal which usernames do; never matches.
+        """
+        with self._dummy_lock:
+            if self._dummy_hash is None:
+                self._dummy_hash = self._hash(_b64encode(os.urandom(SALT_BYTES)))
+        self.verify(password, self._dummy_hash)
+        return False, False
+
+    def clear_cache(self):
+        """Forget cached verifications (e.g. to time cold logins)"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def needs_rehash(self, stored: str) -> bool:
+        """True for legacy hashes and hashes made with weaker parameters than the current ones"""
+        if is_legacy_hash(stored):
+            return True
+        try:
+            _, n, r, p, _, _ = stored.split("$")
+            return (int(n), int(r), int(p)) < (self.n, self.r, self.p)
+        except ValueError:
+            return True
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def _hash(self, password: str) -> str:
+        salt = os.urandom(SALT_BYTES)
+        key = _scrypt(password, salt, self.n, self.r, self.p)
+        self.stats['hashes'] += 1
+        return f"scrypt${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def _verify(self, password: str, stored: str, cache_key: bytes) -> Tuple[bool, bool]:
+        self.stats['verifications'] += 1
+        if is_legacy_hash(stored):
+            self.stats['legacy_verifications'] += 1
+            matches = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        else:
+            try:
+                scheme, n, r, p, salt, key = stored.split("$")
+                if scheme != "scrypt":
+                    return False, False
+                derived = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+                matches = hmac.compare_digest(derived, _b64decode(key))
+            except (ValueError, TypeError):
+                logger.warning("Unrecognised password hash format")
+                return False, False
+
+        if matches:
+            self._cache_store(cache_key)
+        return matches, matches and self.needs_rehash(stored)
+
+    def _cache_entry_key(self, password: str, stored: str) -> bytes:
+        return hmac.new(self._cache_key, stored.encode() + b"\x00" + password.encode(), hashlib.sha256).digest()
+
+    def _cache_hit(self, key: bytes) -> bool:
+        with self._cache_lock:
+            expires_at = self._cache.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return False
+            self._cache.move_to_end(key)
+            return True
+
+    def _cache_store(self, key: bytes):
+        with self._cache_lock:
+            self._cache[key] = time.monotonic() + self.cache_ttl
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+# Shared hasher, calibrated on first use
+_hasher: Optional[PasswordHasher] = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher(target_ms: float = DEFAULT_TARGET_MS) -> PasswordHasher:
+    """Get the shared password hasher, calibrating its cost on first use."""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            n = calibrate_scrypt_cost(target_ms)
+            logger.info(f"Password hashing: scrypt n={n}, r={SCRYPT_R}, p={SCRYPT_P}")
+            _hasher = PasswordHasher(n=n)
+        return _hasher
+
+
+def benchmark_logins(costs: List[int] = None, logins: int = 40, workers: int = DEFAULT_WORKERS) -> List[Dict]:
+    """Measure verification latency and logins/sec for each scrypt n"""
+    costs = costs or [2 ** 14, 2 ** 15, 2 ** 16, 2 ** 17]
+    results = []
+
+    for n in costs:
+        hasher = PasswordHasher(n=n, max_workers=workers, cache_ttl=0)
+        stored = hasher.hash("correct horse battery staple")
+
+        started = time.perf_counter()
+        hasher.verify("correct horse battery staple", stored)
+        single_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        futures = [hasher.verify_async("correct horse battery staple", stored) for _ in range(logins)]
+        assert all(f.result()[0] for f in futures)
+        elapsed = time.perf_counter() - started
+        hasher.shutdown()
+
+        results.append({
+            'n': n,
+            'memory_mib': round(128 * SCRYPT_R * n / 2 ** 20),
+            'latency_ms': round(single_ms, 1),
+            'logins_per_sec': round(logins / elapsed, 1)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    # Throughput of concurrent logins per cost setting on this machine
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark admin login hashing costs")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or DEFAULT_WORKERS)
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS)
+    args = parser.parse_args()
+
+    print(f"Calibrated n for {args.target_ms:g} ms: {calibrate_scrypt_cost(args.target_ms)}")
+    print(f"{'n':>8} {'memory':>8} {'latency':>10} {'logins/sec':>11}  ({args.workers} workers)")
+    for row in benchmark_logins(logins=args.logins, workers=args.workers):
+        print(f"{row['n']:>8} {row['memory_mib']:>5} MiB {row['latency_ms']:>7} ms {row['logins_per_sec']:>11}")
+
+    hasher = PasswordHasher(max_workers=args.workers)
+    stored = hasher.hash("admin123")
+    hasher.verify("admin123", stored)
+    started = time.perf_counter()
+    for _ in range(1000):
+        hasher.verify("admin123", stored)
+    print(f"Cached re-verification: {1000 / (time.perf_counter() - started):,.0f} logins/sec")
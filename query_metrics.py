@@ -0,0 +1,266 @@
+"""
+Veterans India AI Assistant - Query Instrumentation
+==================================================
+Drop-in replacement for sqlite3.connect() that times every statement and
+records its normalized-SQL hash, duration, rows returned and the dashboard
+page that issued it. Statements slower than a threshold are appended to a
+slow-query log; aggregates feed the Settings page "DB Performance" panel.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import datetime
+import weakref
+import threading
+import collections
+from functools import lru_cache
+from typing import Optional, Dict, List
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 100.0
+DEFAULT_SLOW_QUERY_LOG = "slow_queries.log"
+RECENT_QUERY_LIMIT = 1000
+
+# Page attributed to queries issued from the current thread (Streamlit runs
+# each session's script in its own thread)
+_context = threading.local()
+
+
+def set_query_page(page: Optional[str]):
+    """Attribute subsequent queries on this thread to a dashboard page"""
+    _context.page = page
+
+
+def get_query_page() -> str:
+    # Background workers are attributed to their thread name
+    return getattr(_context, 'page', None) or f"thread:{threading.current_thread().name}"
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> tuple:
+    """Collapse whitespace; returns (normalized_sql, short_hash)"""
+    normalized = re.sub(r"\s+", " ", sql).strip()
+    return normalized, hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+class QueryMetrics:
+    """
+    Collects per-statement timings. Keeps a ring buffer of recent
+    statements plus running aggregates per query hash and per page, and
+    writes statements slower than slow_query_ms to the slow-query log as
+    JSON lines.
+    """
+
+    def __init__(self, slow_query_ms: float = DEFAULT_SLOW_QUERY_MS,
+                 slow_log_path: str = DEFAULT_SLOW_QUERY_LOG):
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = slow_log_path
+        self.recent = collections.deque(maxlen=RECENT_QUERY_LIMIT)
+        self.slow = collections.deque(maxlen=RECENT_QUERY_LIMIT)
+        self.by_query: Dict[str, Dict] = {}
+        self.by_page: Dict[str, Dict] = {}
+        self.total_queries = 0
+        self._lock = threading.Lock()
+
+        self._slow_logger = logging.getLogger(f"{__name__}.slow")
+        self._slow_logger.propagate = False
+        if not self._slow_logger.handlers:
+            handler = logging.FileHandler(slow_log_path, delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._slow_logger.addHandler(handler)
+
+    def record(self, sql: str, duration_ms: float, rows: int, page: str):
+        normalized, query_hash = normalize_sql(sql)
+        entry = {
+            'at': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'hash': query_hash,
+            'page': page,
+            'duration_ms': round(duration_ms, 3),
+            'rows': rows,
+            'sql': normalized[:300]
+        }
+
+        with self._lock:
+            self.total_queries += 1
+            self.recent.append(entry)
+
+            stats = self.by_query.get(query_hash)
+            if stats is None:
+                stats = self.by_query[query_hash] = {
+                    'hash': query_hash, 'sql': entry['sql'], 'calls': 0,
+                    'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'pages': set()
+                }
+            stats['calls'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['rows'] += rows
+            stats['pages'].add(page)
+
+            page_stats = self.by_page.setdefault(page, {'page': page, 'queries': 0, 'total_ms': 0.0, 'slow': 0})
+            page_stats['queries'] += 1
+            page_stats['total_ms'] += duration_ms
+
+            if duration_ms >= self.slow_query_ms:
+                page_stats['slow'] += 1
+                self.slow.append(entry)
+                self._slow_logger.warning(json.dumps(entry))
+
+    def query_summary(self, limit: int = 20) -> List[Dict]:
+        """Statements ordered by total time spent"""
+        with self._lock:
+            rows = [dict(s, pages=", ".join(sorted(s['pages'])),
+                         avg_ms=s['total_ms'] / s['calls']) for s in self.by_query.values()]
+        rows.sort(key=lambda s: s['total_ms'], reverse=True)
+        for row in rows:
+            row['total_ms'] = round(row['total_ms'], 2)
+            row['avg_ms'] = round(row['avg_ms'], 2)
+            row['max_ms'] = round(row['max_ms'], 2)
+        return rows[:limit]
+
+    def page_summary(self) -> List[Dict]:
+        """Query count and time per dashboard page"""
+        with self._lock:
+            rows = [dict(p) for p in self.by_page.values()]
+        for row in rows:
+            row['avg_ms'] = round(row['total_ms'] / row['queries'], 2)
+            row['total_ms'] = round(row['total_ms'], 2)
+        return sorted(rows, key=lambda p: p['total_ms'], reverse=True)
+
+    def recent_slow(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            return list(self.slow)[-limit:][::-1]
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self.slow.clear()
+            self.by_query.clear()
+            self.by_page.clear()
+            self.total_queries = 0
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute() until its results are
+    exhausted, the next execute() or close(), so the recorded duration
+    includes fetching and the row count is the number of rows returned
+    (rows affected, for writes).
+    """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._start(sql, time.perf_counter() - started)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._start(sql, time.perf_counter() - started)
+        return result
+
+    def _start(self, sql, elapsed):
+        rows = max(self.rowcount, 0) if self.description is None else 0
+        self._pending = [sql, elapsed, rows]
+        self.connection._unfinished.add(self)
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            rows = fetch(*args)
+        except StopIteration:
+            self._finish()
+            raise
+        pending = self._pending
+        if pending is not None:
+            pending[1] += time.perf_counter() - started
+            if rows is None or rows == []:
+                self._finish()
+            else:
+                pending[2] += len(rows) if isinstance(rows, list) else 1
+        return rows
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        return self._timed_fetch(super().__next__)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Dropping the cursor is what ends a statement that was never fully
+        # fetched, so record it then
+        self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self.connection._unfinished.discard(self)
+            sql, elapsed, rows = pending
+            get_query_metrics().record(sql, elapsed * 1000, rows, get_query_page())
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including execute() shortcuts) are instrumented"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Cursors whose last statement has not been recorded yet. Held weakly:
+        # a live cursor keeps its statement open and would block COMMIT
+        self._unfinished = weakref.WeakSet()
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        for cursor in list(self._unfinished):
+            cursor._finish()
+        super().close()
+
+
+def connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect() with per-statement instrumentation"""
+    return sqlite3.connect(db_path, factory=InstrumentedConnection, **kwargs)
+
+
+# Process-wide collector shared by every dashboard session
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_query_metrics() -> QueryMetrics:
+    """Get the shared query metrics collector."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = QueryMetrics()
+        return _metrics
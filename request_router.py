@@ -0,0 +1,265 @@
+"""
+Veterans India AI Assistant - Request Router
+===========================================
+Decides how a chat question is answered: a fixed identity reply, the
+organisation profile, the uploaded documents, a web search, or the model
+on its own. Cue phrases for every route are compiled into one regex that
+finds all of them in a single pass; a small weighted scorer then picks
+the route, so "update my pension papers" no longer triggers a web search
+just because it contains "update".
+
+Every decision is appended as one JSON line to a routing log together
+with how long the answer took, so misrouted questions and their latency
+cost can be found afterwards (see benchmark_routing.py).
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+import collections
+from typing import Dict, List, Optional
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTING_LOG = "routing_decisions.log"
+
+# Routes
+IDENTITY = "identity"
+ORG_KNOWLEDGE = "org_knowledge"
+DOCUMENT_QA = "document_qa"
+WEB_SEARCH = "web_search"
+LLM = "llm"
+ROUTES = [IDENTITY, ORG_KNOWLEDGE, DOCUMENT_QA, WEB_SEARCH, LLM]
+# Answer path for org questions served from the response registry, without the model
+CANNED = "canned"
+ANSWER_PATHS = ROUTES + [CANNED]
+
+# Marks a question as being about Veterans India itself; without one of
+# these the topical org cues ("vacancies", "staff", "CEO") are ignored, since
+# they are just as likely to be about CAPF, a PSU or Infosys
+ORG_ANCHOR = "org_anchor"
+# "your" anchors only when an org cue follows it directly ("your interns",
+# "your headquarters"), not "your opinion on the CAPF vacancies"
+SECOND_PERSON = "second_person"
+
+# A route needs at least this score to beat the plain model
+MIN_ROUTE_SCORE = 1.0
+# Ties go to the cheaper, local route
+ROUTE_PRIORITY = {IDENTITY: 0, DOCUMENT_QA: 1, ORG_KNOWLEDGE: 2, WEB_SEARCH: 3, LLM: 4}
+
+# (phrases, route, weight, org profile section or None). Phrases are
+# matched whole-word and case-insensitively; a phrase listed under several
+# routes adds to each. Org anchors add their weight to ORG_KNOWLEDGE.
+CUE_PHRASES = [
+    (["who are you", "what are you", "your name", "who developed you", "who created you", "what's your name",
+      "who made you", "who built you", "are you a bot", "are you human"], IDENTITY, 3.0, None),
+
+    # The organisation by name, and names that only exist in its profile, are enough on their own;
+    # second-person phrasing needs a topical cue as well ("thank you for your service" is not an org question)
+    (["veterans india", "your organization", "your organisation", "your company", "your team",
+      "employee directory", "staff directory", "mega job fair", "veteran entrepreneurs summit",
+      "digital skills bootcamp", "veteran transition program", "tech fellowship"], ORG_ANCHOR, 1.0, None),
+    (["your"], SECOND_PERSON, 0.5, None),
+    (["do you have", "are you hiring", "what do you offer", "how can you help", "you offer",
+      "you provide", "work with you", "work for you", "join you"], ORG_ANCHOR, 0.5, None),
+    (["job opening", "job openings", "vacancy", "vacancies", "openings", "hiring", "are you hiring", "careers",
+      "open positions", "job id"], ORG_KNOWLEDGE, 2.0, "current_job_openings"),
+    (["job", "jobs", "position", "positions"], ORG_KNOWLEDGE, 0.5, "current_job_openings"),
+    (["internship", "internships", "intern", "interns", "stipend"], ORG_KNOWLEDGE, 2.0, "internship_programs"),
+    (["employee directory", "staff directory", "employees", "staff", "who works", "team members",
+      "regional office"], ORG_KNOWLEDGE, 1.5, "employee_directory"),
+    (["ceo", "coo", "cto", "leadership", "founder", "management team"], ORG_KNOWLEDGE, 1.5, "leadership_team"),
+    (["department", "departments", "division", "healthcare division", "employment services",
+      "government liaison", "education support"], ORG_KNOWLEDGE, 1.2, "departments"),
+    (["services", "what do you offer", "how can you help", "programs offered"], ORG_KNOWLEDGE, 0.8,
+     "services_offered"),
+    (["achievements", "impact", "veterans placed", "awards"], ORG_KNOWLEDGE, 1.2, "achievements"),
+    (["job fair", "summit", "bootcamp", "upcoming events", "upcoming programs", "events"], ORG_KNOWLEDGE, 1.5,
+     "upcoming_programs"),
+    (["contact", "phone number", "email address", "helpline", "headquarters", "office address", "branches",
+      "founded", "website"], ORG_KNOWLEDGE, 1.2, "organization"),
+
+    (["document", "documents", "pdf", "file", "uploaded", "attached", "attachment", "spreadsheet", "sheet",
+      "table", "this report", "the report", "page"], DOCUMENT_QA, 1.5, None),
+
+    (["latest", "news", "today", "this week", "breaking", "headlines", "live", "right now", "weather",
+      "stock price", "score"], WEB_SEARCH, 1.5, None),
+    (["search", "search the web", "look up", "google"], WEB_SEARCH, 1.2, None),
+    (["current", "recent", "recently", "new rules", "announced", "notification", "circular"], WEB_SEARCH, 0.7,
+     None),
+    (["update", "updates"], WEB_SEARCH, 0.3, None),
+]
+
+# Years count as a weak recency cue
+_YEAR_RE = re.compile(r"\b20[2-9]\d\b")
+YEAR_WEIGHT = 0.4
+
+
+def _compile(cues):
+    table = collections.defaultdict(list)
+    for phrases, route, weight, topic in cues:
+        for phrase in phrases:
+            table[phrase].append((route, weight, topic))
+    # Longest first, so "job openings" wins over "job" at the same position
+    alternation = "|".join(re.escape(phrase) for phrase in sorted(table, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE), dict(table)
+
+
+class RequestRouter:
+    """
+    Scores a question against every route in one regex pass.
+
+    Each matched cue adds its weight to its route (and, for the org
+    profile, to a section); the best route at or above MIN_ROUTE_SCORE
+    wins, ties going to the local route. Org cues count only alongside an
+    org anchor, and document cues only when documents are uploaded, which
+    then also make the document route the default for otherwise unmatched
+    questions. Documents or org cues outweigh weak recency cues, which is
+    what kept sending "2025 pension update" to the web.
+    """
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_ROUTING_LOG, cues=CUE_PHRASES):
+        self._pattern, self._cues = _compile(cues)
+        self.stats = {route: {'count': 0, 'total_ms': 0.0, 'fallbacks': 0} for route in ANSWER_PATHS}
+        self._stats_lock = threading.Lock()
+
+        self._log = logging.getLogger(f"{__name__}.decisions")
+        self._log.propagate = False
+        if log_path and not self._log.handlers:
+            handler = logging.FileHandler(log_path, delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+            self._log.setLevel(logging.INFO)
+
+    def route(self, text: str, has_documents: bool = False) -> Dict:
+        """
+        Pick a route for a question.
+
+        Returns {'route', 'topic' (org profile section or None), 'scores',
+        'matched' (cue phrases found), 'route_us'}.
+        """
+        started = time.perf_counter()
+        scores = collections.defaultdict(float)
+        topics = collections.defaultdict(float)
+        matched = []
+        anchored = False
+        second_person = None  # (end, weight) of a "your" just before this match
+        for match in self._pattern.finditer(text):
+            phrase = match.group(0).lower()
+            matched.append(phrase)
+            cues = self._cues[phrase]
+            if second_person and not text[second_person[0]:match.start()].strip() \
+                    and any(route == ORG_KNOWLEDGE for route, _, _ in cues):
+                anchored = True
+                scores[ORG_KNOWLEDGE] += second_person[1]
+            second_person = None
+            for route, weight, topic in cues:
+                if route == SECOND_PERSON:
+                    second_person = (match.end(), weight)
+                    continue
+                if route == ORG_ANCHOR:
+                    anchored = True
+                    route = ORG_KNOWLEDGE
+                scores[route] += weight
+                if topic:
+                    topics[topic] += weight
+        if not anchored:
+            scores.pop(ORG_KNOWLEDGE, None)
+            topics.clear()
+        if _YEAR_RE.search(text):
+            scores[WEB_SEARCH] += YEAR_WEIGHT
+        # "page" or "table" mean nothing without an uploaded document to look in
+        if has_documents:
+            scores[DOCUMENT_QA] += MIN_ROUTE_SCORE
+        else:
+            scores.pop(DOCUMENT_QA, None)
+
+        route = LLM
+        candidates = [(score, route_name) for route_name, score in scores.items() if score >= MIN_ROUTE_SCORE]
+        if candidates:
+            route = max(candidates, key=lambda item: (item[0], -ROUTE_PRIORITY[item[1]]))[1]
+        # A web search must beat local sources by a clear margin, not just tie them
+        local = max(scores.get(DOCUMENT_QA, 0.0), scores.get(ORG_KNOWLEDGE, 0.0))
+        if route == WEB_SEARCH and local >= MIN_ROUTE_SCORE and local >= scores[WEB_SEARCH] - 0.5:
+            route = DOCUMENT_QA if scores.get(DOCUMENT_QA, 0.0) >= scores.get(ORG_KNOWLEDGE, 0.0) else ORG_KNOWLEDGE
+
+        topic = max(topics, key=topics.get) if route == ORG_KNOWLEDGE and topics else None
+        return {
+            'route': route,
+            'topic': topic,
+            'scores': {name: round(score, 2) for name, score in scores.items()},
+            'matched': matched,
+            'route_us': round((time.perf_counter() - started) * 1_000_000, 1)
+        }
+
+    def record(self, decision: Dict, route: str, elapsed_ms: float, fallback: bool = False):
+        """
+        Log a routed question once answered.
+
+        route is the path that finally produced the answer; fallback marks
+        a chosen route that failed and handed over to another, whose time
+        was spent for nothing.
+        """
+        with self._stats_lock:
+            stats = self.stats[route]
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            if fallback:
+                self.stats[decision['route']]['fallbacks'] += 1
+        self._log.info(json.dumps({
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'route': decision['route'],
+            'answered_by': route,
+            'topic': decision['topic'],
+            'scores': decision['scores'],
+            'matched': decision['matched'],
+            'route_us': decision['route_us'],
+            'elapsed_ms': round(elapsed_ms, 1),
+            'fallback': fallback
+        }))
+
+    def mean_latency_ms(self) -> Dict[str, float]:
+        """Mean answer time per route so far (routes not yet used are left out)"""
+        with self._stats_lock:
+            return {route: stats['total_ms'] / stats['count'] for route, stats in self.stats.items() if stats['count']}
+
+
+def read_routing_log(log_path: str = DEFAULT_ROUTING_LOG) -> List[Dict]:
+    entries = []
+    try:
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def route_latencies(entries: List[Dict]) -> Dict[str, float]:
+    """Median answer time per route in a routing log"""
+    samples = collections.defaultdict(list)
+    for entry in entries:
+        samples[entry['answered_by']].append(entry['elapsed_ms'])
+    return {route: sorted(values)[len(values) // 2] for route, values in samples.items()}
+
+
+# Shared router, so the regex is compiled once per process
+_router: Optional[RequestRouter] = None
+_router_lock = threading.Lock()
+
+def get_request_router() -> RequestRouter:
+    """Get the shared request router."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = RequestRouter()
+        return _router
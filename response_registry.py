@@ -0,0 +1,109 @@
+"""
+Veterans India AI Assistant - Response Registry
+==============================================
+Ready-made answers for organisation lookups that are fully covered by the
+profile: job openings, internship programs and the employee directory.
+They are rendered once from veterans_india_profile and re-rendered only
+when the profile changes, so the chat serves them without calling the
+model at all.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from veterans_india_profile import (VETERANS_INDIA_PROFILE, format_job_listings, format_internship_info,
+                                    format_employee_directory)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Profile section (as chosen by request_router) → formatter
+CANNED_FORMATTERS: Dict[str, Callable[[Dict], str]] = {
+    "current_job_openings": format_job_listings,
+    "internship_programs": format_internship_info,
+    "employee_directory": format_employee_directory,
+}
+
+# How often get() checks the profile for changes
+PROFILE_RECHECK_SECONDS = 30
+
+
+def profile_fingerprint(profile: Dict) -> str:
+    """Hash of the profile sections the canned responses are rendered from"""
+    sections = {section: profile.get(section) for section in CANNED_FORMATTERS}
+    return hashlib.sha256(json.dumps(sections, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+class ResponseRegistry:
+    """
+    Rendered canned responses keyed by profile section.
+
+    Responses are built eagerly on creation; get() compares the profile's
+    fingerprint at most every PROFILE_RECHECK_SECONDS and re-renders
+    everything when it changed, so edits to the profile dict made at
+    runtime show up without a restart.
+    """
+
+    def __init__(self, profile: Optional[Dict] = None):
+        self.profile = profile if profile is not None else VETERANS_INDIA_PROFILE
+        self.stats = {'served': 0, 'renders': 0}
+
+        self._responses: Dict[str, str] = {}
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __contains__(self, topic: Optional[str]) -> bool:
+        """Whether a response for the section actually rendered"""
+        return topic in self._responses
+
+    def refresh(self) -> bool:
+        """Re-render if the profile changed since the last render; returns whether it did"""
+        fingerprint = profile_fingerprint(self.profile)
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if fingerprint == self._fingerprint:
+                return False
+            responses = {}
+            for topic, formatter in CANNED_FORMATTERS.items():
+                try:
+                    responses[topic] = formatter(self.profile)
+                except Exception as e:
+                    # Left out, so get() returns None and the question goes to the model instead
+                    logger.error(f"Could not render canned response for {topic}: {e}")
+            self._responses = responses
+            self._fingerprint = fingerprint
+            self.stats['renders'] += 1
+            return True
+
+    def get(self, topic: Optional[str]) -> Optional[str]:
+        """The canned response for a profile section, or None if it has none"""
+        if topic not in CANNED_FORMATTERS:
+            return None
+        if time.monotonic() - self._checked_at >= PROFILE_RECHECK_SECONDS:
+            self.refresh()
+        response = self._responses.get(topic)
+        if response is not None:
+            self.stats['served'] += 1
+        return response
+
+
+# Shared registry; app.py creates it at startup, so responses are ready before the first question
+_registry: Optional[ResponseRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_response_registry() -> ResponseRegistry:
+    """Get the shared response registry for the organisation profile."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ResponseRegistry()
+        return _registry
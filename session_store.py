@@ -0,0 +1,303 @@
+"""
+Veterans India AI Assistant - Session Store
+==========================================
+Impersonation sessions backed by the admin_sessions table. Tokens are
+looked up through the UNIQUE session_token index and expire after a TTL;
+an in-memory LRU front answers repeat validations without touching the
+database, and a background thread purges expired and revoked rows.
+Also signs and verifies the subscriber links that identify a user to
+the chat app.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import os
+import hmac
+import time
+import base64
+import atexit
+import hashlib
+import sqlite3
+import logging
+import secrets
+import datetime
+import threading
+import collections
+from typing import Optional, Dict
+import query_metrics
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_TTL_SECONDS = 2 * 60 * 60
+DEFAULT_PURGE_INTERVAL = 300.0
+SESSION_CACHE_SIZE = 1024
+# How long a cached session is trusted before it is re-read, which bounds
+# how late a revocation made by another process is noticed
+SESSION_RECHECK_SECONDS = 30.0
+PURGE_BATCH_SIZE = 500
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _utc_timestamp(at: float) -> str:
+    # Same UTC text format as CURRENT_TIMESTAMP, so SQL comparisons work
+    return datetime.datetime.fromtimestamp(at, datetime.timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def _parse_timestamp(text: str) -> float:
+    return datetime.datetime.strptime(text, TIMESTAMP_FORMAT).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+# Subscriber links to the chat app (?user=<token>) are signed with this
+# secret, shared with the member portal; without it no link verifies and
+# every chat visitor is a guest
+USER_LINK_SECRET_ENV = "VETERANS_INDIA_LINK_SECRET"
+DEFAULT_USER_LINK_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def _link_secret(secret: Optional[str]) -> Optional[bytes]:
+    secret = secret if secret is not None else os.environ.get(USER_LINK_SECRET_ENV)
+    return secret.encode() if secret else None
+
+
+def _link_signature(key: bytes, payload: str) -> str:
+    digest = hmac.new(key, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def sign_user_link(user_id: int, ttl_seconds: int = DEFAULT_USER_LINK_TTL_SECONDS,
+                   secret: Optional[str] = None) -> str:
+    """Token identifying a subscriber to the chat app: '<user_id>.<expiry>.<HMAC-SHA256>'"""
+    key = _link_secret(secret)
+    if key is None:
+        raise ValueError(f"{USER_LINK_SECRET_ENV} is not set")
+    payload = f"{int(user_id)}.{int(time.time() + ttl_seconds)}"
+    return f"{payload}.{_link_signature(key, payload)}"
+
+
+def verify_user_link(token: Optional[str], secret: Optional[str] = None) -> Optional[int]:
+    """The user id of a valid, unexpired link token; None otherwise"""
+    key = _link_secret(secret)
+    if not token or key is None:
+        return None
+    try:
+        user_id, expires, signature = token.split(".")
+        payload = f"{int(user_id)}.{int(expires)}"
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _link_signature(key, payload)) or int(expires) < time.time():
+        return None
+    return int(user_id)
+
+
+def init_session_schema(cursor):
+    """Create admin_sessions with its expiry column and purge index (idempotent)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS admin_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_id INTEGER,
+        impersonated_user_id INTEGER,
+        session_token TEXT UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT 1,
+        expires_at TIMESTAMP,
+        FOREIGN KEY (admin_id) REFERENCES admins (id),
+        FOREIGN KEY (impersonated_user_id) REFERENCES users (id)
+    )
+    ''')
+
+    cursor.execute("PRAGMA table_info(admin_sessions)")
+    if 'expires_at' not in {row[1] for row in cursor.fetchall()}:
+        # Rows written before expiry existed have no expires_at and are purged
+        cursor.execute("ALTER TABLE admin_sessions ADD COLUMN expires_at TIMESTAMP")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_admin_sessions_expires ON admin_sessions (expires_at)")
+
+
+class SessionStore:
+    """
+    Create, validate and revoke impersonation sessions.
+
+    validate() is called on every rerun, so valid sessions are kept in an
+    LRU dict keyed by token; a hit only compares timestamps. A miss reads
+    one row through the session_token index. Cached entries are re-read
+    after SESSION_RECHECK_SECONDS so revocations by other processes still
+    take effect; revocations in this process evict immediately. Unknown
+    tokens are not cached, so guessing cannot push real sessions out.
+    """
+
+    def __init__(self, db_path: str = "veterans_admin.db",
+                 ttl_seconds: float = DEFAULT_SESSION_TTL_SECONDS,
+                 purge_interval: float = DEFAULT_PURGE_INTERVAL,
+                 cache_size: int = SESSION_CACHE_SIZE):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self.cache_size = cache_size
+        self.stats = {'created': 0, 'cache_hits': 0, 'lookups': 0, 'revoked': 0, 'purged': 0}
+
+        self._cache: "collections.OrderedDict[str, tuple]" = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.init_tables()
+
+        self._thread = threading.Thread(target=self._run, name="session-purge", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = query_metrics.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def init_tables(self):
+        conn = self._connect()
+        init_session_schema(conn.cursor())
+        conn.commit()
+        conn.close()
+
+    def create_session(self, admin_id: int, user_id: int) -> str:
+        """Start an impersonation session; returns its token"""
+        token = secrets.token_urlsafe(32)
+        expires_at = time.time() + self.ttl_seconds
+
+        conn = self._connect()
+        try:
+            conn.execute('''
+            INSERT INTO admin_sessions (admin_id, impersonated_user_id, session_token, expires_at)
+            VALUES (?, ?, ?, ?)
+            ''', (admin_id, user_id, token, _utc_timestamp(expires_at)))
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.stats['created'] += 1
+        self._cache_store(token, {'admin_id': admin_id, 'user_id': user_id,
+                                  'expires_at': _utc_timestamp(expires_at)}, expires_at)
+        return token
+
+    def validate(self, token: Optional[str]) -> Optional[Dict]:
+        """
+        Look up an active, unexpired session.
+
+        Returns {'admin_id', 'user_id', 'expires_at'} or None.
+        """
+        if not token:
+            return None
+
+        now = time.time()
+        with self._cache_lock:
+            entry = self._cache.get(token)
+            if entry is not None:
+                session, expires_at, recheck_at = entry
+                if now < expires_at and time.monotonic() < recheck_at:
+                    self._cache.move_to_end(token)
+                    self.stats['cache_hits'] += 1
+                    return dict(session)
+                del self._cache[token]
+
+        self.stats['lookups'] += 1
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT admin_id, impersonated_user_id, expires_at FROM admin_sessions
+            WHERE session_token = ? AND is_active = 1 AND expires_at > ?
+            ''', (token, _utc_timestamp(now)))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        session = {'admin_id': row[0], 'user_id': row[1], 'expires_at': row[2]}
+        self._cache_store(token, session, _parse_timestamp(row[2]))
+        return dict(session)
+
+    def revoke(self, token: Optional[str]) -> bool:
+        """End a session; returns False if it was not active"""
+        if not token:
+            return False
+        with self._cache_lock:
+            self._cache.pop(token, None)
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE admin_sessions SET is_active = 0 WHERE session_token = ? AND is_active = 1",
+                           (token,))
+            revoked = cursor.rowcount == 1
+            conn.commit()
+        finally:
+            conn.close()
+
+        if revoked:
+            self.stats['revoked'] += 1
+        return revoked
+
+    def purge_expired(self) -> int:
+        """Delete expired, revoked and pre-expiry rows; returns the number removed"""
+        now = _utc_timestamp(time.time())
+        removed = 0
+        conn = self._connect()
+        try:
+            # Small batches keep each write lock short
+            while True:
+                cursor = conn.cursor()
+                cursor.execute('''
+                DELETE FROM admin_sessions WHERE id IN (
+                    SELECT id FROM admin_sessions
+                    WHERE is_active = 0 OR expires_at IS NULL OR expires_at <= ?
+                    LIMIT ?
+                )
+                ''', (now, PURGE_BATCH_SIZE))
+                deleted = cursor.rowcount
+                conn.commit()
+                removed += deleted
+                if deleted < PURGE_BATCH_SIZE:
+                    break
+        except sqlite3.Error as e:
+            logger.error(f"Session purge failed: {e}")
+        finally:
+            conn.close()
+
+        with self._cache_lock:
+            expired = [token for token, entry in self._cache.items() if entry[1] <= time.time()]
+            for token in expired:
+                del self._cache[token]
+
+        self.stats['purged'] += removed
+        if removed:
+            logger.info(f"Purged {removed} stale admin sessions")
+        return removed
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        self.purge_expired()
+        while not self._stop_event.wait(self.purge_interval):
+            self.purge_expired()
+
+    def _cache_store(self, token: str, session: Dict, expires_at: float):
+        with self._cache_lock:
+            self._cache[token] = (session, expires_at, time.monotonic() + SESSION_RECHECK_SECONDS)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+# Shared stores, one per database
+_stores: Dict[str, SessionStore] = {}
+_stores_lock = threading.Lock()
+
+def get_session_store(db_path: str = "veterans_admin.db") -> SessionStore:
+    """Get the shared session store for a database."""
+    with _stores_lock:
+        if db_path not in _stores:
+            _stores[db_path] = SessionStore(db_path)
+            atexit.register(_stores[db_path].close)
+        return _stores[db_path]
@@ -0,0 +1,343 @@
+"""
+Veterans India AI Assistant - Tabular Data Ingestion
+===================================================
+Reads large CSV/XLSX uploads in chunks instead of all at once. The first
+chunk fixes a schema (number, datetime, category or text per column);
+every chunk is coerced to it, stored compactly and folded into running
+column summaries and a uniform row sample. The LLM gets the summaries
+and sample, and aggregate questions ("how many ... by branch", "average
+pension") are answered by running pandas on the data itself.
+
+© 2025 Veterans India Team. All rights reserved.
+"""
+
+import re
+import logging
+import collections
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 50_000
+# Rows beyond this much column data are summarised but not kept
+MAX_TABLE_MEMORY_BYTES = 256 * 2 ** 20
+# Distinct values tracked per column; also the most a category column may have
+MAX_TRACKED_VALUES = 1000
+SAMPLE_ROWS = 8
+SUMMARY_TOP_VALUES = 5
+ANSWER_MAX_ROWS = 20
+
+ProgressCallback = Callable[[int, int], None]
+
+# Question phrases → pandas aggregation, checked in order
+AGGREGATIONS = [
+    (("how many", "number of", "count"), 'count'),
+    (("average", "mean"), 'mean'),
+    (("total", "sum of"), 'sum'),
+    (("maximum", "highest", "largest", "latest", "max"), 'max'),
+    (("minimum", "lowest", "smallest", "earliest", "min"), 'min')
+]
+# Whole words only, so "account" is not a count
+_AGGREGATION_PATTERNS = [(re.compile(rf"\b(?:{'|'.join(map(re.escape, phrases))})\b"), op)
+                         for phrases, op in AGGREGATIONS]
+
+
+def format_number(value) -> str:
+    """Integers in full, other numbers to two decimals (never exponent notation)"""
+    if isinstance(value, (int, np.integer)):
+        return f"{value:,}"
+    return f"{value:,.2f}"
+
+
+def _unique_headers(headers) -> List[str]:
+    names, seen = [], collections.Counter()
+    for i, header in enumerate(headers):
+        name = str(header).strip() if header is not None and str(header).strip() else f"column_{i + 1}"
+        seen[name] += 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def iter_csv_chunks(source, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    # Everything as strings; the schema decides the types
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=True):
+        chunk.columns = _unique_headers(chunk.columns)
+        yield chunk
+
+
+def iter_xlsx_chunks(source, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """First sheet in chunks; read-only mode streams rows instead of loading the workbook"""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _unique_headers(header)
+        buffer = []
+        for row in rows:
+            buffer.append(row[:len(columns)])
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def infer_schema(chunk: pd.DataFrame) -> Dict[str, str]:
+    """Column kind per column: 'number', 'datetime', 'category' or 'text'"""
+    schema = {}
+    for column in chunk.columns:
+        values = chunk[column].dropna()
+        if values.empty:
+            schema[column] = 'text'
+            continue
+        if pd.api.types.is_numeric_dtype(values) or pd.to_numeric(values, errors='coerce').notna().mean() >= 0.95:
+            schema[column] = 'number'
+            continue
+        if pd.api.types.is_datetime64_any_dtype(values):
+            schema[column] = 'datetime'
+            continue
+        text = values.astype(str)
+        if text.str.contains(r"\d[-/]\d", regex=True).mean() >= 0.95 and \
+                pd.to_datetime(text, errors='coerce', format='mixed').notna().mean() >= 0.95:
+            schema[column] = 'datetime'
+            continue
+        unique = text.nunique()
+        schema[column] = 'category' if unique <= MAX_TRACKED_VALUES and unique <= len(text) * 0.5 else 'text'
+    return schema
+
+
+def coerce_chunk(chunk: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Convert a raw chunk to the schema's compact dtypes (unparseable values become missing)"""
+    columns = {}
+    for column, kind in schema.items():
+        values = chunk[column] if column in chunk else pd.Series([None] * len(chunk), index=chunk.index)
+        if kind == 'number':
+            numbers = pd.to_numeric(values, errors='coerce')
+            if numbers.notna().all() and (numbers % 1 == 0).all():
+                numbers = pd.to_numeric(numbers, downcast='integer')
+            columns[column] = numbers
+        elif kind == 'datetime':
+            columns[column] = pd.to_datetime(values, errors='coerce', format='mixed')
+        elif kind == 'category':
+            columns[column] = values.astype('string').astype('category')
+        else:
+            columns[column] = values.astype('string')
+    return pd.DataFrame(columns, index=chunk.index)
+
+
+class ColumnSummary:
+    """Running statistics for one column, updated chunk by chunk"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.count = 0
+        self.missing = 0
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0
+        self.values: collections.Counter = collections.Counter()
+        self.too_many_values = False
+
+    def update(self, values: pd.Series):
+        present = values.dropna()
+        self.count += len(present)
+        self.missing += len(values) - len(present)
+        if present.empty:
+            return
+
+        if self.kind in ('number', 'datetime'):
+            low, high = present.min(), present.max()
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+            if self.kind == 'number':
+                self.total += float(present.sum())
+        elif not self.too_many_values:
+            self.values.update(present.value_counts().to_dict())
+            if len(self.values) > MAX_TRACKED_VALUES:
+                self.too_many_values = True
+                self.values.clear()
+
+    def describe(self) -> str:
+        text = f"{self.name} ({self.kind}"
+        if self.missing:
+            text += f", {self.missing:,} missing"
+        text += ")"
+        if self.kind == 'number' and self.count:
+            text += (f": min {format_number(self.minimum)}, max {format_number(self.maximum)}, "
+                     f"mean {format_number(self.total / self.count)}")
+        elif self.kind == 'datetime' and self.count:
+            text += f": {self.minimum:%Y-%m-%d} to {self.maximum:%Y-%m-%d}"
+        elif self.too_many_values:
+            text += f": over {MAX_TRACKED_VALUES:,} distinct values"
+        elif self.values:
+            top = ", ".join(f"{value} ({n:,})" for value, n in self.values.most_common(SUMMARY_TOP_VALUES))
+            text += f": {len(self.values):,} distinct; most common {top}"
+        return text
+
+
+class TabularData:
+    """A loaded table: compact frame, schema, column summaries and a row sample"""
+
+    def __init__(self, name: str, schema: Dict[str, str]):
+        self.name = name
+        self.schema = schema
+        self.summaries = {column: ColumnSummary(column, kind) for column, kind in schema.items()}
+        self.row_count = 0
+        self.frame = pd.DataFrame(columns=list(schema))
+        self.sample = pd.DataFrame(columns=list(schema))
+        # True when rows were summarised but not kept because of the memory cap
+        self.truncated = False
+
+    @property
+    def loaded_rows(self) -> int:
+        return len(self.frame)
+
+    def summary_text(self) -> str:
+        """Compact description for the LLM prompt"""
+        lines = [f"Table {self.name}: {self.row_count:,} rows, {len(self.schema)} columns."]
+        lines += [f"- {summary.describe()}" for summary in self.summaries.values()]
+        if not self.sample.empty:
+            lines.append("Sample rows:")
+            lines.append(self.sample.to_csv(index=False).strip())
+        return "\n".join(lines)
+
+    def answer(self, question: str) -> Optional[str]:
+        """Run the aggregate a question asks for; None if it isn't an aggregate question"""
+        lowered = f" {question.lower()} "
+        operation = next((op for pattern, op in _AGGREGATION_PATTERNS if pattern.search(lowered)), None)
+        if operation is None or self.frame.empty:
+            return None
+
+        group_by = self._group_column(lowered)
+        mentioned = [c for c in self.schema if c != group_by and self._mentions(lowered, c)]
+        target = next((c for c in mentioned if self.schema[c] == 'number'), None)
+        if operation in ('max', 'min') and target is None:
+            target = next((c for c in mentioned if self.schema[c] == 'datetime'), None)
+        if operation != 'count' and target is None:
+            return None
+
+        frame, filters = self._apply_filters(lowered, exclude=group_by)
+        if operation == 'count':
+            result = frame.groupby(group_by, observed=True).size() if group_by else len(frame)
+            label = "number of rows"
+        else:
+            values = frame.groupby(group_by, observed=True)[target] if group_by else frame[target]
+            result = getattr(values, operation)()
+            label = f"{operation} of {target}"
+
+        scope = f"all {self.row_count:,} rows" if not self.truncated else \
+            f"the first {self.loaded_rows:,} of {self.row_count:,} rows"
+        text = f"Computed from {scope} of {self.name}: {label}"
+        if filters:
+            text += " where " + " and ".join(f"{c} = {v}" for c, v in filters)
+        if group_by:
+            result = result.sort_values(ascending=operation == 'min').head(ANSWER_MAX_ROWS)
+            if pd.api.types.is_numeric_dtype(result):
+                result = result.map(format_number)
+            return f"{text}, by {group_by}:\n{result.to_string()}"
+        return f"{text}: {format_number(result)}" if isinstance(result, (int, float, np.number)) \
+            else f"{text}: {result}"
+
+    @staticmethod
+    def _mentions(question: str, column: str) -> bool:
+        # "retired_on" and "retired on" name the same column, in the question as in the header
+        name = re.sub(r"[_\s]+", " ", column.lower()).strip()
+        return re.search(rf"\b{re.escape(name)}s?\b", re.sub(r"[_\s]+", " ", question)) is not None
+
+    def _group_column(self, question: str) -> Optional[str]:
+        match = re.search(r"\b(?:by|per|for each|each|across)\s+(.+)", question)
+        if not match:
+            return None
+        tail = match.group(1)
+        return next((c for c, kind in self.schema.items()
+                     if kind == 'category' and self._mentions(tail, c)), None)
+
+    def _apply_filters(self, question: str, exclude: Optional[str]) -> Tuple[pd.DataFrame, List[tuple]]:
+        # Category values named in the question ("how many Army veterans") filter the rows
+        frame, filters = self.frame, []
+        for column, kind in self.schema.items():
+            if kind != 'category' or column == exclude:
+                continue
+            for value in frame[column].cat.categories:
+                if len(value) >= 3 and re.search(rf"\b{re.escape(value.lower())}\b", question):
+                    frame = frame[frame[column] == value]
+                    filters.append((column, value))
+                    break
+        return frame, filters
+
+
+def _merge_frames(frames: List[pd.DataFrame], schema: Dict[str, str]) -> pd.DataFrame:
+    columns = {}
+    for column, kind in schema.items():
+        parts = [frame[column] for frame in frames]
+        if kind == 'category':
+            # Plain concat would fall back to object dtype when categories differ
+            columns[column] = pd.Series(union_categoricals(parts, ignore_order=True))
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def load_table(name: str, source, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               max_memory_bytes: int = MAX_TABLE_MEMORY_BYTES,
+               progress: Optional[ProgressCallback] = None, seed: int = 0) -> TabularData:
+    """
+    Read a CSV or XLSX (by name) chunk by chunk into a TabularData.
+
+    progress(bytes_read, total_bytes) is called after each chunk when the
+    source is a seekable file object.
+    """
+    chunks = iter_xlsx_chunks(source, chunk_rows) if name.lower().endswith(".xlsx") \
+        else iter_csv_chunks(source, chunk_rows)
+    total_bytes = getattr(source, 'size', None)
+    rng = np.random.default_rng(seed)
+
+    table: Optional[TabularData] = None
+    frames: List[pd.DataFrame] = []
+    kept_bytes = 0
+    sample_keys = np.empty(0)
+
+    for raw in chunks:
+        if table is None:
+            table = TabularData(name, infer_schema(raw))
+        chunk = coerce_chunk(raw, table.schema)
+        table.row_count += len(chunk)
+        for column, summary in table.summaries.items():
+            summary.update(chunk[column])
+
+        # Uniform sample: keep the rows with the smallest random keys seen so far
+        keys = np.concatenate([sample_keys, rng.random(len(chunk))])
+        candidates = pd.concat([table.sample, chunk], ignore_index=True) if not table.sample.empty else chunk
+        keep = np.argsort(keys)[:SAMPLE_ROWS]
+        table.sample, sample_keys = candidates.iloc[keep].reset_index(drop=True), keys[keep]
+
+        if not table.truncated:
+            chunk_bytes = int(chunk.memory_usage(deep=True).sum())
+            if kept_bytes + chunk_bytes <= max_memory_bytes:
+                frames.append(chunk)
+                kept_bytes += chunk_bytes
+            else:
+                table.truncated = True
+                logger.info(f"{name}: keeping the first {sum(map(len, frames)):,} rows in memory")
+
+        if progress and total_bytes and hasattr(source, 'tell'):
+            progress(min(source.tell(), total_bytes), total_bytes)
+
+    if table is None:
+        return TabularData(name, {})
+    if frames:
+        table.frame = _merge_frames(frames, table.schema)
+    return table
@@ -0,0 +1,49 @@
+"""
+Tests for block rendering of the chat history (chat_view.py)
+"""
+
+import sqlite3
+
+from chat_view import ChatView, BLOCK_MESSAGES
+from conversation_store import ConversationStore
+
+
+def test_interleaved_conversations_keep_their_blocks(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    conversations = [store.create_conversation() for _ in range(25)]
+    for turn in range(10):
+        for conversation_id in conversations:
+            store.append_message(conversation_id, "user", f"message {turn}")
+
+    messages = store.recent_messages(conversations[3], 10)
+    assert [message['seq'] for message in messages] == list(range(1, 11))
+    assert len(ChatView().blocks(messages)) == 1
+
+
+def test_only_the_newest_block_is_rebuilt(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    conversation_id = store.create_conversation()
+    messages = [store.append_message(conversation_id, "user", f"message {i}") for i in range(2 * BLOCK_MESSAGES)]
+    view = ChatView()
+    view.blocks(messages)
+    messages.append(store.append_message(conversation_id, "assistant", "reply"))
+    view.blocks(messages)
+    assert view.stats == {'built': 2 + 1, 'hits': 2}
+
+
+def test_existing_messages_get_numbered(tmp_path):
+    db_path = str(tmp_path / "conversations.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, user_id INTEGER, created_at TIMESTAMP, "
+                 "updated_at TIMESTAMP)")
+    conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT NOT NULL, "
+                 "role TEXT NOT NULL, content TEXT NOT NULL, created_at TIMESTAMP)")
+    for conversation_id in ("a", "b", "a", "b", "a"):
+        conn.execute("INSERT INTO messages (conversation_id, role, content, created_at) "
+                     "VALUES (?, 'user', 'hi', '2025-01-01 10:00:00')", (conversation_id,))
+    conn.commit()
+    conn.close()
+
+    store = ConversationStore(db_path)
+    assert [message['seq'] for message in store.recent_messages("a", 10)] == [1, 2, 3]
+    assert store.append_message("b", "user", "next")['seq'] == 3
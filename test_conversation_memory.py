@@ -0,0 +1,53 @@
+"""
+Tests for the rolling conversation summary (conversation_memory.py)
+"""
+
+from conversation_memory import ConversationMemory
+from conversation_store import ConversationStore
+
+
+def add_turns(store, conversation_id, count):
+    for i in range(count):
+        role = "user" if i % 2 == 0 else "assistant"
+        store.append_message(conversation_id, role, f"{role} message number {i:02d} about pensions")
+
+
+def test_older_turns_are_folded_into_the_summary(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    conversation_id = store.create_conversation()
+    add_turns(store, conversation_id, 8)
+
+    memory = ConversationMemory(store, history_tokens=30)
+    memory.after_reply(conversation_id)
+    memory._executor.shutdown(wait=True)
+
+    summary, messages = memory.context(conversation_id)
+    assert "User asked: user message number 00" in summary
+    assert [message['id'] for message in messages] == [7, 8]
+
+
+def test_reply_during_an_update_is_not_dropped(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    conversation_id = store.create_conversation()
+    add_turns(store, conversation_id, 8)
+    memory = ConversationMemory(store, history_tokens=30)
+
+    # More turns arrive just as the running update finds nothing left to fold
+    messages_between = store.messages_between
+    arrived = []
+
+    def late_reply(*args):
+        older = messages_between(*args)
+        if not older and not arrived:
+            arrived.append(True)
+            add_turns(store, conversation_id, 6)
+            memory.after_reply(conversation_id)
+        return older
+
+    store.messages_between = late_reply
+    memory.after_reply(conversation_id)
+    memory._executor.shutdown(wait=True)
+
+    assert arrived
+    assert store.get_summary(conversation_id)[1] == 12
+    assert not memory._pending
@@ -0,0 +1,43 @@
+"""
+Tests for the shared document store (document_store.py)
+"""
+
+import pytest
+
+from document_store import DocumentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DocumentStore(str(tmp_path / "documents.db"))
+    yield store
+    store.close()
+
+
+def test_recognised_text_fills_blank_and_whitespace_pages(store):
+    store.put("abc", "scan.pdf", ["hello world text", "\n", "\t \r\n", ""])
+    for page_number in (2, 3, 4):
+        assert store.apply_page_text("abc", page_number, f"recognised page {page_number}") == 1
+    pages = store.get("abc")["pages"]
+    assert pages[1:] == ["recognised page 2", "recognised page 3", "recognised page 4"]
+    assert store.stats['unapplied'] == 0
+
+
+def test_recognised_text_never_overwrites_a_page(store):
+    store.put("abc", "scan.pdf", ["hello world text", ""])
+    assert store.apply_page_text("abc", 1, "recognised text") == 0
+    assert store.apply_page_text("missing", 1, "recognised text") == 0
+    assert store.get("abc")["pages"][0] == "hello world text"
+    assert store.stats['unapplied'] == 2
+
+
+def test_put_never_evicts_the_document_it_stored(tmp_path):
+    store = DocumentStore(str(tmp_path / "documents.db"), max_bytes=100)
+    try:
+        store.put("old", "old.pdf", ["old page text " * 10])
+        # Larger than the whole budget, and not yet acquired by the uploading session
+        stored = store.put("new", "new.pdf", ["new page text " * 50])
+        assert store.get("new")["pages"] == stored["pages"]
+        assert store.get("old") is None
+    finally:
+        store.close()
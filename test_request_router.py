@@ -0,0 +1,74 @@
+"""
+Regression tests for chat question routing (request_router.py)
+"""
+
+import pytest
+
+from benchmark_routing import LABELLED_QUESTIONS
+from request_router import RequestRouter, IDENTITY, ORG_KNOWLEDGE, DOCUMENT_QA, WEB_SEARCH, LLM
+from response_registry import ResponseRegistry
+
+# Questions about other organisations that must not get the Veterans India profile
+NOT_ORG_QUESTIONS = [
+    "Any vacancies in CAPF for ex-servicemen?",
+    "Which PSUs are hiring ex-servicemen?",
+    "latest job openings in railways 2025",
+    "Is there any internship for my son in DRDO?",
+    "Who are the staff at the Kendriya Sainik Board?",
+    "Who is the CEO of Infosys?",
+    "How do I contact ECHS helpline?",
+    "Translate 'thank you for your service' into Hindi",
+    "What is your opinion on the CAPF vacancies?",
+    "Can your advice on PSU openings be trusted?",
+]
+
+
+@pytest.fixture(scope="module")
+def router():
+    return RequestRouter(log_path=None)
+
+
+@pytest.mark.parametrize("question, has_documents, expected", LABELLED_QUESTIONS)
+def test_labelled_questions(router, question, has_documents, expected):
+    assert router.route(question, has_documents)['route'] == expected
+
+
+@pytest.mark.parametrize("question", NOT_ORG_QUESTIONS)
+def test_generic_org_words_need_an_anchor(router, question):
+    decision = router.route(question)
+    assert decision['route'] != ORG_KNOWLEDGE
+    assert decision['topic'] is None
+
+
+@pytest.mark.parametrize("question", NOT_ORG_QUESTIONS)
+def test_other_organisations_get_no_canned_response(router, question):
+    registry = ResponseRegistry()
+    decision = router.route(question)
+    canned = registry.get(decision['topic']) if decision['route'] == ORG_KNOWLEDGE else None
+    assert canned is None
+
+
+@pytest.mark.parametrize("question, topic", [
+    ("What job openings do you have?", "current_job_openings"),
+    ("Tell me about your internship programs", "internship_programs"),
+    ("Show me the employee directory", "employee_directory"),
+])
+def test_org_lookups_get_canned_response(router, question, topic):
+    decision = router.route(question)
+    assert (decision['route'], decision['topic']) == (ORG_KNOWLEDGE, topic)
+    assert ResponseRegistry().get(topic)
+
+
+@pytest.mark.parametrize("question", ["What does page 3 say?", "Sum the second column of the table"])
+def test_document_cues_need_documents(router, question):
+    assert router.route(question, has_documents=False)['route'] != DOCUMENT_QA
+    assert router.route(question, has_documents=True)['route'] == DOCUMENT_QA
+
+
+def test_identity_beats_documents(router):
+    assert router.route("Who are you?", has_documents=True)['route'] == IDENTITY
+
+
+def test_weak_recency_cues_stay_local(router):
+    assert router.route("How do I update my address in my pension records?")['route'] == LLM
+    assert router.route("What are the latest news on OROP revision?")['route'] == WEB_SEARCH
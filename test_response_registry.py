@@ -0,0 +1,49 @@
+"""
+Regression tests for the canned profile responses (response_registry.py)
+"""
+
+import copy
+
+import response_registry
+from response_registry import ResponseRegistry, CANNED_FORMATTERS
+from veterans_india_profile import (VETERANS_INDIA_PROFILE, format_job_listings, format_internship_info,
+                                    format_employee_directory)
+
+
+def profile_copy():
+    return copy.deepcopy(VETERANS_INDIA_PROFILE)
+
+
+def test_renders_every_canned_section():
+    registry = ResponseRegistry(profile_copy())
+    assert registry.get("current_job_openings") == format_job_listings()
+    assert registry.get("internship_programs") == format_internship_info()
+    assert registry.get("employee_directory") == format_employee_directory()
+    for topic in CANNED_FORMATTERS:
+        assert topic in registry
+
+
+def test_sections_without_canned_response():
+    registry = ResponseRegistry(profile_copy())
+    for topic in ("leadership_team", "organization", None):
+        assert topic not in registry
+        assert registry.get(topic) is None
+
+
+def test_failed_section_is_not_served():
+    profile = profile_copy()
+    del profile["employee_directory"]
+    registry = ResponseRegistry(profile)
+    assert "employee_directory" not in registry
+    assert registry.get("employee_directory") is None
+    # The other sections still render
+    assert "internship_programs" in registry
+
+
+def test_profile_change_re_renders(monkeypatch):
+    registry = ResponseRegistry(profile_copy())
+    office = next(iter(registry.profile["employee_directory"]))
+    registry.profile["employee_directory"][office][0]["name"] = "Changed Name"
+    monkeypatch.setattr(response_registry, "PROFILE_RECHECK_SECONDS", 0)
+    assert "Changed Name" in registry.get("employee_directory")
+    assert registry.stats['renders'] == 2
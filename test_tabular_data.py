@@ -0,0 +1,31 @@
+"""
+Tests for aggregate answers over uploaded tables (tabular_data.py)
+"""
+
+import io
+
+from tabular_data import load_table
+
+ROWS = [("Army", 41234.5, "2019-03-01"), ("Army", 41234.6, "2021-06-30"), ("Navy", 52000.25, "2020-01-15"),
+        ("Navy", 38000, "2018-11-02"), ("Air Force", 45000.7, "2022-08-19"), ("Air Force", 45000.7, "2017-05-05")]
+CSV = "name,service,pension,retired_on\n" + "".join(
+    f"veteran {i},{service},{pension},{retired_on}\n" for i, (service, pension, retired_on) in enumerate(ROWS * 2))
+
+
+def table():
+    return load_table("veterans.csv", io.BytesIO(CSV.encode()))
+
+
+def test_underscored_column_named_as_written():
+    assert table().answer("what is the latest retired_on").endswith("2022-08-19 00:00:00")
+    assert "2022-08-19" in table().answer("what is the latest retired on")
+
+
+def test_grouped_results_use_number_format():
+    answer = table().answer("average pension by service")
+    assert "41,234.55" in answer
+    assert "41234.55" not in answer
+
+
+def test_account_is_not_count():
+    assert table().answer("how do I update my account") is None
@@ -0,0 +1,61 @@
+"""
+Tests for signed subscriber links and guest entitlements
+"""
+
+import sqlite3
+
+from admin_dashboard import DatabaseManager
+from session_store import sign_user_link, verify_user_link
+from entitlements import EntitlementResolver, Feature, GUEST_WEB_SEARCH_ENV
+
+SECRET = "test-secret"
+
+
+def test_signed_link_round_trip():
+    assert verify_user_link(sign_user_link(42, secret=SECRET), secret=SECRET) == 42
+
+
+def test_tampered_expired_or_unsigned_links_are_guests():
+    token = sign_user_link(42, secret=SECRET)
+    assert verify_user_link(token.replace("42.", "43.", 1), secret=SECRET) is None
+    assert verify_user_link(token, secret="another-secret") is None
+    assert verify_user_link(sign_user_link(42, ttl_seconds=-1, secret=SECRET), secret=SECRET) is None
+    assert verify_user_link("42", secret=SECRET) is None
+    assert verify_user_link(None, secret=SECRET) is None
+
+
+def test_guests_get_no_web_search_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv(GUEST_WEB_SEARCH_ENV, raising=False)
+    resolver = EntitlementResolver(str(tmp_path / "missing.db"))
+    assert not resolver.has_feature(None, Feature.WEB_SEARCH)
+    assert resolver.has_feature(None, Feature.CHAT)
+    # Without an admin database subscribers are treated like guests
+    assert not resolver.has_feature(7, Feature.WEB_SEARCH)
+
+
+def test_guest_web_search_can_be_turned_on(monkeypatch, tmp_path):
+    monkeypatch.setenv(GUEST_WEB_SEARCH_ENV, "1")
+    resolver = EntitlementResolver(str(tmp_path / "missing.db"))
+    assert resolver.has_feature(None, Feature.WEB_SEARCH)
+
+
+def test_subscribers_never_get_less_than_guests(monkeypatch, tmp_path):
+    monkeypatch.delenv(GUEST_WEB_SEARCH_ENV, raising=False)
+    db_path = str(tmp_path / "admin.db")
+    DatabaseManager(db_path)
+    conn = sqlite3.connect(db_path)
+    plans = dict(conn.execute("SELECT plan_name, id FROM plans"))
+    for user_id, plan, status in [(1, "Basic", "active"), (2, "Standard", "active"), (3, "Standard", "expired")]:
+        conn.execute("INSERT INTO users (id, username, email, password_hash, plan_id, subscription_status) "
+                     "VALUES (?, ?, ?, 'x', ?, ?)", (user_id, f"user{user_id}", f"user{user_id}@example.com",
+                                                     plans[plan], status))
+    conn.commit()
+    conn.close()
+
+    resolver = EntitlementResolver(db_path)
+    guest = resolver.user_features(None)
+    for user_id in (1, 2, 3, 404):
+        assert guest in resolver.user_features(user_id)
+    assert resolver.has_feature(2, Feature.WEB_SEARCH)
+    assert not resolver.has_feature(1, Feature.WEB_SEARCH)
+    assert not resolver.has_feature(3, Feature.WEB_SEARCH)
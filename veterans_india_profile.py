@@ -317,62 +317,53 @@ def get_veterans_india_info(query_type="general"):
     else:
         return VETERANS_INDIA_PROFILE
 
-def format_job_listings():
+JOB_LEVELS = [
+    ("Senior Positions", "senior_positions"),
+    ("Mid-Level Positions", "mid_level_positions"),
+    ("Entry-Level Positions", "entry_level_positions"),
+]
+
+def format_job_listings(profile=None):
     """
     Returns formatted job listings for display
     """
-    jobs = VETERANS_INDIA_PROFILE["current_job_openings"]
-    formatted = "🎯 **Current Job Openings at Veterans India:**\n\n"
-    
-    formatted += "**Senior Positions:**\n"
-    for job in jobs["senior_positions"]:
-        formatted += f"• **{job['title']}** - {job['location']}\n"
-        formatted += f"  📍 Requirements: {job['requirements']}\n"
-        formatted += f"  💰 Salary: {job['salary']}\n"
-        formatted += f"  📧 Apply: {job['contact']} (Ref: {job['job_id']})\n\n"
-    
-    formatted += "**Mid-Level Positions:**\n"
-    for job in jobs["mid_level_positions"]:
-        formatted += f"• **{job['title']}** - {job['location']}\n"
-        formatted += f"  📍 Requirements: {job['requirements']}\n"
-        formatted += f"  💰 Salary: {job['salary']}\n"
-        formatted += f"  📧 Apply: {job['contact']} (Ref: {job['job_id']})\n\n"
+    jobs = (profile or VETERANS_INDIA_PROFILE)["current_job_openings"]
+    parts = ["🎯 **Current Job Openings at Veterans India:**\n\n"]
     
-    formatted += "**Entry-Level Positions:**\n"
-    for job in jobs["entry_level_positions"]:
-        formatted += f"• **{job['title']}** - {job['location']}\n"
-        formatted += f"  📍 Requirements: {job['requirements']}\n"
-        formatted += f"  💰 Salary: {job['salary']}\n"
-        formatted += f"  📧 Apply: {job['contact']} (Ref: {job['job_id']})\n\n"
+    for heading, level in JOB_LEVELS:
+        parts.append(f"**{heading}:**\n")
+        for job in jobs[level]:
+            parts.append(f"• **{job['title']}** - {job['location']}\n"
+                         f"  📍 Requirements: {job['requirements']}\n"
+                         f"  💰 Salary: {job['salary']}\n"
+                         f"  📧 Apply: {job['contact']} (Ref: {job['job_id']})\n\n")
     
-    return formatted
+    return "".join(parts)
 
-def format_internship_info():
+def format_internship_info(profile=None):
     """
     Returns formatted internship information
     """
-    internships = VETERANS_INDIA_PROFILE["internship_programs"]
-    formatted = "🎓 **Internship Programs at Veterans India:**\n\n"
+    internships = (profile or VETERANS_INDIA_PROFILE)["internship_programs"]
+    parts = ["🎓 **Internship Programs at Veterans India:**\n\n"]
     
     for program_name, details in internships.items():
-        formatted += f"**{program_name.replace('_', ' ').title()}:**\n"
-        for key, value in details.items():
-            formatted += f"• {key.replace('_', ' ').title()}: {value}\n"
-        formatted += "\n"
+        parts.append(f"**{program_name.replace('_', ' ').title()}:**\n")
+        parts.extend(f"• {key.replace('_', ' ').title()}: {value}\n" for key, value in details.items())
+        parts.append("\n")
     
-    return formatted
+    return "".join(parts)
 
-def format_employee_directory():
+def format_employee_directory(profile=None):
     """
     Returns formatted employee directory
     """
-    directory = VETERANS_INDIA_PROFILE["employee_directory"]
-    formatted = "👥 **Veterans India Employee Directory:**\n\n"
+    directory = (profile or VETERANS_INDIA_PROFILE)["employee_directory"]
+    parts = ["👥 **Veterans India Employee Directory:**\n\n"]
     
     for office, employees in directory.items():
-        formatted += f"**{office.replace('_', ' ').title()}:**\n"
-        for emp in employees:
-            formatted += f"• {emp['name']} - {emp['designation']} ({emp['dept']})\n"
-        formatted += "\n"
+        parts.append(f"**{office.replace('_', ' ').title()}:**\n")
+        parts.extend(f"• {emp['name']} - {emp['designation']} ({emp['dept']})\n" for emp in employees)
+        parts.append("\n")
     
-    return formatted
+    return "".join(parts)